@@ -1,7 +1,121 @@
-from constants import ZOOM_2_CLIENT_ID, ZOOM_2_CLIENT_SECRET, ZOOM_2_TOKEN_URL, API_URL
-from commons import get_tomorrow_date, get_access_token, fetch_recordings
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from constants import (
+    ZOOM_2_CLIENT_ID,
+    ZOOM_2_CLIENT_SECRET,
+    ZOOM_2_TOKEN_URL,
+    CLEANUP_MAX_MEETING_SIZE_MB,
+    CLEANUP_MAX_FILE_SIZE_MB,
+    CLEANUP_FILE_TYPES,
+    CLEANUP_MAX_WORKERS,
+    CLEANUP_DRY_RUN,
+)
+from commons import get_access_token, iter_recordings, delete_recording, delete_recording_file
 
 
+def plan_cleanup(
+        meetings,
+        max_meeting_size_mb=CLEANUP_MAX_MEETING_SIZE_MB,
+        max_file_size_mb=CLEANUP_MAX_FILE_SIZE_MB,
+        file_types=CLEANUP_FILE_TYPES
+):
+    """
+    Decide which recordings to trash
+
+    A meeting whose files add up to less than ``max_meeting_size_mb`` is
+    trashed as a whole. In larger meetings, single media files smaller than
+    ``max_file_size_mb`` are trashed one by one. Meetings with files that
+    are still processing are left alone, since their sizes aren't final.
+
+    Args:
+        meetings (iterable): Meeting objects as returned by Zoom
+        max_meeting_size_mb (float): Meeting-total threshold in MB
+        max_file_size_mb (float): Per-file threshold in MB
+        file_types (tuple): File types that may be trashed one by one
+
+    Returns:
+        list: Actions, each a dict with 'kind' ('meeting' or 'file'), the
+        meeting UUID, the recording ID for files, a description and the
+        bytes reclaimed
+    """
+    actions = []
+    for meeting in meetings:
+        recording_files = meeting.get('recording_files', [])
+        if any(recording.get('status', 'completed') != 'completed' for recording in recording_files):
+            continue
+
+        total_size = meeting.get('total_size') or sum(recording['file_size'] for recording in recording_files)
+        description = f"{meeting.get('topic')}: {meeting.get('start_time')} {meeting.get('timezone')}"
+
+        if total_size < max_meeting_size_mb * 1024 * 1024:
+            actions.append({
+                'kind': 'meeting',
+                'meeting_uuid': meeting['uuid'],
+                'description': description,
+                'bytes': total_size,
+            })
+            continue
+
+        for recording in recording_files:
+            if (recording.get('file_type') in file_types
+                    and recording['file_size'] < max_file_size_mb * 1024 * 1024):
+                actions.append({
+                    'kind': 'file',
+                    'meeting_uuid': meeting['uuid'],
+                    'recording_id': recording['id'],
+                    'description': f"{description} [{recording.get('recording_type')}]",
+                    'bytes': recording['file_size'],
+                })
+
+    return actions
+
+
+def print_cleanup_plan(actions):
+    """
+    Print what a cleanup would trash and how much space it frees
+    """
+    for action in actions:
+        size_mb = action['bytes'] / (1024 * 1024)
+        print(f"[{action['kind']}] {action['description']} (Size: {size_mb:.2f} MB)")
+
+    meetings = sum(1 for action in actions if action['kind'] == 'meeting')
+    total_mb = sum(action['bytes'] for action in actions) / (1024 * 1024)
+    print(f"\nPlan: trash {meetings} meetings and {len(actions) - meetings} single files, "
+          f"reclaiming {total_mb:.2f} MB")
+
+
+def execute_cleanup(actions, access_token, max_workers=CLEANUP_MAX_WORKERS):
+    """
+    Run the trash calls of a cleanup plan concurrently
+
+    The shared Zoom client rate-limits the calls, so the workers queue
+    instead of tripping 429s.
+
+    Returns:
+        int: Bytes reclaimed by the successful calls
+    """
+    def run(action):
+        if action['kind'] == 'meeting':
+            return delete_recording(action['meeting_uuid'], access_token)
+        return delete_recording_file(action['meeting_uuid'], action['recording_id'], access_token)
+
+    reclaimed = 0
+    failed = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(run, action): action for action in actions}
+        for future in as_completed(futures):
+            try:
+                succeeded = future.result()
+            except Exception as e:
+                print(f"Error trashing {futures[future]['description']}: {e}")
+                succeeded = False
+            if succeeded:
+                reclaimed += futures[future]['bytes']
+            else:
+                failed += 1
+
+    print(f"Reclaimed {reclaimed / (1024 * 1024):.2f} MB; {failed} trash calls failed")
+    return reclaimed
+
 
 # Main logic to find and delete recordings
 def main():
@@ -14,19 +128,13 @@ def main():
     print("Access token: {}".format(access_token))
 
     print("Fetching recordings...")
-    recordings_data = fetch_recordings(user_id, access_token)
-
-    for meeting in recordings_data.get("meetings", []):
-        id = meeting["id"]
-        for recording in meeting.get("recording_files", []):
-            meeting_id = recording["meeting_id"]
-            file_size_mb = recording["file_size"] / (1024 * 1024)  # Convert bytes to MB
-            print("meeting_id: {} - size: {}".format(meeting_id, file_size_mb))
-            if file_size_mb < 2:  # Filter for recordings smaller than 2MB
-                print(f"Deleting Meeting {meeting_id} (Size: {file_size_mb:.2f} MB)...")
-                print(f"[* {meeting['topic']}: {meeting['start_time']} {meeting['timezone']} *]")
-                #delete_recording(meeting_id, access_token)
-            break
+    actions = plan_cleanup(iter_recordings(user_id, access_token))
+    print_cleanup_plan(actions)
+
+    if CLEANUP_DRY_RUN:
+        print("Dry run: nothing was deleted. Set CLEANUP_DRY_RUN = False to trash these recordings.")
+    else:
+        execute_cleanup(actions, access_token)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
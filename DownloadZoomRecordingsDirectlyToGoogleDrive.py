@@ -1,23 +1,61 @@
 import os
 import json
+import hashlib
 import requests
 import io
+import threading
 import pytz
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, time
+from time import monotonic
 from commons import (
+    FileLock,
+    encode_meeting_uuid,
     get_access_token,
-    fetch_recordings
+    iter_batches,
+    iter_recordings,
+    open_recording_chunks
 )
 from constants import (
     ZOOM_2_CLIENT_ID,
     ZOOM_2_CLIENT_SECRET,
     ZOOM_2_TOKEN_URL,
     API_URL,
+    COURSE_MAPPING_ZOOM1,
     COURSE_MAPPING_ZOOM2,
     DAY_OF_WEEK,
+    STREAM_CHUNK_SIZE_MB,
+    USE_ASYNC_TRANSFERS,
+    FOLDER_PREFETCH_BATCH_SIZE,
+    PREFETCH_PARTICIPANTS,
+    PARTICIPANTS_CACHE_DIR,
+    PARTICIPANTS_MAX_WORKERS,
+    FOLDER_LOCK_PATH,
+    METRICS_TEXTFILE_PATH,
+    METRICS_EXPORT_INTERVAL_SECONDS,
+    METRICS_PORT,
+    METRICS_HOST,
+    VERIFY_MAX_ATTEMPTS,
 )
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
+from course_index import CourseIndex, get_meeting_datetime, parse_time_range_minutes
+from drive_batch import escape_query_value, lookup_folders, create_folders
+from drive_service import build_drive_service, load_drive_credentials
+from checksums import CHECKSUM_FIELDS, UNVERIFIED, StreamChecksum, verify_transfer, with_checksum_fields
+from drive_streaming import TruncatedStreamError, iter_upload_chunks, open_upload_session, upload_stream_to_drive
+from folder_cache import get_folder_cache
+from metrics import (
+    BYTES_TRANSFERRED,
+    FILES_PROCESSED,
+    FILE_SECONDS,
+    TextfileExporter,
+    start_metrics_server,
+    track_api_call,
+)
+from recording_policy import print_policy_savings
+from staging import get_staging_area, upload_staged_recording
+from transfer_manifest import TransferManifest, recording_key
+from zoom_client import get_zoom_client
 from googleapiclient.http import MediaIoBaseUpload
 from googleapiclient.errors import HttpError
 
@@ -37,50 +75,8 @@ def parse_time_range(time_str, is_saturday=False):
     Returns:
         tuple: (start_time, end_time) as datetime.time objects
     """
-    import re
-    from datetime import datetime, time, timedelta
-
-    # Remove any extra whitespace around the hyphen and split the time range
-    time_str = time_str.replace(' ', '')
-    time_pattern = r'(\d+):(\d+)(am|pm)-(\d+):(\d+)(am|pm)'
-    match = re.match(time_pattern, time_str, re.IGNORECASE)
-
-    if not match:
-        raise ValueError(f"Unable to parse time range: {time_str}")
-
-    start_hour, start_minute, start_meridiem, end_hour, end_minute, end_meridiem = match.groups()
-
-    # Convert to 24-hour format
-    start_hour = int(start_hour)
-    end_hour = int(end_hour)
-
-    # Handle start time AM/PM conversion
-    if start_meridiem.lower() == 'pm' and start_hour != 12:
-        start_hour += 12
-    elif start_meridiem.lower() == 'am' and start_hour == 12:
-        start_hour = 0
-
-    # Handle end time AM/PM conversion
-    if end_meridiem.lower() == 'pm' and end_hour != 12:
-        end_hour += 12
-    elif end_meridiem.lower() == 'am' and end_hour == 12:
-        end_hour = 0
-
-    # Create datetime objects for easier manipulation
-    base_date = datetime.now().date()
-    start_datetime = datetime.combine(base_date, time(start_hour, int(start_minute)))
-    end_datetime = datetime.combine(base_date, time(end_hour, int(end_minute)))
-
-    # Apply buffer based on whether it's Saturday or not
-    buffer_minutes = 5 if is_saturday else 10
-    start_datetime = start_datetime - timedelta(minutes=buffer_minutes)
-    end_datetime = end_datetime + timedelta(minutes=buffer_minutes)
-
-    # Convert back to time objects
-    start_time = start_datetime.time()
-    end_time = end_datetime.time()
-
-    return start_time, end_time
+    start_minute, end_minute = parse_time_range_minutes(time_str, is_saturday)
+    return time(*divmod(start_minute, 60)), time(*divmod(end_minute, 60))
 
 def get_mimetype(file_extension):
     """
@@ -89,7 +85,10 @@ def get_mimetype(file_extension):
     mimetypes = {
         'mp4': 'video/mp4',
         'mp3': 'audio/mpeg',
+        'm4a': 'audio/mp4',
         'txt': 'text/plain',
+        'vtt': 'text/vtt',
+        'json': 'application/json',
         'pdf': 'application/pdf',
         'mov': 'video/quicktime',
         'wav': 'audio/wav',
@@ -97,6 +96,88 @@ def get_mimetype(file_extension):
     return mimetypes.get(file_extension.lower(), 'application/octet-stream')
 
 
+# Serializes folder lookups that miss the cache so concurrent workers don't
+# create the same folder twice
+_folder_lock = threading.Lock()
+# Lock file shared with other processes; see share_folder_lock
+_folder_file_lock = None
+
+def share_folder_lock(path=FOLDER_LOCK_PATH):
+    """
+    Serialize folder lookups with other processes too, through a lock file
+
+    Call this in every process of a multi-process sync, so two of them never
+    create the same folder at once.
+    """
+    global _folder_file_lock
+    _folder_file_lock = FileLock(path, timeout=300, stale_after=300)
+
+@contextmanager
+def _folders_locked():
+    with _folder_lock:
+        if _folder_file_lock is None:
+            yield
+        else:
+            with _folder_file_lock:
+                yield
+
+def find_or_create_folder(drive_service, folder_name, parent_folder_id=None, create=True):
+    """
+    Find a folder in Google Drive, creating it if needed, through the folder cache
+
+    Args:
+        drive_service: Google Drive service
+        folder_name (str): Name of the folder
+        parent_folder_id (str, optional): Folder it must be in; without it the
+            folder is looked up by name anywhere in Drive
+        create (bool): Create the folder if it doesn't exist
+
+    Returns:
+        str: Folder ID, or None if it doesn't exist and create is False
+    """
+    cache = get_folder_cache()
+    folder_id = cache.get(parent_folder_id, folder_name)
+    if folder_id:
+        return folder_id
+
+    with _folders_locked():
+        # Another worker may have resolved it while we waited
+        folder_id = cache.get(parent_folder_id, folder_name, count=False)
+        if folder_id:
+            return folder_id
+
+        query = f"name='{escape_query_value(folder_name)}' and mimeType='application/vnd.google-apps.folder'"
+        if parent_folder_id:
+            query += f" and '{parent_folder_id}' in parents"
+        with track_api_call('drive', 'files.list'):
+            results = drive_service.files().list(q=query, spaces='drive').execute()
+        folders = results.get('files', [])
+
+        if folders:
+            folder_id = folders[0]['id']
+        elif create:
+            folder_metadata = {
+                'name': folder_name,
+                'mimeType': 'application/vnd.google-apps.folder'
+            }
+            if parent_folder_id:
+                folder_metadata['parents'] = [parent_folder_id]
+            with track_api_call('drive', 'files.create'):
+                folder = drive_service.files().create(
+                    body=folder_metadata,
+                    fields='id'
+                ).execute()
+            folder_id = folder.get('id')
+            if parent_folder_id:
+                print(f"Created new subfolder: {folder_name}")
+            else:
+                print(f"Created new parent folder: {folder_name}")
+        else:
+            return None
+
+        cache.set(parent_folder_id, folder_name, folder_id)
+        return folder_id
+
 def ensure_folder_exists(drive_service, parent_folder_name, subfolder_name):
     """
     Ensure a specific subfolder exists under a parent folder in Google Drive
@@ -110,278 +191,678 @@ def ensure_folder_exists(drive_service, parent_folder_name, subfolder_name):
         str: Folder ID of the subfolder
     """
     # First, find the parent folder
-    parent_results = drive_service.files().list(
-        q=f"name='{parent_folder_name}' and mimeType='application/vnd.google-apps.folder'",
-        spaces='drive'
-    ).execute()
-    parent_folders = parent_results.get('files', [])
-
-    if not parent_folders:
-        # Create parent folder if it doesn't exist
-        parent_folder_metadata = {
-            'name': parent_folder_name,
-            'mimeType': 'application/vnd.google-apps.folder'
-        }
-        parent_folder = drive_service.files().create(
-            body=parent_folder_metadata,
-            fields='id'
-        ).execute()
-        parent_folder_id = parent_folder.get('id')
-        print(f"Created new parent folder: {parent_folder_name}")
-    else:
-        parent_folder_id = parent_folders[0]['id']
+    parent_folder_id = find_or_create_folder(drive_service, parent_folder_name)
 
     # Now find or create the subfolder
-    subfolder_results = drive_service.files().list(
-        q=f"name='{subfolder_name}' and mimeType='application/vnd.google-apps.folder' and '{parent_folder_id}' in parents",
-        spaces='drive'
-    ).execute()
-    subfolders = subfolder_results.get('files', [])
-
-    if not subfolders:
-        # Create subfolder
-        subfolder_metadata = {
-            'name': subfolder_name,
-            'mimeType': 'application/vnd.google-apps.folder',
-            'parents': [parent_folder_id]
-        }
-        subfolder = drive_service.files().create(
-            body=subfolder_metadata,
-            fields='id'
-        ).execute()
-        subfolder_id = subfolder.get('id')
-        print(f"Created new subfolder: {subfolder_name}")
-    else:
-        subfolder_id = subfolders[0]['id']
-
-    return subfolder_id
+    try:
+        return find_or_create_folder(drive_service, subfolder_name, parent_folder_id)
+    except HttpError as e:
+        if not is_missing_folder_error(e):
+            raise
+        # The cached parent was deleted in Drive; look it up again
+        print(f"Folder {parent_folder_name} no longer exists in Drive; resolving it again")
+        get_folder_cache().invalidate(None, parent_folder_name)
+        parent_folder_id = find_or_create_folder(drive_service, parent_folder_name)
+        return find_or_create_folder(drive_service, subfolder_name, parent_folder_id)
+
+def is_missing_folder_error(error):
+    """
+    True if Drive rejected a create or upload because its parent folder is gone
+    """
+    return isinstance(error, HttpError) and error.resp.status == 404
 
-def get_course_from_mapping(meeting_datetime):
+def refresh_transfer_folder(drive_service, transfer):
     """
-    Find matching course based on the meeting time and day
+    Resolve a planned transfer's course folder again, bypassing its cached ID
+    """
+    _, date_subfolder_name, course_subfolder_name = transfer['folder_names']
+    print(f"Folder {transfer['folder_path']} no longer exists in Drive; resolving it again")
+    date_folder_id = find_or_create_folder(drive_service, date_subfolder_name)
+    get_folder_cache().invalidate(date_folder_id, course_subfolder_name)
+    transfer['folder_id'] = ensure_folder_exists(drive_service, date_subfolder_name, course_subfolder_name)
+
+def _resolve_folder_level(drive_service, keys, create, cache):
+    # Cache first, then one batched lookup and one batched create for the rest
+    resolved = {}
+    missing = []
+    for key in dict.fromkeys(keys):
+        folder_id = cache.get(*key)
+        if folder_id:
+            resolved[key] = folder_id
+        else:
+            missing.append(key)
+
+    if missing:
+        found = lookup_folders(drive_service, missing)
+        if create:
+            found.update(create_folders(drive_service, [key for key in missing if key not in found]))
+        cache.set_many(found)
+        resolved.update(found)
+
+    return resolved
+
+def resolve_folder_tree(drive_service, folder_paths, create_courses=True):
+    """
+    Resolve many year > month > course folder paths with batched Drive requests
 
-    Args:
-        meeting_datetime (datetime): Datetime of the meeting
+    Follows the same rules as the two ensure_folder_exists calls per meeting,
+    but each level costs one batched lookup (plus one batched create), so
+    the number of round trips doesn't grow with the number of paths.
 
+    Args:
+        drive_service: Google Drive service
+        folder_paths (iterable): (year folder, month folder, course folder) name tuples
+        create_courses (bool): Create course folders that don't exist yet
+    """
+    folder_paths = set(folder_paths)
+    if not folder_paths:
+        return
+
+    cache = get_folder_cache()
+    with _folders_locked():
+        year_ids = _resolve_folder_level(
+            drive_service, [(None, year) for year, _, _ in folder_paths], True, cache)
+        month_ids = _resolve_folder_level(
+            drive_service, [(year_ids[(None, year)], month) for year, month, _ in folder_paths], True, cache)
+
+        # Course folders are looked up under the month folder found by name
+        named_month_ids = _resolve_folder_level(
+            drive_service, [(None, month) for _, month, _ in folder_paths], False, cache)
+
+        course_keys = []
+        for year, month, course in folder_paths:
+            month_id = named_month_ids.get((None, month)) or month_ids[(year_ids[(None, year)], month)]
+            course_keys.append((month_id, course))
+        _resolve_folder_level(drive_service, course_keys, create_courses, cache)
+
+def get_meeting_folder_path(meeting_datetime, meeting, course_index=None):
+    """
     Returns:
-        str: Matching course folder name or None if no match found
+        tuple: (year folder, month folder, course folder) names for a meeting
     """
-    meeting_time = meeting_datetime.time()
-    meeting_day = meeting_datetime.strftime('%A')
-    is_saturday = meeting_day == 'Saturday'
+    # Create parent folder with the year and then a subfolder for the months
+    parent_folder_name = meeting_datetime.strftime('%Y courses')
+    date_subfolder_name = meeting_datetime.strftime('%B Courses')
 
-    for course_name, course_info in COURSE_MAPPING_ZOOM2.items():
-        try:
-            # Check if the day exists in the course schedule
-            if meeting_day not in course_info['schedule']:
-                continue
+    # Match by time first, then by course name, else use a generic folder
+    course_subfolder_name = (course_index or COURSE_INDEX).classify_meeting(meeting, default='Others')
 
-            # Get times for this specific day
-            day_times = course_info['schedule'][meeting_day]
+    return parent_folder_name, date_subfolder_name, course_subfolder_name
 
-            # Check time ranges for this day
-            for time_range in day_times:
-                # Parse time range with appropriate buffer
-                start_time, end_time = parse_time_range(time_range, is_saturday)
+def prefetch_meeting_folders(drive_service, meetings, min_size_mb=20, manifest=None, course_index=None):
+    """
+    Resolve the Drive folders of a batch of meetings up front
 
-                # Check if meeting time is within the course time range
-                if start_time <= meeting_time <= end_time:
-                    return course_info['folder_name']
+    Only meetings with something left to transfer are included, so no
+    folders are created that the transfers wouldn't create themselves.
+    """
+    folder_paths = set()
+    for meeting in meetings:
+        meeting_datetime = get_meeting_datetime(meeting)
+        if meeting_datetime and select_meeting_recordings(meeting, min_size_mb, manifest, course_index):
+            folder_paths.add(get_meeting_folder_path(meeting_datetime, meeting, course_index))
 
-        except ValueError as e:
-            print(f"Error parsing time for {course_name}: {e}")
+    resolve_folder_tree(drive_service, folder_paths)
 
-    return None
+def warm_folder_cache(drive_service, course_mappings=(COURSE_MAPPING_ZOOM1, COURSE_MAPPING_ZOOM2), when=None):
+    """
+    Resolve the current month's folders for every known course in one pass
+
+    Course folders that don't exist yet are left alone; they are created
+    the first time a recording needs them.
+
+    Args:
+        drive_service: Google Drive service
+        course_mappings (iterable): Course mapping dicts to take folder names from
+        when (datetime, optional): Month to warm up; defaults to now (US/Pacific)
+    """
+    when = when or datetime.now(pytz.timezone('US/Pacific'))
+    parent_folder_name = when.strftime('%Y courses')
+    date_subfolder_name = when.strftime('%B Courses')
+
+    folder_names = {'Others'}
+    for course_mapping in course_mappings:
+        folder_names.update(course_info['folder_name'] for course_info in course_mapping.values())
+
+    resolve_folder_tree(
+        drive_service,
+        [(parent_folder_name, date_subfolder_name, folder_name) for folder_name in folder_names],
+        create_courses=False
+    )
+
+# Compiled once; the schedule doesn't change during a run
+COURSE_INDEX = CourseIndex(COURSE_MAPPING_ZOOM2)
+
+def get_course_from_mapping(meeting_datetime, course_index=None):
+    """
+    Find matching course based on the meeting time and day
+
+    Args:
+        meeting_datetime (datetime): Datetime of the meeting
+        course_index (CourseIndex, optional): Compiled course mapping; defaults
+            to COURSE_MAPPING_ZOOM2
+
+    Returns:
+        str: Matching course folder name or None if no match found
+    """
+    return (course_index or COURSE_INDEX).lookup(meeting_datetime)
 
 def get_meeting_participants(access_token, meeting_id):
   """
   Fetches a list of participants for a given Zoom meeting.
 
+  Follows next_page_token, so meetings with more than one page of
+  participants are returned in full.
+
   Args:
     access_token (str): The Zoom API access token.
-    meeting_id (str): The unique ID of the Zoom meeting.
+    meeting_id (str): The UUID (or ID) of the past Zoom meeting.
 
   Returns:
     list: A list of participants, where each participant is a dictionary
           containing information like user_id, user_name, etc.
     None: If the API request fails or no participants are found.
   """
-  headers = {
-      "Authorization": f"Bearer {access_token}"
-  }
-
-  url = f"https://api.zoom.us/v2/meetings/{meeting_id}/participants"
+  url = f"/past_meetings/{encode_meeting_uuid(str(meeting_id))}/participants"
+  params = {"page_size": 300}
+  participants = []
 
   try:
-    response = requests.get(url, headers=headers)
-    response.raise_for_status()  # Raise an exception for bad status codes
+    while True:
+      response = get_zoom_client().get(url, access_token, params=params)
+      response.raise_for_status()  # Raise an exception for bad status codes
+
+      participants_data = response.json()
+      participants.extend(participants_data.get('participants', []))
 
-    participants_data = response.json()
-    return participants_data['participants']
+      next_page_token = participants_data.get('next_page_token')
+      if not next_page_token:
+        return participants
+      params["next_page_token"] = next_page_token
 
   except requests.exceptions.RequestException as e:
     print(f"Error fetching participants: {e}")
     return None
 
 
+def get_cached_participants(access_token, meeting_uuid, cache_dir=PARTICIPANTS_CACHE_DIR):
+    """
+    Participants of a past meeting, from the on-disk cache when possible
+
+    Past meetings never change, so a successful lookup is cached forever
+    in one JSON file per meeting UUID.
+
+    Returns:
+        list: Participants, or None if they couldn't be fetched
+    """
+    cache_path = os.path.join(cache_dir, hashlib.sha1(meeting_uuid.encode()).hexdigest() + '.json')
+    if os.path.exists(cache_path):
+        with open(cache_path, 'r') as cache_file:
+            return json.load(cache_file)['participants']
+
+    participants = get_meeting_participants(access_token, meeting_uuid)
+    if participants is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{cache_path}.tmp"
+        with open(tmp_path, 'w') as cache_file:
+            json.dump({'meeting_uuid': meeting_uuid, 'participants': participants}, cache_file)
+        os.replace(tmp_path, cache_path)
+
+    return participants
+
+
+class ParticipantPrefetcher:
+    """
+    Fetches participants in the background as meetings are listed.
+
+    ``submit`` never blocks, so the transfer path doesn't wait on it.
+    Results are cached on disk by meeting UUID.
+    """
+
+    def __init__(self, access_token, max_workers=PARTICIPANTS_MAX_WORKERS, cache_dir=PARTICIPANTS_CACHE_DIR):
+        self.access_token = access_token
+        self.cache_dir = cache_dir
+        self.results = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='participants')
+
+    def _fetch(self, meeting):
+        participants = get_cached_participants(self.access_token, meeting['uuid'], self.cache_dir)
+        self.results[meeting['uuid']] = participants
+        if participants is None:
+            print(f"Failed to retrieve participants for {meeting.get('topic')}.")
+
+    def submit(self, meeting):
+        if meeting.get('uuid') and meeting['uuid'] not in self.results:
+            self.results[meeting['uuid']] = None
+            self._executor.submit(self._fetch, meeting)
+
+    def wait(self):
+        """
+        Wait for outstanding lookups and print a summary
+
+        Returns:
+            dict: Participants (or None) per meeting UUID
+        """
+        self._executor.shutdown(wait=True)
+        fetched = sum(1 for participants in self.results.values() if participants is not None)
+        print(f"Participants available for {fetched} of {len(self.results)} meetings")
+        return self.results
+
+
+def select_meeting_recordings(meeting, min_size_mb=20, manifest=None, course_index=None, dropped=None):
+    """
+    Recording files of a meeting to transfer that the manifest doesn't list
+    as transferred yet
+
+    The course's selection policy drops redundant copies first; of the rest,
+    files below ``min_size_mb`` are skipped unless the policy always keeps
+    their type (transcripts, chat).
+
+    Args:
+        meeting (dict): Meeting object as returned by Zoom
+        min_size_mb (int): Minimum file size to transfer in MB
+        manifest (TransferManifest, optional): Record of completed transfers
+        course_index (CourseIndex, optional): Compiled course mapping; defaults
+            to COURSE_MAPPING_ZOOM2
+        dropped (list, optional): Receives the files the policy dropped that
+            would otherwise have been transferred
+
+    Returns:
+        list: Recording files to transfer
+    """
+    policy = (course_index or COURSE_INDEX).policy_for(meeting)
+
+    def wanted(recording):
+        return (((recording.get('file_size') or 0) / (1024 * 1024) >= min_size_mb
+                 or (policy and policy.is_kept_artifact(recording)))
+                and not (manifest and manifest.is_transferred(recording)))
+
+    recording_files = meeting.get('recording_files', [])
+    if policy:
+        recording_files, redundant = policy.select(recording_files)
+        if dropped is not None:
+            dropped.extend(recording for recording in redundant if wanted(recording))
+
+    return [recording for recording in recording_files if wanted(recording)]
+
+
+def plan_meeting_transfers(meeting, drive_service, min_size_mb=20, manifest=None, course_index=None, dropped=None):
+    """
+    Work out where each of a meeting's recordings goes in Google Drive
+
+    Resolves (creating if needed) the year > month > course folders for the
+    meeting and names every recording file select_meeting_recordings picks.
+    Redundant copies and recordings the manifest already lists as
+    transferred are left out before any Drive call is made.
+
+    Args:
+        meeting (dict): Meeting object as returned by Zoom
+        drive_service: Google Drive service
+        min_size_mb (int): Minimum file size to transfer in MB
+        manifest (TransferManifest, optional): Record of completed transfers
+        course_index (CourseIndex, optional): Compiled course mapping; defaults
+            to COURSE_MAPPING_ZOOM2
+        dropped (list, optional): Receives the files the selection policy dropped
+
+    Returns:
+        list: One dict per recording to transfer, with the recording, target
+        filename, mimetype, folder ID and a printable folder path
+    """
+    # Parse the start time (UTC) from the meeting data and convert it to PST
+    meeting_datetime = get_meeting_datetime(meeting)
+    if not meeting_datetime:
+        print("No start time found for a meeting. Skipping.")
+        return []
+
+    recordings = select_meeting_recordings(meeting, min_size_mb, manifest, course_index, dropped)
+    if not recordings:
+        return []
+
+    parent_folder_name, date_subfolder_name, course_subfolder_name = get_meeting_folder_path(
+        meeting_datetime, meeting, course_index)
+
+    # Get the meeting topic
+    topic = meeting.get('topic', 'Unknown Meeting')
+
+    # Create full path: Parent Folder > Date Folder > Course Folder
+    date_folder_id = ensure_folder_exists(drive_service, parent_folder_name, date_subfolder_name)
+    course_folder_id = ensure_folder_exists(drive_service, date_subfolder_name, course_subfolder_name)
+
+    transfers = []
+    for recording in recordings:
+        # file_type names the artifact (e.g. TRANSCRIPT); file_extension is its format (VTT)
+        file_extension = recording.get('file_extension') or recording['file_type']
+        transfers.append({
+            'recording': recording,
+            'meeting_uuid': meeting.get('uuid'),
+            # Prepare filename with topic and recording type
+            'filename': f"{topic}_{recording['file_type']}_{meeting_datetime}.{file_extension}",
+            'mimetype': get_mimetype(file_extension),
+            'folder_id': course_folder_id,
+            'folder_path': f"{date_subfolder_name}/{course_subfolder_name}",
+            # To resolve the folder again if it is deleted in Drive
+            'folder_names': (parent_folder_name, date_subfolder_name, course_subfolder_name),
+        })
+
+    return transfers
+
+
+def iter_prefetched_meetings(meetings, drive_service, min_size_mb=20, manifest=None, course_index=None):
+    """
+    Pass meetings through in batches, resolving each batch's folders first
+
+    If the batched lookup fails, folders are resolved one meeting at a time
+    while planning instead.
+    """
+    for meeting_batch in iter_batches(meetings, FOLDER_PREFETCH_BATCH_SIZE):
+        try:
+            prefetch_meeting_folders(drive_service, meeting_batch, min_size_mb, manifest, course_index)
+        except Exception as e:
+            print(f"Error prefetching folders: {e}")
+        yield from meeting_batch
+
+
+def transfer_recording(
+        access_token,
+        drive_service,
+        transfer,
+        streaming=True,
+        buffer_size_mb=STREAM_CHUNK_SIZE_MB,
+        manifest=None
+):
+    """
+    Copy one planned recording from Zoom to Google Drive, checksumming it on the way
+
+    Args:
+        access_token (str): Zoom API access token
+        drive_service: Google Drive service
+        transfer (dict): Planned transfer from plan_meeting_transfers
+        streaming (bool): Pipe the download into a chunked upload instead of
+            loading the file into memory first
+        buffer_size_mb (int): Drive upload chunk size in MB
+        manifest (TransferManifest, optional): Keeps the upload session, so an
+            interrupted upload resumes where it stopped
+
+    Returns:
+        tuple: (Drive file with CHECKSUM_FIELDS, StreamChecksum of the bytes sent)
+    """
+    recording = transfer['recording']
+    key = recording_key(recording)
+
+    # Prepare file metadata for Google Drive
+    file_metadata = {
+        'name': transfer['filename'],
+        'parents': [transfer['folder_id']]
+    }
+
+    session = open_upload_session(drive_service, manifest, key, recording.get('file_size'))
+    # First byte Drive has not committed yet
+    offset = session.offset if session else 0
+
+    if session and session.file:
+        # Drive already has the whole file from an earlier run
+        return session.file, StreamChecksum(offset=recording.get('file_size') or 0)
+
+    staging = get_staging_area() if streaming else None
+    staged = staging.acquire(key, recording.get('file_size'), offset) if staging else None
+    if staged:
+        # Download into a spill file and upload from it, so upload retries never go back to Zoom
+        try:
+            file = upload_staged_recording(
+                drive_service,
+                staged,
+                lambda: staged.download(lambda start: open_recording_chunks(recording, access_token, start)),
+                file_metadata,
+                transfer['mimetype'],
+                buffer_size_mb,
+                session,
+                lambda: open_upload_session(drive_service, manifest, key, recording.get('file_size'))
+            )
+        finally:
+            # Kept for the next attempt, or for a new upload if the copy does not verify
+            staging.release(key)
+        return file, staged.checksum
+
+    if streaming:
+        # Pipe the download into the upload chunk by chunk, hashing it on the way
+        checksum = StreamChecksum(offset=offset)
+        with open_recording_chunks(recording, access_token, offset) as chunks:
+            file = upload_stream_to_drive(
+                drive_service,
+                checksum.wrap(chunks),
+                file_metadata,
+                transfer['mimetype'],
+                size=recording.get('file_size'),
+                chunk_size_mb=buffer_size_mb,
+                session=session
+            )
+        return file, checksum
+
+    # Download the file
+    response = get_zoom_client().get(recording['download_url'], access_token)
+    response.raise_for_status()
+    BYTES_TRANSFERRED.inc(len(response.content), direction='download')
+
+    # The whole file is in memory, so even a resumed upload gets a full checksum
+    checksum = StreamChecksum()
+    checksum.update(response.content)
+
+    # Create an in-memory file-like object
+    file_content = io.BytesIO(response.content)
+
+    # Upload directly to Google Drive
+    media = MediaIoBaseUpload(
+        file_content,
+        mimetype=transfer['mimetype'],
+        chunksize=buffer_size_mb * 1024 * 1024,
+        resumable=True
+    )
+
+    request = drive_service.files().create(
+        body=file_metadata,
+        media_body=media,
+        fields=CHECKSUM_FIELDS
+    )
+    for file in iter_upload_chunks(request, session):
+        pass
+    BYTES_TRANSFERRED.inc(len(response.content) - offset, direction='upload')
+    return file, checksum
+
+
+def delete_drive_file(drive_service, file_id):
+    with track_api_call('drive', 'files.delete'):
+        drive_service.files().delete(fileId=file_id).execute()
+
+
+def transfer_verified_recording(
+        access_token,
+        drive_service,
+        transfer,
+        streaming=True,
+        buffer_size_mb=STREAM_CHUNK_SIZE_MB,
+        manifest=None,
+        max_attempts=VERIFY_MAX_ATTEMPTS
+):
+    """
+    Transfer a recording and check Drive's copy against what Zoom served
+
+    A copy whose size or checksum does not match, or a download that ends
+    short, is deleted and transferred again. After ``max_attempts`` the
+    last copy is kept and reported as unverified.
+
+    Returns:
+        tuple: (Drive file, StreamChecksum, VERIFIED, SIZE_ONLY or UNVERIFIED)
+    """
+    recording = transfer['recording']
+    staging = get_staging_area() if streaming else None
+    for attempt in range(1, max_attempts + 1):
+        try:
+            try:
+                file, checksum = transfer_recording(
+                    access_token, drive_service, transfer, streaming, buffer_size_mb, manifest)
+            except HttpError as e:
+                if not is_missing_folder_error(e):
+                    raise
+                # The course folder was deleted since it was cached; upload into the new one
+                refresh_transfer_folder(drive_service, transfer)
+                file, checksum = transfer_recording(
+                    access_token, drive_service, transfer, streaming, buffer_size_mb, manifest)
+        except TruncatedStreamError as e:
+            if attempt == max_attempts:
+                raise
+            print(f"Download of {transfer['filename']} ended early ({e}); retrying...")
+            continue
+
+        file = with_checksum_fields(drive_service, file)
+        verification, problem = verify_transfer(file, checksum, recording.get('file_size'))
+        FILES_PROCESSED.inc(stage='verify', outcome=verification)
+        if verification != UNVERIFIED or attempt == max_attempts:
+            if staging:
+                staging.discard(recording_key(recording))
+            return file, checksum, verification
+
+        print(f"Drive copy of {transfer['filename']} does not match ({problem}); retrying...")
+        delete_drive_file(drive_service, file['id'])
+
+
 def download_and_upload_recordings(
         access_token,
         drive_service,
-        min_size_mb=20
+        min_size_mb=20,
+        streaming=True,
+        buffer_size_mb=STREAM_CHUNK_SIZE_MB,
+        manifest=None,
+        participant_prefetcher=None,
+        user_id='me',
+        course_index=None,
+        meetings=None
 ):
     """
     Download Zoom recordings directly to Google Drive with date, time, and course-based subfolders
-    """
-    # Fetch recordings
-    user_id = 'me'
-    recordings_data = fetch_recordings(user_id, access_token)
 
+    Args:
+        access_token (str): Zoom API access token
+        drive_service: Google Drive service
+        min_size_mb (int): Minimum file size to transfer in MB
+        streaming (bool): Pipe the Zoom download into a chunked Drive upload instead
+            of loading each file into memory first
+        buffer_size_mb (int): Drive upload chunk size in MB; in streaming mode this
+            caps the memory used per file
+        manifest (TransferManifest, optional): Skips recordings already transferred,
+            records the outcome of every attempt and keeps upload sessions so
+            interrupted uploads resume where they stopped
+        participant_prefetcher (ParticipantPrefetcher, optional): Receives every
+            listed meeting to look up its participants in the background
+        user_id (str): Zoom user whose recordings are transferred, or 'me'
+        course_index (CourseIndex, optional): Compiled course mapping of the
+            user's account; defaults to COURSE_MAPPING_ZOOM2
+        meetings (iterable, optional): Meetings to transfer (e.g. from a
+            webhook event) instead of listing the user's recordings
+
+    Returns:
+        list: File IDs of uploaded files
+    """
     uploaded_file_ids = []
     failed_uploads = []
+    unverified_uploads = []
+    dropped_recordings = []
+
+    # Meetings arrive as the listing pages come in
+    if meetings is None:
+        meetings = iter_recordings(user_id, access_token)
+    meetings = iter_prefetched_meetings(meetings, drive_service, min_size_mb, manifest, course_index)
+    for meeting in meetings:
+        # Participants are fetched in the background; never wait on them here
+        if participant_prefetcher:
+            participant_prefetcher.submit(meeting)
 
-    for meeting in recordings_data.get('meetings', []):
-        # Parse the start time to create a date-based subfolder
         try:
-            # Parse the start time from the meeting data
-            start_time = meeting.get('start_time')
-            if not start_time:
-                print("No start time found for a meeting. Skipping.")
-                continue
-
-            # Get meeting ID and fetch participant count
-            meeting_id = str(meeting.get('id'))
-            participants = get_meeting_participants(access_token, meeting_id)
-
-            if participants:
-                print(f"Number of participants: {len(participants)}")
-                # Process participant data (e.g., print names, user IDs)
-                for participant in participants:
-                    print(f"Participant: {participant['user_name']}")
-            else:
-                print("Failed to retrieve participants.")
-
-            # Convert to datetime object
-            # Convert UTC to PST
-            utc_time = datetime.fromisoformat(start_time.replace('Z', '+00:00'))
-            meeting_datetime = utc_time.astimezone(pytz.timezone('US/Pacific'))
-            #meeting_datetime = datetime.fromisoformat(start_time.replace('Z', '+00:00'))
-
-            # Create parent folder with the year and then a subfolder for the months
-            parent_folder_name = meeting_datetime.strftime('%Y courses')
-            date_subfolder_name = meeting_datetime.strftime('%B Courses')
-
-            # Get the meeting topic
-            topic = meeting.get('topic', 'Unknown Meeting')
-
-            # Initialize course-specific subfolder name
-            course_subfolder_name = None
-
-            # First, try to match by time
-            course_subfolder_name = get_course_from_mapping(meeting_datetime)
-
-
-            # If no time match, try to match by course name
-            if not course_subfolder_name:
-                for course_name, course_info in COURSE_MAPPING_ZOOM2.items():
-                    if course_name in topic:
-                        course_subfolder_name = course_info['folder_name']
-                        break
-
-            # If still no match, use a generic folder
-            if not course_subfolder_name:
-                course_subfolder_name = 'Others'
-
-            # Create full path: Parent Folder > Date Folder > Course Folder
-            date_folder_id = ensure_folder_exists(drive_service, parent_folder_name, date_subfolder_name)
-            course_folder_id = ensure_folder_exists(drive_service, date_subfolder_name, course_subfolder_name)
-
-            # Process each recording in the meeting
-            for recording in meeting.get('recording_files', []):
-                # Check file size
-                file_size_mb = recording['file_size'] / (1024 * 1024)
-
-                if file_size_mb >= min_size_mb:
-                    # Prepare filename with topic and recording type
-                    filename = f"{topic}_{recording['file_type']}_{meeting_datetime}.{recording['file_type']}"
-
-                    # Download URL
-                    download_url = recording['download_url']
-                    headers = {"Authorization": f"Bearer {access_token}"}
-
-                    try:
-                        # Download the file
-                        response = requests.get(download_url, headers=headers)
-                        response.raise_for_status()
-
-                        # Create an in-memory file-like object
-                        file_content = io.BytesIO(response.content)
-
-                        # Determine mimetype
-                        mimetype = get_mimetype(recording['file_type'])
-
-                        # Prepare file metadata for Google Drive
-                        file_metadata = {
-                            'name': filename,
-                            'parents': [course_folder_id]
-                        }
-
-                        # Upload directly to Google Drive
-                        media = MediaIoBaseUpload(
-                            file_content,
-                            mimetype=mimetype,
-                            resumable=True
-                        )
-                        
-                        file = drive_service.files().create(
-                            body=file_metadata,
-                            media_body=media,
-                            fields='id'
-                        ).execute()
-                        
-                        uploaded_file_ids.append(file.get('id'))
-                        print(
-                            f"Uploaded: {filename} to {date_subfolder_name}/{course_subfolder_name} (Size: {file_size_mb:.2f} MB)")
-
-                    except requests.RequestException as e:
-                        print(f"Error downloading {filename}: {e}")
-                        failed_uploads.append((filename, "Download Error"))
-                    except HttpError as e:
-                        print(f"Error uploading {filename} to Google Drive: {e}")
-                        failed_uploads.append((filename, "Upload Error"))
-                    except Exception as e:
-                        print(f"Unexpected error with {filename}: {e}")
-                        failed_uploads.append((filename, "Unexpected Error"))
-
+            transfers = plan_meeting_transfers(
+                meeting, drive_service, min_size_mb, manifest, course_index, dropped_recordings)
         except Exception as e:
             print(f"Error processing meeting: {e}")
             continue
 
-    # Print summary of failed uploads
+        # Process each recording in the meeting
+        for transfer in transfers:
+            recording = transfer['recording']
+            filename = transfer['filename']
+
+            if manifest:
+                manifest.mark_started(recording, transfer['meeting_uuid'], filename)
+            started = monotonic()
+
+            try:
+                file, checksum, verification = transfer_verified_recording(
+                    access_token, drive_service, transfer, streaming, buffer_size_mb, manifest)
+
+                uploaded_file_ids.append(file.get('id'))
+                FILE_SECONDS.observe(monotonic() - started, stage='transfer')
+                FILES_PROCESSED.inc(stage='transfer', outcome='done')
+                if verification == UNVERIFIED:
+                    unverified_uploads.append((filename, file.get('id')))
+                if manifest:
+                    manifest.mark_done(recording, file.get('id'), verification, checksum.md5, checksum.sha256)
+                # Not every listed file carries a size
+                file_size_mb = (recording.get('file_size') or 0) / (1024 * 1024)
+                print(f"Uploaded: {filename} to {transfer['folder_path']} "
+                      f"(Size: {file_size_mb:.2f} MB, {verification})")
+
+            except requests.RequestException as e:
+                print(f"Error downloading {filename}: {e}")
+                failed_uploads.append((filename, "Download Error"))
+                FILES_PROCESSED.inc(stage='transfer', outcome='failed')
+                if manifest:
+                    manifest.mark_failed(recording, e)
+            except HttpError as e:
+                print(f"Error uploading {filename} to Google Drive: {e}")
+                failed_uploads.append((filename, "Upload Error"))
+                FILES_PROCESSED.inc(stage='transfer', outcome='failed')
+                if manifest:
+                    manifest.mark_failed(recording, e)
+            except Exception as e:
+                print(f"Unexpected error with {filename}: {e}")
+                failed_uploads.append((filename, "Unexpected Error"))
+                FILES_PROCESSED.inc(stage='transfer', outcome='failed')
+                if manifest:
+                    manifest.mark_failed(recording, e)
+
+    # Print summary of failed and unverified uploads, and what the selection policy saved
+    print_failed_uploads(failed_uploads)
+    print_unverified_uploads(unverified_uploads)
+    print_policy_savings(dropped_recordings)
+
+    return uploaded_file_ids
+
+
+def print_failed_uploads(failed_uploads):
+    """
+    Print a summary of (filename, error type) pairs, if there are any
+    """
     if failed_uploads:
         print("\nFailed Uploads:")
         for filename, error_type in failed_uploads:
             print(f"{filename}: {error_type}")
 
-    return uploaded_file_ids
+
+def print_unverified_uploads(unverified_uploads):
+    """
+    Print the (filename, Drive file ID) pairs whose Drive copy did not match Zoom's, if there are any
+    """
+    if unverified_uploads:
+        print("\nUnverified Uploads (Drive copy does not match Zoom after every retry):")
+        for filename, file_id in unverified_uploads:
+            print(f"{filename}: {file_id}")
 
 
 def main():
-    # Load credentials from JSON file
-    with open('token.json', 'r') as token_file:
-        token_info = json.load(token_file)
+    # Optional metrics export for long runs
+    metrics_server = start_metrics_server(METRICS_PORT, METRICS_HOST) if METRICS_PORT else None
+    metrics_exporter = (TextfileExporter(METRICS_TEXTFILE_PATH, METRICS_EXPORT_INTERVAL_SECONDS).start()
+                        if METRICS_TEXTFILE_PATH else None)
 
     # Reconstruct Google Drive credentials
-    creds = Credentials(
-        token=token_info['token'],
-        refresh_token=token_info['refresh_token'],
-        token_uri=token_info['token_uri'],
-        client_id=token_info['client_id'],
-        client_secret=token_info['client_secret'],
-        scopes=token_info['scopes']
-    )
-
-    # Build Google Drive service
-    drive_service = build('drive', 'v3', credentials=creds)
+    creds = load_drive_credentials()
 
     # Get Zoom access token
     access_token = get_access_token(
@@ -390,12 +871,50 @@ def main():
         ZOOM_2_TOKEN_URL
     )
 
-    # Download and upload recordings
-    uploaded_file_ids = download_and_upload_recordings(
-        access_token,
-        drive_service,
-        min_size_mb=200
-    )
+    # Build Google Drive service
+    drive_service = build_drive_service(creds)
+
+    # Resolve this month's course folders up front
+    warm_folder_cache(drive_service)
+
+    # Skip what earlier runs already transferred
+    manifest = TransferManifest()
+
+    # Optional stage: look up participants alongside the transfers
+    participant_prefetcher = ParticipantPrefetcher(access_token) if PREFETCH_PARTICIPANTS else None
+
+    if USE_ASYNC_TRANSFERS:
+        # Imported here because the engine builds on this module
+        from async_transfer import run_async_transfers
+
+        # Each Drive worker thread builds its own service; httplib2 is not thread-safe
+        uploaded_file_ids = run_async_transfers(
+            access_token,
+            lambda: build_drive_service(creds),
+            min_size_mb=200,
+            manifest=manifest,
+            participant_prefetcher=participant_prefetcher
+        )
+    else:
+        # Download and upload recordings
+        uploaded_file_ids = download_and_upload_recordings(
+            access_token,
+            drive_service,
+            min_size_mb=200,
+            manifest=manifest,
+            participant_prefetcher=participant_prefetcher
+        )
+
+    if participant_prefetcher:
+        participant_prefetcher.wait()
+
+    print(f"Transfer manifest: {manifest.summary()}")
+    manifest.close()
+
+    if metrics_exporter:
+        metrics_exporter.stop()
+    if metrics_server:
+        metrics_server.shutdown()
 
     print(f"\nTotal recordings uploaded to Google Drive: {len(uploaded_file_ids)}")
 
@@ -0,0 +1,73 @@
+import argparse
+import glob
+import json
+import os
+import secrets
+import time
+import requests
+from constants import (
+    ZOOM_WEBHOOK_SECRET_TOKEN,
+    WEBHOOK_HOST,
+    WEBHOOK_PORT,
+    WEBHOOK_PATH,
+    WEBHOOK_EVENTS_DIR,
+)
+from zoom_webhooks import URL_VALIDATION, url_validation_response, webhook_signature
+
+
+def post_event(url, secret_token, body):
+    """
+    POST a webhook body to the receiver, signed like Zoom signs it
+    """
+    timestamp = str(int(time.time()))
+    headers = {
+        'Content-Type': 'application/json',
+        'x-zm-request-timestamp': timestamp,
+        'x-zm-signature': webhook_signature(secret_token, timestamp, body),
+    }
+    return requests.post(url, data=body, headers=headers, timeout=30)
+
+
+def check_url_validation(url, secret_token):
+    """
+    Send an endpoint.url_validation challenge and check the receiver's answer
+    """
+    plain_token = secrets.token_urlsafe(16)
+    body = json.dumps({'event': URL_VALIDATION, 'payload': {'plainToken': plain_token}}).encode()
+    response = post_event(url, secret_token, body)
+    response.raise_for_status()
+    return response.json() == url_validation_response(secret_token, plain_token)
+
+
+def find_event_files(paths):
+    # Event files in the given files and directories, oldest first
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(glob.glob(os.path.join(path, '*.json')))
+        else:
+            files.append(path)
+    return sorted(files, key=os.path.basename)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay saved Zoom webhook events against the local receiver")
+    parser.add_argument('paths', nargs='*', default=[WEBHOOK_EVENTS_DIR],
+                        help="Event files or directories of them (default: %(default)s)")
+    parser.add_argument('--url', default=f"http://{WEBHOOK_HOST}:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+    parser.add_argument('--secret', default=ZOOM_WEBHOOK_SECRET_TOKEN, help="Secret token to sign the events with")
+    parser.add_argument('--validate', action='store_true', help="Check the URL validation challenge first")
+    args = parser.parse_args()
+
+    if args.validate:
+        print(f"URL validation: {'ok' if check_url_validation(args.url, args.secret) else 'FAILED'}")
+
+    for path in find_event_files(args.paths):
+        with open(path, 'rb') as event_file:
+            body = event_file.read()
+        response = post_event(args.url, args.secret, body)
+        print(f"{os.path.basename(path)}: {response.status_code}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+import multiprocessing
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from constants import (
+    USE_ASYNC_TRANSFERS,
+    PREFETCH_PARTICIPANTS,
+    SYNC_MAX_PROCESSES,
+)
+from DownloadZoomRecordingsDirectlyToGoogleDrive import (
+    ParticipantPrefetcher,
+    download_and_upload_recordings,
+    share_folder_lock,
+    warm_folder_cache,
+)
+from drive_service import build_drive_service, load_drive_credentials
+from transfer_manifest import TransferManifest
+from zoom_accounts import get_account, get_accounts
+
+
+def sync_user(account_name, user_id, share, min_size_mb=200):
+    """
+    Transfer one Zoom user's recordings to Google Drive; runs in a worker process
+
+    Args:
+        account_name (str): Key of the user's account in ZOOM_ACCOUNTS
+        user_id (str): Zoom user ID or email
+        share (int): Processes working on the same account at once; the
+            account's rate limits are split between them
+        min_size_mb (int): Minimum file size to transfer in MB
+
+    Returns:
+        tuple: (files uploaded, seconds taken)
+    """
+    started = time.monotonic()
+    account = get_account(account_name)
+    account.use_zoom_client(share)
+    access_token = account.get_access_token()
+
+    # Reconstruct Google Drive credentials
+    creds = load_drive_credentials()
+    manifest = TransferManifest()
+    participant_prefetcher = ParticipantPrefetcher(access_token) if PREFETCH_PARTICIPANTS else None
+
+    try:
+        if USE_ASYNC_TRANSFERS:
+            # Imported here because the engine builds on the direct-to-Drive script
+            from async_transfer import run_async_transfers
+
+            uploaded_file_ids = run_async_transfers(
+                access_token,
+                lambda: build_drive_service(creds),
+                min_size_mb=min_size_mb,
+                user_id=user_id,
+                manifest=manifest,
+                participant_prefetcher=participant_prefetcher,
+                course_index=account.course_index
+            )
+        else:
+            uploaded_file_ids = download_and_upload_recordings(
+                access_token,
+                build_drive_service(creds),
+                min_size_mb=min_size_mb,
+                manifest=manifest,
+                participant_prefetcher=participant_prefetcher,
+                user_id=user_id,
+                course_index=account.course_index
+            )
+
+        if participant_prefetcher:
+            participant_prefetcher.wait()
+    finally:
+        manifest.close()
+
+    return len(uploaded_file_ids), time.monotonic() - started
+
+
+def plan_sync_jobs(accounts):
+    """
+    List the users to sync in every account
+
+    Returns:
+        list: (account, user ID) pairs
+    """
+    jobs = []
+    for account in accounts:
+        account.use_zoom_client()
+        access_token = account.get_access_token()
+        user_ids = account.list_user_ids(access_token)
+        print(f"Account {account.name}: {len(user_ids)} users to sync")
+        jobs.extend((account, user_id) for user_id in user_ids)
+    return jobs
+
+
+def main():
+    accounts = get_accounts()
+    jobs = plan_sync_jobs(accounts)
+    if not jobs:
+        print("Nothing to sync.")
+        return
+
+    max_processes = SYNC_MAX_PROCESSES or os.cpu_count() or 1
+    users_per_account = Counter(account.name for account, _ in jobs)
+
+    # Create this month's folders once, before the workers race for them
+    share_folder_lock()
+    drive_service = build_drive_service(load_drive_credentials())
+    warm_folder_cache(drive_service, [account.course_mapping for account in accounts])
+
+    total_uploaded = 0
+    failed_users = []
+    # Spawned workers start clean instead of inheriting this process's threads and connections
+    with ProcessPoolExecutor(
+            max_workers=max_processes,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=share_folder_lock
+    ) as executor:
+        futures = {
+            executor.submit(
+                sync_user,
+                account.name,
+                user_id,
+                min(max_processes, users_per_account[account.name])
+            ): (account.name, user_id)
+            for account, user_id in jobs
+        }
+        for future in as_completed(futures):
+            account_name, user_id = futures[future]
+            try:
+                uploaded, seconds = future.result()
+            except Exception as e:
+                print(f"Error syncing {user_id} in {account_name}: {e}")
+                failed_users.append((account_name, user_id))
+                continue
+            total_uploaded += uploaded
+            print(f"Synced {user_id} in {account_name}: {uploaded} files in {seconds:.0f}s")
+
+    if failed_users:
+        print("\nFailed users:")
+        for account_name, user_id in failed_users:
+            print(f"{account_name}: {user_id}")
+
+    print(f"\nTotal recordings uploaded to Google Drive: {total_uploaded}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 import os, sys
 from commons import get_directory_files, upload_to_google_drive
+from transfer_manifest import TransferManifest
 
 
 def main():
@@ -13,12 +14,19 @@ def main():
     # Specify the Google Drive folder name
     folder_name = 'zoom2_recordings'
 
+    # Keeps the upload sessions, so a rerun resumes interrupted uploads
+    manifest = TransferManifest()
+
     # First, create the folder in Google Drive or get its ID
-    uploaded_files = upload_to_google_drive(
-        credentials_path,
-        files_to_upload,
-        folder_name=folder_name  # New parameter to specify folder creation/selection
-    )
+    try:
+        uploaded_files = upload_to_google_drive(
+            credentials_path,
+            files_to_upload,
+            folder_name=folder_name,  # New parameter to specify folder creation/selection
+            manifest=manifest
+        )
+    finally:
+        manifest.close()
     print(f"Total files uploaded: {len(uploaded_files)}")
 
 
@@ -0,0 +1,270 @@
+import abc
+import signal
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from constants import (
+    RECORDINGS_FROM_DATE,
+    USE_ASYNC_TRANSFERS,
+    CLEANUP_DRY_RUN,
+    METRICS_TEXTFILE_PATH,
+    METRICS_EXPORT_INTERVAL_SECONDS,
+    METRICS_PORT,
+    METRICS_HOST,
+    DAEMON_TRANSFER_INTERVAL_SECONDS,
+    DAEMON_CLEANUP_INTERVAL_SECONDS,
+    DAEMON_OVERLAP_DAYS,
+    DAEMON_MAX_ATTEMPTS,
+    DAEMON_MIN_SIZE_MB,
+)
+from commons import iter_recordings
+from DeleteZoomSmallRecordings_zoom2 import plan_cleanup, print_cleanup_plan, execute_cleanup
+from DownloadZoomRecordingsDirectlyToGoogleDrive import (
+    download_and_upload_recordings,
+    select_meeting_recordings,
+    warm_folder_cache,
+)
+from drive_service import build_drive_service, load_drive_credentials
+from metrics import TextfileExporter, start_metrics_server
+from transfer_manifest import STATUS_FAILED, TransferManifest
+from zoom_accounts import get_accounts
+
+
+def listing_start(watermark, overlap_days=DAEMON_OVERLAP_DAYS, earliest=RECORDINGS_FROM_DATE):
+    """
+    First day to list for a watermark
+
+    Args:
+        watermark (str): Start time (ISO 8601) up to which everything is
+            synced, or None if nothing was synced yet
+        overlap_days (int): Days listed again before the watermark
+        earliest (str): Day listed from when there is no watermark (yyyy-mm-dd)
+
+    Returns:
+        str: Day in yyyy-mm-dd format
+    """
+    if not watermark:
+        return earliest
+    start = datetime.strptime(watermark[:10], '%Y-%m-%d') - timedelta(days=overlap_days)
+    return max(start.strftime('%Y-%m-%d'), earliest)
+
+
+def is_processed(meeting):
+    """
+    True once Zoom has finished processing every file of the meeting
+    """
+    return all(recording.get('status', 'completed') == 'completed'
+               for recording in meeting.get('recording_files', []))
+
+
+def next_watermark(meetings, is_settled, listed_at, previous=None):
+    """
+    Advance a watermark past the listed meetings that need no more work
+
+    The watermark stops at the earliest meeting that is not settled yet, so
+    the next listing still covers it. If all are settled it moves to the
+    time the listing started; recordings Zoom finishes later are still
+    caught by the overlap, and a user without new recordings keeps a
+    listing window of constant size.
+
+    Args:
+        meetings (list): Meetings of the last listing
+        is_settled (callable): True for a meeting that needs no more work
+        listed_at (str): Time the listing started (ISO 8601, UTC)
+        previous (str, optional): Current watermark
+
+    Returns:
+        str: The new watermark, never earlier than ``previous``
+    """
+    unsettled = [meeting['start_time'] for meeting in meetings if not is_settled(meeting)]
+    watermark = min(unsettled) if unsettled else listed_at
+    if previous and watermark < previous:
+        return previous
+    return watermark
+
+
+class SyncJob(abc.ABC):
+    """
+    Lists each user's recordings from their watermark onwards and hands the
+    new window to ``run``.
+
+    Each (account, user) pair keeps its own watermark in the transfer
+    manifest, so a tick only lists the last ``DAEMON_OVERLAP_DAYS`` plus
+    whatever happened since the previous tick, however long the history.
+
+    The accounts are built once and shared by every job, so each keeps its
+    rate limiter, and the limits it has run into, from one tick to the next.
+    """
+    name = None
+
+    def __init__(self, interval, manifest, accounts):
+        self.interval = interval
+        self.manifest = manifest
+        self.accounts = accounts
+        self.next_run = 0
+
+    def is_settled(self, account, meeting):
+        return is_processed(meeting)
+
+    @abc.abstractmethod
+    def run(self, account, user_id, access_token, meetings):
+        """Process the meetings listed for one user since their watermark"""
+
+    def tick(self):
+        """
+        Sync every user of every account
+
+        A failing account or user is logged and skipped; the others still
+        run. A user whose sync fails keeps their watermark, so the next
+        tick covers the same window again.
+        """
+        for account in self.accounts:
+            try:
+                account.use_zoom_client()
+                access_token = account.get_access_token()
+                user_ids = account.list_user_ids(access_token)
+            except Exception as e:
+                print(f"Error listing users of {account.name} in {self.name} job: {e}")
+                continue
+
+            for user_id in user_ids:
+                try:
+                    self.sync_user(account, user_id, access_token)
+                except Exception as e:
+                    print(f"Error in {self.name} job for {account.name}/{user_id}: {e}")
+
+    def sync_user(self, account, user_id, access_token):
+        scope = f"{self.name}:{account.name}:{user_id}"
+        watermark = self.manifest.get_watermark(scope)
+        listed_at = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        meetings = list(iter_recordings(user_id, access_token, from_date=listing_start(watermark)))
+        self.run(account, user_id, access_token, meetings)
+
+        new_watermark = next_watermark(
+            meetings, lambda meeting: self.is_settled(account, meeting), listed_at, watermark)
+        if new_watermark != watermark:
+            self.manifest.set_watermark(scope, new_watermark)
+
+
+class TransferJob(SyncJob):
+    name = 'transfer'
+
+    def __init__(self, interval, manifest, accounts, drive_service, credentials,
+                 min_size_mb=DAEMON_MIN_SIZE_MB, max_attempts=DAEMON_MAX_ATTEMPTS):
+        super().__init__(interval, manifest, accounts)
+        self.drive_service = drive_service
+        self.credentials = credentials
+        self.min_size_mb = min_size_mb
+        self.max_attempts = max_attempts
+
+    def _gave_up(self, recording):
+        state = self.manifest.transfer_state(recording)
+        return state is not None and state[0] == STATUS_FAILED and state[1] >= self.max_attempts
+
+    def is_settled(self, account, meeting):
+        # Files that keep failing stop holding the watermark back after max_attempts
+        return is_processed(meeting) and all(
+            self._gave_up(recording)
+            for recording in select_meeting_recordings(
+                meeting, self.min_size_mb, self.manifest, account.course_index)
+        )
+
+    def run(self, account, user_id, access_token, meetings):
+        if USE_ASYNC_TRANSFERS:
+            # Imported here because the engine builds on the direct-to-Drive script
+            from async_transfer import run_async_transfers
+
+            uploaded_file_ids = run_async_transfers(
+                access_token,
+                lambda: build_drive_service(self.credentials),
+                min_size_mb=self.min_size_mb,
+                user_id=user_id,
+                manifest=self.manifest,
+                course_index=account.course_index,
+                meetings=meetings
+            )
+        else:
+            uploaded_file_ids = download_and_upload_recordings(
+                access_token,
+                self.drive_service,
+                min_size_mb=self.min_size_mb,
+                manifest=self.manifest,
+                user_id=user_id,
+                course_index=account.course_index,
+                meetings=meetings
+            )
+        print(f"{account.name}/{user_id}: uploaded {len(uploaded_file_ids)} files from {len(meetings)} meetings")
+
+
+class CleanupJob(SyncJob):
+    name = 'cleanup'
+
+    def __init__(self, interval, manifest, accounts, dry_run=CLEANUP_DRY_RUN):
+        super().__init__(interval, manifest, accounts)
+        self.dry_run = dry_run
+        # A dry run keeps its own watermark, so turning it off still covers the meetings it only printed
+        if dry_run:
+            self.name = 'cleanup-dry-run'
+
+    def run(self, account, user_id, access_token, meetings):
+        actions = plan_cleanup(meetings)
+        print_cleanup_plan(actions)
+        if actions and not self.dry_run:
+            execute_cleanup(actions, access_token)
+
+
+def run_jobs(jobs, stop):
+    """
+    Run every job whenever its interval has passed, until ``stop`` is set
+
+    Jobs run one after another in this thread, so a transfer and a cleanup
+    never work on the same user at the same time. A failing tick is logged
+    and retried at the job's next interval.
+    """
+    while not stop.is_set():
+        for job in jobs:
+            if stop.is_set() or time.monotonic() < job.next_run:
+                continue
+            print(f"Running {job.name} job ({datetime.now().isoformat(timespec='seconds')})")
+            try:
+                job.tick()
+            except Exception as e:
+                print(f"Error in {job.name} job: {e}")
+            job.next_run = time.monotonic() + job.interval
+        stop.wait(max(0, min(job.next_run for job in jobs) - time.monotonic()))
+
+
+def main():
+    # Optional metrics export, scraped for the lifetime of the daemon
+    metrics_server = start_metrics_server(METRICS_PORT, METRICS_HOST) if METRICS_PORT else None
+    metrics_exporter = (TextfileExporter(METRICS_TEXTFILE_PATH, METRICS_EXPORT_INTERVAL_SECONDS).start()
+                        if METRICS_TEXTFILE_PATH else None)
+
+    creds = load_drive_credentials()
+    drive_service = build_drive_service(creds)
+    accounts = get_accounts()
+    warm_folder_cache(drive_service, [account.course_mapping for account in accounts])
+    manifest = TransferManifest()
+
+    jobs = [TransferJob(DAEMON_TRANSFER_INTERVAL_SECONDS, manifest, accounts, drive_service, creds)]
+    if DAEMON_CLEANUP_INTERVAL_SECONDS:
+        jobs.append(CleanupJob(DAEMON_CLEANUP_INTERVAL_SECONDS, manifest, accounts))
+
+    # Finish the current tick and exit on Ctrl-C or SIGTERM
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    signal.signal(signal.SIGINT, lambda signum, frame: stop.set())
+
+    try:
+        run_jobs(jobs, stop)
+    finally:
+        print(f"Transfer manifest: {manifest.summary()}")
+        manifest.close()
+        if metrics_exporter:
+            metrics_exporter.stop()
+        if metrics_server:
+            metrics_server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+from constants import (
+    ZOOM_WEBHOOK_SECRET_TOKEN,
+    WEBHOOK_HOST,
+    WEBHOOK_PORT,
+    WEBHOOK_PATH,
+    WEBHOOK_MIN_SIZE_MB,
+)
+from DownloadZoomRecordingsDirectlyToGoogleDrive import download_and_upload_recordings
+from drive_service import build_drive_service, load_drive_credentials
+from transfer_manifest import TransferManifest
+from zoom_accounts import find_account
+from zoom_webhooks import RecordingEventQueue, create_app
+
+
+def make_meeting_transfer(drive_service, manifest, min_size_mb=WEBHOOK_MIN_SIZE_MB):
+    """
+    Build the function the event queue calls for every completed meeting
+
+    The meeting's files go through the same streamed, verified transfer as a
+    full sync, filed by the course mapping of the account that sent the
+    event. Only the event queue's thread calls it, so the Drive service and
+    the Zoom client are never shared between threads.
+    """
+    current = {'account': None}
+
+    def transfer_meeting(account_id, meeting):
+        account = find_account(account_id)
+        if account is None:
+            print(f"Ignoring recording from unknown Zoom account {account_id}")
+            return
+        if current['account'] is None or current['account'].name != account.name:
+            account.use_zoom_client()
+            current['account'] = account
+
+        uploaded_file_ids = download_and_upload_recordings(
+            account.get_access_token(),
+            drive_service,
+            min_size_mb=min_size_mb,
+            manifest=manifest,
+            course_index=account.course_index,
+            meetings=[meeting]
+        )
+        print(f"Uploaded {len(uploaded_file_ids)} files of {meeting.get('topic')}")
+
+    return transfer_meeting
+
+
+def main():
+    if not ZOOM_WEBHOOK_SECRET_TOKEN:
+        raise SystemExit("Set ZOOM_WEBHOOK_SECRET_TOKEN in constants.py to the event subscription's secret token")
+
+    # Built here, used only on the event queue's thread
+    drive_service = build_drive_service(load_drive_credentials())
+    manifest = TransferManifest()
+
+    events = RecordingEventQueue(make_meeting_transfer(drive_service, manifest)).start()
+    app = create_app(ZOOM_WEBHOOK_SECRET_TOKEN, events.submit)
+
+    print(f"Listening for Zoom webhooks on http://{WEBHOOK_HOST}:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+    try:
+        app.run(host=WEBHOOK_HOST, port=WEBHOOK_PORT, threaded=True)
+    finally:
+        events.stop()
+        print(f"Transfer manifest: {manifest.summary()}")
+        manifest.close()
+
+
+if __name__ == "__main__":
+    main()
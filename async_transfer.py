@@ -0,0 +1,506 @@
+# Concurrent Zoom -> Google Drive transfers on asyncio
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+from googleapiclient.errors import HttpError
+
+import requests
+
+from commons import iter_batches, iter_recordings, open_recording_chunks
+from constants import (
+    DOWNLOAD_CHUNK_SIZE,
+    STREAM_CHUNK_SIZE_MB,
+    ZOOM_DOWNLOAD_CONCURRENCY,
+    DRIVE_UPLOAD_CONCURRENCY,
+    FOLDER_PREFETCH_BATCH_SIZE,
+    RANGED_DOWNLOAD_THRESHOLD_MB,
+    VERIFY_MAX_ATTEMPTS,
+)
+from checksums import UNVERIFIED, StreamChecksum, verify_transfer, with_checksum_fields
+from drive_streaming import TruncatedStreamError, open_upload_session, upload_stream_to_drive
+from metrics import API_CALLS, API_SECONDS, BYTES_TRANSFERRED, FILES_PROCESSED, FILE_SECONDS, RETRIES
+from DownloadZoomRecordingsDirectlyToGoogleDrive import (
+    delete_drive_file,
+    is_missing_folder_error,
+    plan_meeting_transfers,
+    prefetch_meeting_folders,
+    print_failed_uploads,
+    print_unverified_uploads,
+    refresh_transfer_folder,
+)
+from recording_policy import print_policy_savings
+from staging import get_staging_area, upload_staged_recording
+from transfer_manifest import recording_key
+from zoom_client import RETRY_STATUS_CODES, get_zoom_client
+
+# Download chunks buffered between the Zoom stream and the Drive upload, per file
+CHUNK_QUEUE_SIZE = 4
+
+
+class AsyncDriveClient:
+    """
+    Runs blocking Drive calls on a thread pool so they can be awaited.
+
+    httplib2 connections are not thread-safe, so each worker thread builds
+    and keeps its own Drive service from ``service_factory``.
+    """
+
+    def __init__(self, service_factory, max_workers):
+        self._service_factory = service_factory
+        self._local = threading.local()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='drive')
+
+    def _service(self):
+        service = getattr(self._local, 'service', None)
+        if service is None:
+            service = self._local.service = self._service_factory()
+        return service
+
+    async def run(self, func, *args):
+        """
+        Call ``func(drive_service, *args)`` on a worker thread and await the result
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: func(self._service(), *args))
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+class _ChunkBridge:
+    """
+    Iterator handed to the Drive upload thread that pulls download chunks
+    from an asyncio queue filled on the event loop.
+    """
+
+    def __init__(self, chunk_queue, loop):
+        self._queue = chunk_queue
+        self._loop = loop
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        item = asyncio.run_coroutine_threadsafe(self._queue.get(), self._loop).result()
+        if item is None:
+            raise StopIteration
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+
+class AsyncTransferEngine:
+    """
+    Transfers many recordings at once with separate limits for Zoom and Drive.
+
+    A streamed transfer pipes its Zoom download straight into a chunked
+    Drive upload, so it holds one download slot and one upload slot while
+    it runs. With staging, the download holds only a download slot until
+    the spill file is written, and the upload, like every other Drive call,
+    only an upload slot. Folder resolution and uploads run on the Drive
+    executor; downloads use a shared pooled async HTTP client, with the
+    retries and metrics of ZoomClient.
+    """
+
+    def __init__(
+            self,
+            access_token,
+            drive_service_factory,
+            zoom_concurrency=ZOOM_DOWNLOAD_CONCURRENCY,
+            drive_concurrency=DRIVE_UPLOAD_CONCURRENCY,
+            buffer_size_mb=STREAM_CHUNK_SIZE_MB,
+            manifest=None,
+            participant_prefetcher=None,
+            course_index=None,
+            verify_attempts=VERIFY_MAX_ATTEMPTS
+    ):
+        self.access_token = access_token
+        self.drive_service_factory = drive_service_factory
+        self.zoom_concurrency = zoom_concurrency
+        self.drive_concurrency = drive_concurrency
+        self.buffer_size_mb = buffer_size_mb
+        self.manifest = manifest
+        self.participant_prefetcher = participant_prefetcher
+        self.course_index = course_index
+
+        self.verify_attempts = verify_attempts
+
+        self.uploaded_file_ids = []
+        self.failed_uploads = []
+        self.unverified_uploads = []
+        # Redundant files the selection policy kept from being transferred
+        self.dropped_recordings = []
+        # Recordings whose spill file is being written under a download slot
+        self._filling = set()
+
+    async def _pump(self, response, chunk_queue):
+        # Feed download chunks to the upload thread, then signal the end
+        try:
+            async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                BYTES_TRANSFERRED.inc(len(chunk), direction='download')
+                await chunk_queue.put(chunk)
+        except Exception as e:
+            await chunk_queue.put(e)
+            return
+        await chunk_queue.put(None)
+
+    def _restore_session(self, drive_service, recording):
+        return open_upload_session(drive_service, self.manifest, recording_key(recording), recording.get('file_size'))
+
+    async def _open_download(self, url, headers):
+        # Retried and counted like ZoomClient's downloads; like those, not rate limited
+        zoom_client = get_zoom_client()
+        attempt = 0
+        while True:
+            started = time.monotonic()
+            try:
+                response = await self._http.send(self._http.build_request('GET', url, headers=headers), stream=True)
+            except httpx.TransportError as e:
+                API_CALLS.inc(service='zoom', endpoint='download', result=type(e).__name__)
+                if attempt >= zoom_client.max_retries:
+                    raise
+                RETRIES.inc(service='zoom', reason='connection')
+                delay = zoom_client.backoff(attempt)
+                print(f"Zoom download failed ({e}); retrying in {delay:.1f}s...")
+            else:
+                API_SECONDS.observe(time.monotonic() - started, service='zoom', endpoint='download')
+                API_CALLS.inc(service='zoom', endpoint='download',
+                              result='ok' if response.is_success else str(response.status_code))
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= zoom_client.max_retries:
+                    return response
+                await response.aclose()
+                RETRIES.inc(service='zoom', reason=str(response.status_code))
+                delay = zoom_client.backoff(attempt)
+                print(f"Zoom returned {response.status_code} for GET {url}; retrying in {delay:.1f}s...")
+
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _stream(self, recording, file_metadata, mimetype, headers, checksum, session=None):
+        # Async download piped into the upload thread through a bounded queue
+        offset = session.offset if session else 0
+        if offset:
+            headers = dict(headers, Range=f"bytes={offset}-")
+        response = await self._open_download(recording['download_url'], headers)
+        try:
+            response.raise_for_status()
+            if offset and response.status_code != 206:
+                raise ValueError(f"Server ignored the Range header for {recording['download_url']}")
+
+            loop = asyncio.get_running_loop()
+            chunk_queue = asyncio.Queue(maxsize=CHUNK_QUEUE_SIZE)
+            pump = asyncio.create_task(self._pump(response, chunk_queue))
+            chunks = checksum.wrap(_ChunkBridge(chunk_queue, loop))
+            try:
+                return await self._drive.run(
+                    lambda drive_service: upload_stream_to_drive(
+                        drive_service,
+                        chunks,
+                        file_metadata,
+                        mimetype,
+                        recording.get('file_size'),
+                        self.buffer_size_mb,
+                        session=session
+                    )
+                )
+            finally:
+                pump.cancel()
+        finally:
+            await response.aclose()
+
+    def _upload_ranged(self, drive_service, recording, file_metadata, mimetype, checksum, session=None):
+        offset = session.offset if session else 0
+        with open_recording_chunks(recording, self.access_token, offset) as chunks:
+            return upload_stream_to_drive(
+                drive_service,
+                checksum.wrap(chunks),
+                file_metadata,
+                mimetype,
+                recording.get('file_size'),
+                self.buffer_size_mb,
+                session=session
+            )
+
+    async def _fill_staged(self, key, staged, recording):
+        # Holds a download slot only while Zoom writes the spill file
+        if key in self._filling:
+            return
+        self._filling.add(key)
+        try:
+            async with self._zoom_slots:
+                staged.download(lambda start: open_recording_chunks(recording, self.access_token, start))
+                await asyncio.get_running_loop().run_in_executor(None, staged.wait)
+        finally:
+            self._filling.discard(key)
+
+    async def _upload_staged(self, recording, file_metadata, mimetype, staging, session=None):
+        # Ranged download into a spill file under a download slot, uploaded from it under an upload slot
+        key = recording_key(recording)
+        staged = staging.acquire(key, recording.get('file_size'), session.offset if session else 0)
+        if staged is None:
+            return None, None
+
+        loop = asyncio.get_running_loop()
+
+        def download():
+            # Called again from the upload thread when an attempt fails
+            asyncio.run_coroutine_threadsafe(self._fill_staged(key, staged, recording), loop)
+
+        # The download starts while the upload still waits for its slot
+        download()
+        try:
+            async with self._drive_slots:
+                file = await self._drive.run(
+                    lambda drive_service: upload_staged_recording(
+                        drive_service,
+                        staged,
+                        download,
+                        file_metadata,
+                        mimetype,
+                        self.buffer_size_mb,
+                        session,
+                        lambda: self._restore_session(drive_service, recording)
+                    )
+                )
+        finally:
+            # Kept for the next attempt, or for a new upload if the copy does not verify
+            staging.release(key)
+        return file, staged.checksum
+
+    async def _transfer_once(self, transfer):
+        # One attempt at streaming the recording into Drive, hashing it on the way
+        recording = transfer['recording']
+        file_metadata = {
+            'name': transfer['filename'],
+            'parents': [transfer['folder_id']]
+        }
+        headers = {"Authorization": f"Bearer {self.access_token}"}
+
+        # Continue an upload an earlier run left unfinished
+        async with self._drive_slots:
+            session = await self._drive.run(self._restore_session, recording)
+        if session and session.file:
+            return session.file, StreamChecksum(offset=recording.get('file_size') or 0)
+
+        staging = get_staging_area()
+        if staging:
+            file, checksum = await self._upload_staged(
+                recording, file_metadata, transfer['mimetype'], staging, session)
+            if file is not None:
+                return file, checksum
+
+        checksum = StreamChecksum(offset=session.offset if session else 0)
+        # The download feeds the upload directly, so a streamed file holds a slot of each throughout
+        async with self._drive_slots, self._zoom_slots:
+            if (recording.get('file_size') or 0) >= RANGED_DOWNLOAD_THRESHOLD_MB * 1024 * 1024:
+                # Large file: ranged download over several connections, on the upload thread
+                file = await self._drive.run(
+                    self._upload_ranged, recording, file_metadata, transfer['mimetype'], checksum, session)
+            else:
+                file = await self._stream(recording, file_metadata, transfer['mimetype'], headers, checksum, session)
+        return file, checksum
+
+    async def _transfer_verified(self, transfer):
+        # Retry copies that don't match what Zoom served; keep the last one as unverified
+        recording = transfer['recording']
+        staging = get_staging_area()
+        for attempt in range(1, self.verify_attempts + 1):
+            try:
+                try:
+                    file, checksum = await self._transfer_once(transfer)
+                except HttpError as e:
+                    if not is_missing_folder_error(e):
+                        raise
+                    # The course folder was deleted since it was cached; upload into the new one
+                    async with self._drive_slots:
+                        await self._drive.run(refresh_transfer_folder, transfer)
+                    file, checksum = await self._transfer_once(transfer)
+            except TruncatedStreamError as e:
+                if attempt == self.verify_attempts:
+                    raise
+                print(f"Download of {transfer['filename']} ended early ({e}); retrying...")
+                continue
+
+            async with self._drive_slots:
+                file = await self._drive.run(with_checksum_fields, file)
+            verification, problem = verify_transfer(file, checksum, recording.get('file_size'))
+            FILES_PROCESSED.inc(stage='verify', outcome=verification)
+            if verification != UNVERIFIED or attempt == self.verify_attempts:
+                if staging:
+                    staging.discard(recording_key(recording))
+                return file, checksum, verification
+
+            print(f"Drive copy of {transfer['filename']} does not match ({problem}); retrying...")
+            async with self._drive_slots:
+                await self._drive.run(delete_drive_file, file['id'])
+
+    async def transfer(self, transfer):
+        """
+        Stream one planned recording from Zoom into Google Drive
+        """
+        recording = transfer['recording']
+        filename = transfer['filename']
+
+        if self.manifest:
+            self.manifest.mark_started(recording, transfer['meeting_uuid'], filename)
+
+        try:
+            # Each step takes the download and upload slots it needs itself
+            started = time.monotonic()
+            file, checksum, verification = await self._transfer_verified(transfer)
+
+            self.uploaded_file_ids.append(file.get('id'))
+            FILE_SECONDS.observe(time.monotonic() - started, stage='transfer')
+            FILES_PROCESSED.inc(stage='transfer', outcome='done')
+            if verification == UNVERIFIED:
+                self.unverified_uploads.append((filename, file.get('id')))
+            if self.manifest:
+                self.manifest.mark_done(recording, file.get('id'), verification, checksum.md5, checksum.sha256)
+            # Not every listed file carries a size
+            file_size_mb = (recording.get('file_size') or 0) / (1024 * 1024)
+            print(f"Uploaded: {filename} to {transfer['folder_path']} "
+                  f"(Size: {file_size_mb:.2f} MB, {verification})")
+
+        except (httpx.HTTPError, requests.RequestException) as e:
+            print(f"Error downloading {filename}: {e}")
+            self._record_failure(recording, filename, "Download Error", e)
+        except HttpError as e:
+            print(f"Error uploading {filename} to Google Drive: {e}")
+            self._record_failure(recording, filename, "Upload Error", e)
+        except Exception as e:
+            print(f"Unexpected error with {filename}: {e}")
+            self._record_failure(recording, filename, "Unexpected Error", e)
+
+    def _record_failure(self, recording, filename, error_type, error):
+        self.failed_uploads.append((filename, error_type))
+        FILES_PROCESSED.inc(stage='transfer', outcome='failed')
+        if self.manifest:
+            self.manifest.mark_failed(recording, error)
+
+    async def process_meeting(self, meeting, min_size_mb):
+        """
+        Plan one meeting's transfers, then run them concurrently
+        """
+        try:
+            # plan_meeting_transfers takes the meeting before the Drive service
+            transfers = await self._drive.run(
+                lambda drive_service: plan_meeting_transfers(
+                    meeting, drive_service, min_size_mb, self.manifest, self.course_index,
+                    self.dropped_recordings)
+            )
+        except Exception as e:
+            print(f"Error processing meeting: {e}")
+            return
+
+        await asyncio.gather(*(self.transfer(transfer) for transfer in transfers))
+
+    async def run(self, meetings, min_size_mb=20):
+        """
+        Transfer the recordings of every meeting in ``meetings``
+
+        ``meetings`` may be a lazy iterator (e.g. iter_recordings); it is
+        consumed off the event loop in batches, and each batch starts as soon
+        as its folders are resolved.
+
+        Returns:
+            list: File IDs of uploaded files
+        """
+        self._zoom_slots = asyncio.Semaphore(self.zoom_concurrency)
+        self._drive_slots = asyncio.Semaphore(self.drive_concurrency)
+        # Extra threads so folder lookups are not starved by running uploads
+        self._drive = AsyncDriveClient(self.drive_service_factory, self.drive_concurrency + 2)
+        limits = httpx.Limits(max_connections=self.zoom_concurrency, max_keepalive_connections=self.zoom_concurrency)
+        timeout = httpx.Timeout(60.0, connect=10.0)
+
+        loop = asyncio.get_running_loop()
+        meeting_batches = iter_batches(meetings, FOLDER_PREFETCH_BATCH_SIZE)
+        done = object()
+        tasks = []
+
+        try:
+            async with httpx.AsyncClient(limits=limits, timeout=timeout, follow_redirects=True) as self._http:
+                while True:
+                    meeting_batch = await loop.run_in_executor(None, next, meeting_batches, done)
+                    if meeting_batch is done:
+                        break
+
+                    # Resolve the whole batch's folders with a few batched Drive calls
+                    try:
+                        await self._drive.run(prefetch_meeting_folders, meeting_batch, min_size_mb,
+                                              self.manifest, self.course_index)
+                    except Exception as e:
+                        print(f"Error prefetching folders: {e}")
+
+                    for meeting in meeting_batch:
+                        if self.participant_prefetcher:
+                            self.participant_prefetcher.submit(meeting)
+                        tasks.append(asyncio.create_task(self.process_meeting(meeting, min_size_mb)))
+
+                await asyncio.gather(*tasks)
+        finally:
+            self._drive.shutdown()
+
+        return self.uploaded_file_ids
+
+
+def run_async_transfers(
+        access_token,
+        drive_service_factory,
+        min_size_mb=20,
+        user_id='me',
+        zoom_concurrency=ZOOM_DOWNLOAD_CONCURRENCY,
+        drive_concurrency=DRIVE_UPLOAD_CONCURRENCY,
+        buffer_size_mb=STREAM_CHUNK_SIZE_MB,
+        manifest=None,
+        participant_prefetcher=None,
+        course_index=None,
+        meetings=None
+):
+    """
+    Concurrent counterpart of download_and_upload_recordings
+
+    Args:
+        access_token (str): Zoom API access token
+        drive_service_factory (callable): Returns a new Google Drive service;
+            called once per Drive worker thread
+        min_size_mb (int): Minimum file size to transfer in MB
+        user_id (str): Zoom user whose recordings are transferred
+        zoom_concurrency (int): Maximum simultaneous Zoom downloads
+        drive_concurrency (int): Maximum simultaneous Drive uploads
+        buffer_size_mb (int): Drive upload chunk size in MB per file
+        manifest (TransferManifest, optional): Skips recordings already transferred
+            and records the outcome of every attempt
+        participant_prefetcher (ParticipantPrefetcher, optional): Receives every
+            listed meeting to look up its participants in the background
+        course_index (CourseIndex, optional): Compiled course mapping of the
+            user's account; defaults to COURSE_MAPPING_ZOOM2
+        meetings (iterable, optional): Meetings to transfer instead of listing
+            the user's recordings
+
+    Returns:
+        list: File IDs of uploaded files
+    """
+    if meetings is None:
+        meetings = iter_recordings(user_id, access_token)
+
+    engine = AsyncTransferEngine(
+        access_token,
+        drive_service_factory,
+        zoom_concurrency=zoom_concurrency,
+        drive_concurrency=drive_concurrency,
+        buffer_size_mb=buffer_size_mb,
+        manifest=manifest,
+        participant_prefetcher=participant_prefetcher,
+        course_index=course_index
+    )
+    uploaded_file_ids = asyncio.run(engine.run(meetings, min_size_mb))
+
+    # Print summary of failed and unverified uploads, and what the selection policy saved
+    print_failed_uploads(engine.failed_uploads)
+    print_unverified_uploads(engine.unverified_uploads)
+    print_policy_savings(engine.dropped_recordings)
+
+    return uploaded_file_ids
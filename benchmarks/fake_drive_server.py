@@ -0,0 +1,268 @@
+# Local stand-in for the Google Drive endpoints the scripts call through googleapiclient
+import email.parser
+import hashlib
+import itertools
+import json
+import re
+import threading
+from urllib.parse import urlsplit, parse_qs
+
+from googleapiclient.discovery import build_from_document
+from googleapiclient.http import build_http
+
+from benchmarks.fake_http import FakeServer, read_body, send, send_json
+from drive_service import get_drive_discovery_document
+
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+
+FILE_PATH = re.compile(r'^/drive/v3/files/([^/]+)$')
+CONTENT_RANGE = re.compile(r'^bytes (?:(\d+)-(\d+)|\*)/(\d+|\*)$')
+QUERY_NAME = re.compile(r"name\s*=\s*'((?:[^'\\]|\\.)*)'")
+QUERY_MIME_TYPE = re.compile(r"mimeType\s*=\s*'([^']*)'")
+QUERY_PARENT = re.compile(r"'([^']*)'\s+in\s+parents")
+
+
+def _unescape(value):
+    return re.sub(r'\\(.)', r'\1', value)
+
+
+def build_drive_service(base_url):
+    """
+    Google Drive service that talks to a fake Drive server at ``base_url``
+    instead of Google, built from the bundled discovery document
+    """
+    document = get_drive_discovery_document()
+    document['rootUrl'] = f"{base_url}/"
+    document['baseUrl'] = f"{base_url}/drive/v3/"
+    # build_http leaves 308 responses to the resumable upload code
+    return build_from_document(document, http=build_http())
+
+
+class _Upload:
+    # Resumable upload session: metadata plus what has been received so far
+    def __init__(self, metadata):
+        self.metadata = metadata
+        self.received = 0
+        self.md5 = hashlib.md5()
+        self.lock = threading.Lock()
+        # The created file, once the last byte is in
+        self.file = None
+
+
+class FakeDriveServer(FakeServer):
+    """
+    Serves the Drive v3 files list/get/create/update/delete calls, simple,
+    multipart and resumable uploads, and the batch endpoint.
+
+    Uploaded content is not kept; the server only records each file's size
+    and MD5 checksum, as Drive reports them. ``drive_service()`` builds a
+    googleapiclient service bound to this server.
+    """
+
+    def __init__(self, latency=0.0):
+        super().__init__(latency)
+        self.files = {}
+        self._uploads = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def drive_service(self):
+        return build_drive_service(self.base_url)
+
+    def _new_id(self, prefix):
+        with self._lock:
+            return f"{prefix}{next(self._ids):06d}"
+
+    def handle(self, handler, method, path, query):
+        body = read_body(handler)
+
+        if path == '/batch/drive/v3' and method == 'POST':
+            self.count('batch')
+            self._batch(handler, body)
+            return
+
+        if path == '/upload/drive/v3/files':
+            self._upload(handler, method, query, body)
+            return
+
+        status, payload = self.call(method, path, query, body)
+        if payload is None:
+            send(handler, status)
+        else:
+            send_json(handler, status, payload)
+
+    def call(self, method, path, query, body):
+        """
+        Handle one metadata call (directly or from inside a batch)
+
+        Returns:
+            tuple: (HTTP status, JSON payload)
+        """
+        if path == '/drive/v3/files' and method == 'GET':
+            self.count('files.list')
+            return 200, self._list(query)
+
+        if path == '/drive/v3/files' and method == 'POST':
+            self.count('files.create')
+            return 200, self._create(json.loads(body or b'{}'))
+
+        match = FILE_PATH.match(path)
+        if match and match.group(1) in self.files:
+            file = self.files[match.group(1)]
+            if method == 'GET':
+                self.count('files.get')
+                return 200, file
+            if method == 'PATCH':
+                self.count('files.update')
+                with self._lock:
+                    file.update(json.loads(body or b'{}'))
+                return 200, file
+            if method == 'DELETE':
+                self.count('files.delete')
+                with self._lock:
+                    del self.files[match.group(1)]
+                return 204, None
+
+        self.count('unknown')
+        return 404, {'error': {'code': 404, 'message': f"No fake for {method} {path}"}}
+
+    def _list(self, query):
+        q = query.get('q', '')
+        name = QUERY_NAME.search(q)
+        mime_type = QUERY_MIME_TYPE.search(q)
+        parent = QUERY_PARENT.search(q)
+        with self._lock:
+            files = [
+                file for file in self.files.values()
+                if (not name or file['name'] == _unescape(name.group(1)))
+                and (not mime_type or file['mimeType'] == mime_type.group(1))
+                and (not parent or parent.group(1) in file.get('parents', []))
+            ]
+
+        page_size = int(query.get('pageSize', 100))
+        offset = int(query.get('pageToken') or 0)
+        response = {'files': files[offset:offset + page_size]}
+        if offset + page_size < len(files):
+            response['nextPageToken'] = str(offset + page_size)
+        return response
+
+    def _create(self, metadata, size=None, md5_checksum=None):
+        file = {
+            'id': self._new_id('folder' if metadata.get('mimeType') == FOLDER_MIME_TYPE else 'file'),
+            'name': metadata.get('name', 'Untitled'),
+            'mimeType': metadata.get('mimeType', 'application/octet-stream'),
+            'parents': metadata.get('parents', []),
+        }
+        if size is not None:
+            file['size'] = str(size)
+            file['md5Checksum'] = md5_checksum
+        with self._lock:
+            self.files[file['id']] = file
+        return file
+
+    def _upload(self, handler, method, query, body):
+        upload_type = query.get('uploadType')
+
+        if method == 'POST' and upload_type == 'media':
+            self.count('upload.simple')
+            self.count('bytes_received', len(body))
+            send_json(handler, 200, self._create({}, len(body), hashlib.md5(body).hexdigest()))
+            return
+
+        if method == 'POST' and upload_type == 'multipart':
+            self.count('upload.multipart')
+            metadata, content = self._split_multipart(handler.headers['Content-Type'], body)
+            self.count('bytes_received', len(content))
+            send_json(handler, 200, self._create(metadata, len(content), hashlib.md5(content).hexdigest()))
+            return
+
+        if method == 'POST' and upload_type == 'resumable':
+            self.count('upload.start')
+            upload_id = self._new_id('upload')
+            self._uploads[upload_id] = _Upload(json.loads(body or b'{}'))
+            location = f"{self.base_url}/upload/drive/v3/files?uploadType=resumable&upload_id={upload_id}"
+            send(handler, 200, headers={'Location': location})
+            return
+
+        if method == 'PUT' and upload_type == 'resumable' and query.get('upload_id') in self._uploads:
+            # An empty PUT with "bytes */<total>" asks how far the upload got
+            is_status_query = handler.headers.get('Content-Range', '').startswith('bytes */')
+            self.count('upload.status' if is_status_query else 'upload.chunk')
+            self._upload_chunk(handler, query['upload_id'], body)
+            return
+
+        self.count('unknown')
+        send_json(handler, 404, {'error': {'code': 404, 'message': 'Unknown upload'}})
+
+    def _upload_chunk(self, handler, upload_id, body):
+        upload = self._uploads[upload_id]
+        match = CONTENT_RANGE.match(handler.headers.get('Content-Range', ''))
+        if not match:
+            send_json(handler, 400, {'error': {'code': 400, 'message': 'Bad Content-Range'}})
+            return
+        start, end, total = match.groups()
+
+        with upload.lock:
+            if upload.file is not None:
+                # Completed sessions answer every request with the file
+                send_json(handler, 200, upload.file)
+                return
+            # A chunk that doesn't continue where the upload stands is out of order
+            if start is not None and int(start) != upload.received:
+                send_json(handler, 400, {'error': {'code': 400, 'message': 'Chunk out of order'}})
+                return
+            if body:
+                upload.md5.update(body)
+                upload.received += len(body)
+                self.count('bytes_received', len(body))
+            if total == '*' or upload.received < int(total):
+                headers = {'Range': f"bytes=0-{upload.received - 1}"} if upload.received else {}
+                send(handler, 308, headers=headers)
+                return
+
+            upload.file = self._create(upload.metadata, upload.received, upload.md5.hexdigest())
+        send_json(handler, 200, upload.file)
+
+    @staticmethod
+    def _split_multipart(content_type, body):
+        # multipart/related body: JSON metadata part, then the media part
+        boundary = re.search(r'boundary="?([^";]+)"?', content_type).group(1).encode()
+        parts = body.split(b'--' + boundary)
+        metadata_part, media_part = parts[1], parts[-2]
+        # Line breaks are taken from the metadata part; the media may contain any bytes
+        linesep = b'\r\n' if b'\r\n\r\n' in metadata_part else b'\n'
+        metadata = json.loads(metadata_part.split(linesep * 2, 1)[1])
+        content = media_part.split(linesep * 2, 1)[1]
+        # Drop the line break that precedes the closing boundary
+        if content.endswith(linesep):
+            content = content[:-len(linesep)]
+        return metadata, content
+
+    def _batch(self, handler, body):
+        content_type = handler.headers['Content-Type']
+        message = email.parser.BytesParser().parsebytes(
+            f"Content-Type: {content_type}\r\n\r\n".encode() + body)
+
+        boundary = f"batch_{self._new_id('')}"
+        response_parts = []
+        for part in message.get_payload():
+            request = part.get_payload()
+            request_line, rest = request.split('\n', 1)
+            inner_method, target, _ = request_line.strip().split(' ', 2)
+            inner_body = re.split(r'\r?\n\r?\n', rest, maxsplit=1)[1] if re.search(r'\r?\n\r?\n', rest) else ''
+            parts = urlsplit(target)
+            query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+
+            status, payload = self.call(inner_method, parts.path, query, inner_body.encode())
+            content_id = part['Content-ID'].strip('<>')
+            response_parts.append(
+                f"--{boundary}\r\n"
+                f"Content-Type: application/http\r\n"
+                f"Content-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                f"Content-Type: application/json; charset=UTF-8\r\n\r\n"
+                f"{'' if payload is None else json.dumps(payload)}\r\n"
+            )
+
+        response = ''.join(response_parts) + f"--{boundary}--\r\n"
+        send(handler, 200, response.encode(), content_type=f"multipart/mixed; boundary={boundary}")
@@ -0,0 +1,139 @@
+# Shared plumbing for the local stand-in servers used by the benchmarks
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+# Size of the pieces throttled downloads are written in
+WRITE_CHUNK_SIZE = 64 * 1024
+
+
+class FakeRequestHandler(BaseHTTPRequestHandler):
+    # Keep-alive, like the real APIs, so connection pooling is measured too
+    protocol_version = 'HTTP/1.1'
+
+    def _dispatch(self):
+        parts = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        self.server.owner.dispatch(self, self.command, parts.path, query)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _dispatch
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeServer:
+    """
+    Threaded HTTP server on a free local port, served from a background thread.
+
+    Subclasses implement ``handle(handler, method, path, query)``. Every call
+    is counted per endpoint name, and every request waits ``latency``
+    seconds first to stand in for the round trip to the real service.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = Counter()
+        self._calls_lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', 0), FakeRequestHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.owner = self
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, endpoint, amount=1):
+        with self._calls_lock:
+            self.calls[endpoint] += amount
+
+    def reset_counts(self):
+        with self._calls_lock:
+            self.calls.clear()
+
+    def dispatch(self, handler, method, path, query):
+        if self.latency:
+            time.sleep(self.latency)
+        try:
+            self.handle(handler, method, path, query)
+        except ConnectionError:
+            # The client hung up mid-response, e.g. a cancelled download
+            pass
+
+    def handle(self, handler, method, path, query):
+        raise NotImplementedError
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+def read_body(handler):
+    """
+    Read the request body, plain or chunked
+    """
+    if handler.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+        body = bytearray()
+        while True:
+            size = int(handler.rfile.readline().split(b';')[0], 16)
+            if not size:
+                handler.rfile.readline()
+                return bytes(body)
+            body += handler.rfile.read(size)
+            handler.rfile.readline()
+    length = int(handler.headers.get('Content-Length') or 0)
+    return handler.rfile.read(length) if length else b''
+
+
+def send(handler, status, body=b'', headers=None, content_type=None):
+    handler.send_response(status)
+    if content_type:
+        handler.send_header('Content-Type', content_type)
+    for name, value in (headers or {}).items():
+        handler.send_header(name, value)
+    handler.send_header('Content-Length', str(len(body)))
+    handler.end_headers()
+    if body:
+        handler.wfile.write(body)
+
+
+def send_json(handler, status, payload, headers=None):
+    send(handler, status, json.dumps(payload).encode(), headers, 'application/json; charset=UTF-8')
+
+
+def send_throttled(handler, status, length, chunks, headers=None, bytes_per_second=None):
+    """
+    Send a body of ``length`` bytes from ``chunks``, no faster than
+    ``bytes_per_second`` if it is set
+    """
+    handler.send_response(status)
+    for name, value in (headers or {}).items():
+        handler.send_header(name, value)
+    handler.send_header('Content-Length', str(length))
+    handler.end_headers()
+
+    started = time.monotonic()
+    sent = 0
+    for chunk in chunks:
+        handler.wfile.write(chunk)
+        sent += len(chunk)
+        if bytes_per_second:
+            ahead = sent / bytes_per_second - (time.monotonic() - started)
+            if ahead > 0:
+                time.sleep(ahead)
@@ -0,0 +1,241 @@
+# Local stand-in for the Zoom endpoints the scripts call
+import random
+import re
+import threading
+from datetime import datetime, timedelta
+
+from benchmarks.fake_http import FakeServer, WRITE_CHUNK_SIZE, read_body, send, send_json, send_throttled
+
+USERS_PATH = '/v2/users'
+RECORDINGS_PATH = re.compile(r'^/v2/users/([^/]+)/recordings$')
+PARTICIPANTS_PATH = re.compile(r'^/v2/past_meetings/(.+)/participants$')
+DELETE_PATH = re.compile(r'^/v2/meetings/(.+?)/recordings(?:/([^/]+))?$')
+DOWNLOAD_PATH = re.compile(r'^/rec/download/([^/]+)$')
+RANGE_HEADER = re.compile(r'^bytes=(\d+)-(\d*)$')
+
+# Size of the pseudo-random block every recording's content repeats
+PATTERN_SIZE = 1024 * 1024
+
+
+class FakeZoomServer(FakeServer):
+    """
+    Serves the Zoom token, users list, recordings list, recording download,
+    participants and recording delete endpoints.
+
+    Recordings are generated up front: ``meetings`` meetings, one per day
+    from ``start_date``, each with one file per entry of ``file_sizes_mb``.
+    Downloads honour Range requests and are throttled to
+    ``bandwidth_mbps`` per connection. A fraction ``rate_429`` of the API
+    calls (not downloads) is answered with a 429 and a Retry-After of
+    ``retry_after`` seconds.
+
+    Point the scripts at it with ``ZoomClient(api_url=server.api_url)`` and
+    ``server.token_url``.
+    """
+
+    def __init__(
+            self,
+            meetings=20,
+            file_sizes_mb=(64, 8),
+            start_date='2025-01-06',
+            participants_per_meeting=30,
+            users=1,
+            latency=0.0,
+            bandwidth_mbps=None,
+            rate_429=0.0,
+            retry_after=1,
+            seed=0
+    ):
+        super().__init__(latency)
+        self.bytes_per_second = bandwidth_mbps * 1024 * 1024 / 8 if bandwidth_mbps else None
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self.participants_per_meeting = participants_per_meeting
+        self.users = [{'id': f"user{index:04d}", 'email': f"instructor{index}@example.edu", 'type': 2}
+                      for index in range(users)]
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self._pattern = random.Random(seed).randbytes(PATTERN_SIZE)
+        self.meetings = self._generate_meetings(meetings, file_sizes_mb, start_date)
+        self.files = {
+            recording['id']: recording
+            for meeting in self.meetings for recording in meeting['recording_files']
+        }
+
+    @property
+    def api_url(self):
+        return f"{self.base_url}/v2"
+
+    @property
+    def token_url(self):
+        return f"{self.base_url}/oauth/token?grant_type=account_credentials&account_id=benchmark"
+
+    def _generate_meetings(self, count, file_sizes_mb, start_date):
+        first_day = datetime.strptime(start_date, '%Y-%m-%d')
+        meetings = []
+        for index in range(count):
+            # 02:00 UTC is an evening class in US/Pacific
+            start_time = first_day + timedelta(days=index, hours=2)
+            recording_files = []
+            for file_index, size_mb in enumerate(file_sizes_mb):
+                file_type = 'MP4' if file_index == 0 else 'M4A'
+                recording_id = f"rec{index:05d}{file_index}"
+                recording_files.append({
+                    'id': recording_id,
+                    'meeting_id': f"uuid{index:05d}==",
+                    'recording_start': start_time.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                    'file_type': file_type,
+                    'file_extension': file_type,
+                    'file_size': int(size_mb * 1024 * 1024),
+                    'download_url': None,
+                    'status': 'completed',
+                    'recording_type': 'shared_screen_with_speaker_view' if file_type == 'MP4' else 'audio_only',
+                })
+            meetings.append({
+                'uuid': f"uuid{index:05d}==",
+                'id': 80000000000 + index,
+                'topic': f"Benchmark Class {index % 5}",
+                'start_time': start_time.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                'timezone': 'America/Los_Angeles',
+                'total_size': sum(recording['file_size'] for recording in recording_files),
+                'recording_count': len(recording_files),
+                'recording_files': recording_files,
+            })
+        return meetings
+
+    def start(self):
+        super().start()
+        # Download URLs need the port, which is only known once bound
+        for recording in self.files.values():
+            recording['download_url'] = f"{self.base_url}/rec/download/{recording['id']}"
+        return self
+
+    def _rate_limited(self, handler):
+        with self._random_lock:
+            limited = self._random.random() < self.rate_429
+        if limited:
+            self.count('429')
+            send_json(handler, 429, {'code': 429, 'message': 'Too many requests'},
+                      {'Retry-After': str(self.retry_after), 'X-RateLimit-Category': 'Medium'})
+        return limited
+
+    def handle(self, handler, method, path, query):
+        if method == 'POST' and path == '/oauth/token':
+            read_body(handler)
+            self.count('token')
+            send_json(handler, 200, {'access_token': 'benchmark-token', 'token_type': 'bearer', 'expires_in': 3600})
+            return
+
+        match = DOWNLOAD_PATH.match(path)
+        if method == 'GET' and match:
+            self.count('download')
+            self._download(handler, match.group(1))
+            return
+
+        if method == 'GET' and path == USERS_PATH:
+            self.count('list_users')
+            if not self._rate_limited(handler):
+                self._list_users(handler, query)
+            return
+
+        if method == 'GET' and RECORDINGS_PATH.match(path):
+            self.count('list_recordings')
+            if not self._rate_limited(handler):
+                self._list_recordings(handler, query)
+            return
+
+        if method == 'GET' and PARTICIPANTS_PATH.match(path):
+            self.count('participants')
+            if not self._rate_limited(handler):
+                self._participants(handler, query)
+            return
+
+        if method == 'DELETE' and DELETE_PATH.match(path):
+            self.count('delete_recording')
+            if not self._rate_limited(handler):
+                send(handler, 204)
+            return
+
+        self.count('unknown')
+        send_json(handler, 404, {'code': 404, 'message': f"No fake for {method} {path}"})
+
+    def _list_recordings(self, handler, query):
+        from_date = query.get('from', '0000-00-00')
+        to_date = query.get('to', '9999-99-99')
+        page_size = int(query.get('page_size', 30))
+        offset = int(query.get('next_page_token') or 0)
+
+        matching = [
+            meeting for meeting in self.meetings
+            if from_date <= meeting['start_time'][:10] <= to_date
+        ]
+        page = matching[offset:offset + page_size]
+        next_offset = offset + page_size
+        send_json(handler, 200, {
+            'from': from_date,
+            'to': to_date,
+            'page_size': page_size,
+            'total_records': len(matching),
+            'next_page_token': str(next_offset) if next_offset < len(matching) else '',
+            'meetings': page,
+        })
+
+    def _list_users(self, handler, query):
+        page_size = int(query.get('page_size', 30))
+        offset = int(query.get('next_page_token') or 0)
+        next_offset = offset + page_size
+        send_json(handler, 200, {
+            'page_size': page_size,
+            'total_records': len(self.users),
+            'next_page_token': str(next_offset) if next_offset < len(self.users) else '',
+            'users': self.users[offset:next_offset],
+        })
+
+    def _participants(self, handler, query):
+        page_size = int(query.get('page_size', 30))
+        offset = int(query.get('next_page_token') or 0)
+        count = min(page_size, self.participants_per_meeting - offset)
+        next_offset = offset + count
+        send_json(handler, 200, {
+            'page_size': page_size,
+            'total_records': self.participants_per_meeting,
+            'next_page_token': str(next_offset) if next_offset < self.participants_per_meeting else '',
+            'participants': [
+                {'id': f"user{offset + index}", 'name': f"Student {offset + index}", 'duration': 3600}
+                for index in range(count)
+            ],
+        })
+
+    def _download(self, handler, recording_id):
+        recording = self.files.get(recording_id)
+        if not recording:
+            send_json(handler, 404, {'code': 404, 'message': 'File not found'})
+            return
+
+        size = recording['file_size']
+        start, end, status = 0, size - 1, 200
+        headers = {'Content-Type': 'application/octet-stream', 'Accept-Ranges': 'bytes'}
+        match = RANGE_HEADER.match(handler.headers.get('Range', ''))
+        if match:
+            start = int(match.group(1))
+            end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+            if start >= size:
+                send(handler, 416, headers={'Content-Range': f"bytes */{size}"})
+                return
+            status = 206
+            headers['Content-Range'] = f"bytes {start}-{end}/{size}"
+
+        length = end - start + 1
+        self.count('bytes_sent', length)
+        send_throttled(handler, status, length, self.iter_content(start, end), headers, self.bytes_per_second)
+
+    def iter_content(self, start, end):
+        """
+        Yield bytes ``start``..``end`` (inclusive) of a recording's content
+        """
+        position = start
+        while position <= end:
+            offset = position % PATTERN_SIZE
+            size = min(WRITE_CHUNK_SIZE, PATTERN_SIZE - offset, end - position + 1)
+            yield self._pattern[offset:offset + size]
+            position += size
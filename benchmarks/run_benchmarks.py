@@ -0,0 +1,214 @@
+# Throughput benchmarks against local fake Zoom and Drive servers
+#
+# Usage (from the repository root):
+#   python -m benchmarks.run_benchmarks
+#   python -m benchmarks.run_benchmarks --meetings 50 --latency-ms 30 --bandwidth-mbps 200 --rate-429 0.05
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.fake_drive_server import FakeDriveServer, build_drive_service
+from benchmarks.fake_zoom_server import FakeZoomServer, PATTERN_SIZE
+
+BENCHMARKS = (
+    'download_large_recordings',
+    'upload_to_google_drive',
+    'download_and_upload_recordings',
+    'run_async_transfers',
+)
+
+RESULT_PREFIX = 'BENCHMARK_RESULT '
+
+
+def _peak_rss_mb():
+    # VmHWM starts over at exec; ru_maxrss may carry the parent's peak over the fork
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is in kilobytes on Linux, bytes on macOS
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / (1024 * 1024) if sys.platform == 'darwin' else maxrss / 1024
+
+
+def _write_upload_files(directory, count, sizes_mb):
+    # Local files for upload_to_google_drive, filled with pseudo-random bytes
+    block = os.urandom(PATTERN_SIZE)
+    paths = []
+    for index in range(count):
+        for file_index, size_mb in enumerate(sizes_mb):
+            path = os.path.join(directory, f"upload{index:05d}_{file_index}.mp4")
+            remaining = int(size_mb * 1024 * 1024)
+            with open(path, 'wb') as f:
+                while remaining:
+                    remaining -= f.write(block[:min(remaining, len(block))])
+            paths.append(path)
+    return paths
+
+
+def run_worker(args):
+    """
+    Run one benchmark in this process and print its timing and peak RSS
+
+    The fake servers live in the parent process, so the RSS measured here
+    belongs to the code under test alone.
+    """
+    from commons import get_access_token, download_large_recordings, upload_to_google_drive
+    from zoom_client import ZoomClient, set_zoom_client
+    from DownloadZoomRecordingsDirectlyToGoogleDrive import download_and_upload_recordings
+    from async_transfer import run_async_transfers
+
+    set_zoom_client(ZoomClient(api_url=f"{args.zoom_url}/v2"))
+    token_url = f"{args.zoom_url}/oauth/token?grant_type=account_credentials&account_id=benchmark"
+
+    # Token, folder and participant caches all land in the scratch directory
+    os.chdir(tempfile.mkdtemp(prefix='zoom-benchmark-'))
+
+    upload_files = []
+    if args.worker == 'upload_to_google_drive':
+        upload_files = _write_upload_files(os.getcwd(), args.meetings, args.upload_sizes_mb)
+
+    baseline_rss_mb = _peak_rss_mb()
+    started = time.perf_counter()
+
+    if args.worker == 'download_large_recordings':
+        access_token = get_access_token('benchmark', 'benchmark', token_url, use_cache=False)
+        results = download_large_recordings(access_token, args.min_size_mb, download_dir='downloads')
+    elif args.worker == 'upload_to_google_drive':
+        results = upload_to_google_drive(None, upload_files, folder_name='Benchmark',
+                                         drive_service_factory=lambda: build_drive_service(args.drive_url))
+    elif args.worker == 'download_and_upload_recordings':
+        access_token = get_access_token('benchmark', 'benchmark', token_url, use_cache=False)
+        results = download_and_upload_recordings(access_token, build_drive_service(args.drive_url),
+                                                 args.min_size_mb)
+    else:
+        access_token = get_access_token('benchmark', 'benchmark', token_url, use_cache=False)
+        results = run_async_transfers(access_token, lambda: build_drive_service(args.drive_url),
+                                      args.min_size_mb)
+
+    elapsed = time.perf_counter() - started
+    print(RESULT_PREFIX + json.dumps({
+        'files': len(results),
+        'seconds': elapsed,
+        'baseline_rss_mb': baseline_rss_mb,
+        'peak_rss_mb': _peak_rss_mb(),
+    }))
+
+
+def run_benchmark(name, args):
+    """
+    Start fresh fake servers, run one benchmark in a child process and
+    collect its numbers together with the servers' call counts
+
+    Returns:
+        dict: Result of the benchmark
+    """
+    zoom_server = FakeZoomServer(
+        meetings=args.meetings,
+        file_sizes_mb=args.file_sizes_mb,
+        latency=args.latency_ms / 1000,
+        bandwidth_mbps=args.bandwidth_mbps,
+        rate_429=args.rate_429,
+    )
+    drive_server = FakeDriveServer(latency=args.latency_ms / 1000)
+
+    with zoom_server, drive_server:
+        command = [
+            sys.executable, '-m', 'benchmarks.run_benchmarks',
+            '--worker', name,
+            '--zoom-url', zoom_server.base_url,
+            '--drive-url', drive_server.base_url,
+            '--meetings', str(args.meetings),
+            '--min-size-mb', str(args.min_size_mb),
+            '--upload-sizes-mb', *[str(size) for size in args.file_sizes_mb if size >= args.min_size_mb],
+        ]
+        process = subprocess.run(command, capture_output=True, text=True)
+
+    result_lines = [line for line in process.stdout.splitlines() if line.startswith(RESULT_PREFIX)]
+    if process.returncode or not result_lines:
+        print(process.stdout[-2000:])
+        print(process.stderr[-2000:])
+        raise RuntimeError(f"Benchmark {name} failed with exit code {process.returncode}")
+    if args.verbose:
+        print(process.stdout)
+
+    result = json.loads(result_lines[-1][len(RESULT_PREFIX):])
+    zoom_calls = dict(zoom_server.calls)
+    drive_calls = dict(drive_server.calls)
+    moved_bytes = (zoom_calls.pop('bytes_sent', 0) if name == 'download_large_recordings'
+                   else drive_calls.get('bytes_received', 0))
+    zoom_calls.pop('bytes_sent', None)
+    drive_calls.pop('bytes_received', None)
+
+    result.update({
+        'name': name,
+        'mb': moved_bytes / (1024 * 1024),
+        'mb_per_second': moved_bytes / (1024 * 1024) / result['seconds'] if result['seconds'] else 0.0,
+        'zoom_calls': zoom_calls,
+        'drive_calls': drive_calls,
+    })
+    return result
+
+
+def print_results(results):
+    print(f"\n{'Benchmark':<34}{'Files':>6}{'MB':>9}{'Seconds':>9}{'MB/s':>9}{'Peak RSS':>10}{'(base)':>9}")
+    for result in results:
+        print(f"{result['name']:<34}{result['files']:>6}{result['mb']:>9.1f}{result['seconds']:>9.2f}"
+              f"{result['mb_per_second']:>9.1f}{result['peak_rss_mb']:>9.1f}M{result['baseline_rss_mb']:>8.1f}M")
+
+    print("\nAPI calls:")
+    for result in results:
+        zoom_calls = ', '.join(f"{name}={count}" for name, count in sorted(result['zoom_calls'].items()))
+        drive_calls = ', '.join(f"{name}={count}" for name, count in sorted(result['drive_calls'].items()))
+        print(f"  {result['name']}")
+        print(f"    Zoom:  {zoom_calls or '-'}")
+        print(f"    Drive: {drive_calls or '-'}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the Zoom/Drive transfer paths against local fake servers")
+    parser.add_argument('--meetings', type=int, default=20, help="Meetings with recordings on the fake Zoom server")
+    parser.add_argument('--file-sizes-mb', type=float, nargs='+', default=[64, 8],
+                        help="Size of each recording file per meeting")
+    parser.add_argument('--min-size-mb', type=float, default=20, help="min_size_mb passed to the code under test")
+    parser.add_argument('--latency-ms', type=float, default=20, help="Delay added to every request")
+    parser.add_argument('--bandwidth-mbps', type=float, default=None, help="Download speed per connection")
+    parser.add_argument('--rate-429', type=float, default=0.0, help="Fraction of Zoom API calls answered with 429")
+    parser.add_argument('--only', nargs='+', choices=BENCHMARKS, default=list(BENCHMARKS))
+    parser.add_argument('--json', help="Also write the results to this file")
+    parser.add_argument('--verbose', action='store_true', help="Print the output of the code under test")
+    # Used by the child processes
+    parser.add_argument('--worker', choices=BENCHMARKS, help=argparse.SUPPRESS)
+    parser.add_argument('--zoom-url', help=argparse.SUPPRESS)
+    parser.add_argument('--drive-url', help=argparse.SUPPRESS)
+    parser.add_argument('--upload-sizes-mb', type=float, nargs='*', default=[], help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.worker:
+        run_worker(args)
+        return
+
+    results = []
+    for name in args.only:
+        print(f"Running {name}...")
+        results.append(run_benchmark(name, args))
+
+    print_results(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
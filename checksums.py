@@ -0,0 +1,102 @@
+# Checksums computed while a recording streams from Zoom to Google Drive
+import hashlib
+
+from constants import VERIFY_SHA256
+from metrics import track_api_call
+
+# Drive's size and MD5 (and SHA-256 if requested) match what was streamed
+VERIFIED = 'verified'
+# Resumed upload: the bytes sent in an earlier run were never hashed, so only the size is checked
+SIZE_ONLY = 'size_only'
+# Drive's copy does not match what Zoom served
+UNVERIFIED = 'unverified'
+
+# Drive file fields needed to verify an upload
+CHECKSUM_FIELDS = 'id, size, md5Checksum, sha256Checksum'
+
+
+class StreamChecksum:
+    """
+    MD5 (and optionally SHA-256) of a file, updated chunk by chunk as it
+    passes through.
+
+    Hashing happens in the same pass as the transfer, so the data is never
+    read twice. A stream that starts past byte 0 (a resumed upload) only
+    counts its bytes, since its digests could not cover the whole file.
+    """
+
+    def __init__(self, offset=0, sha256=VERIFY_SHA256):
+        """
+        Args:
+            offset (int): Bytes of the file that were sent before this stream
+            sha256 (bool): Also compute SHA-256
+        """
+        self.size = offset
+        self._md5 = hashlib.md5() if not offset else None
+        self._sha256 = hashlib.sha256() if sha256 and not offset else None
+
+    def update(self, chunk):
+        self.size += len(chunk)
+        if self._md5:
+            self._md5.update(chunk)
+        if self._sha256:
+            self._sha256.update(chunk)
+
+    def wrap(self, chunks):
+        """
+        Pass ``chunks`` through, hashing each one
+        """
+        for chunk in chunks:
+            self.update(chunk)
+            yield chunk
+
+    @property
+    def md5(self):
+        return self._md5.hexdigest() if self._md5 else None
+
+    @property
+    def sha256(self):
+        return self._sha256.hexdigest() if self._sha256 else None
+
+
+def with_checksum_fields(drive_service, drive_file):
+    """
+    Returns:
+        dict: ``drive_file``, fetched again with CHECKSUM_FIELDS if the
+        upload response left out its size or MD5
+    """
+    if 'size' in drive_file and 'md5Checksum' in drive_file:
+        return drive_file
+    with track_api_call('drive', 'files.get'):
+        return drive_service.files().get(fileId=drive_file['id'], fields=CHECKSUM_FIELDS).execute()
+
+
+def verify_transfer(drive_file, checksum, expected_size=None):
+    """
+    Compare an uploaded file with what was streamed and with Zoom's file size
+
+    Args:
+        drive_file (dict): Drive file with CHECKSUM_FIELDS
+        checksum (StreamChecksum): Checksum of the streamed bytes
+        expected_size (int, optional): File size reported by Zoom
+
+    Returns:
+        tuple: (VERIFIED, SIZE_ONLY or UNVERIFIED, description of the
+        mismatch or None)
+    """
+    problems = []
+    if expected_size is not None and checksum.size != expected_size:
+        problems.append(f"streamed {checksum.size} of the {expected_size} bytes Zoom reported")
+
+    drive_size = drive_file.get('size')
+    if drive_size is None or int(drive_size) != checksum.size:
+        problems.append(f"Drive has {drive_size} bytes, {checksum.size} were streamed")
+    if checksum.md5 and drive_file.get('md5Checksum') != checksum.md5:
+        problems.append(f"Drive MD5 {drive_file.get('md5Checksum')} != streamed {checksum.md5}")
+    # Drive computes SHA-256 asynchronously; compare it only once it is there
+    if checksum.sha256 and drive_file.get('sha256Checksum') not in (None, checksum.sha256):
+        problems.append(f"Drive SHA-256 {drive_file['sha256Checksum']} != streamed {checksum.sha256}")
+
+    if problems:
+        return UNVERIFIED, '; '.join(problems)
+    return (VERIFIED if checksum.md5 else SIZE_ONLY), None
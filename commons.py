@@ -3,11 +3,33 @@ import json
 import os
 import requests
 import base64
-from constants import API_URL
+import hashlib
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import deque
+from contextlib import contextmanager
+from itertools import islice
+from urllib.parse import quote
+from constants import (
+    DOWNLOAD_CHUNK_SIZE,
+    RECORDINGS_FROM_DATE,
+    RECORDINGS_PAGE_SIZE,
+    LISTING_MAX_WORKERS,
+    ZOOM_TOKEN_CACHE_PATH,
+    ZOOM_TOKEN_REFRESH_MARGIN_SECONDS,
+    RANGED_DOWNLOAD_THRESHOLD_MB,
+    RANGED_DOWNLOAD_CONNECTIONS,
+    RANGED_DOWNLOAD_PART_MB,
+    LOCAL_UPLOAD_WORKERS,
+    LOCAL_UPLOAD_CHUNK_SIZE_MB,
+    LOCAL_UPLOAD_MULTIPART_MAX_MB,
+    LOCAL_UPLOAD_VERIFY_MD5,
+)
 from datetime import datetime, timedelta
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
+from metrics import BYTES_TRANSFERRED, FILES_PROCESSED, FILE_SECONDS, track_api_call
+from zoom_client import get_zoom_client
 
 def get_directory_files(directory_path):
     """
@@ -51,14 +73,141 @@ def get_current_date():
 
     return today.strftime("%Y-%m-%d")
 
+def iter_batches(iterable, size):
+    """
+    Yield lists of up to ``size`` items from any iterable, lazily
+    """
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+class FileLock:
+    """
+    Cross-process lock backed by an exclusively created lock file.
+
+    Works the same on Windows and Linux. A lock file older than
+    ``stale_after`` seconds is assumed to belong to a crashed process and is
+    taken over.
+    """
+
+    def __init__(self, path, timeout=30, stale_after=60):
+        self.path = path
+        self.timeout = timeout
+        self.stale_after = stale_after
+
+    def __enter__(self):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                os.close(os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return self
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(self.path) > self.stale_after:
+                        os.remove(self.path)
+                        continue
+                except OSError:
+                    # Released between our checks; try again
+                    continue
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Timed out waiting for lock {self.path}")
+                time.sleep(0.05)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
 #===============================================
 # Zoom functions
 #===============================================
+# Tokens already read or fetched by this process, by cache key
+_token_memo = {}
+
+def _read_cached_token(cache_key, cache_path):
+    """
+    Return a cached token that is not about to expire, or None
+    """
+    entry = _token_memo.get(cache_key)
+    if not entry and os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'r') as cache_file:
+                entry = json.load(cache_file).get(cache_key)
+        except (OSError, ValueError):
+            entry = None
+
+    if entry and entry['expires_at'] - ZOOM_TOKEN_REFRESH_MARGIN_SECONDS > time.time():
+        _token_memo[cache_key] = entry
+        return entry['access_token']
+    return None
+
+def _write_cached_token(cache_key, cache_path, access_token, expires_in):
+    entry = {'access_token': access_token, 'expires_at': time.time() + expires_in}
+    _token_memo[cache_key] = entry
+
+    cache = {}
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'r') as cache_file:
+                cache = json.load(cache_file)
+        except (OSError, ValueError):
+            cache = {}
+    cache[cache_key] = entry
+
+    # Write privately, then swap in atomically
+    tmp_path = f"{cache_path}.tmp"
+    fd = os.open(tmp_path, os.O_CREAT | os.O_TRUNC | os.O_WRONLY, 0o600)
+    with os.fdopen(fd, 'w') as cache_file:
+        json.dump(cache, cache_file)
+    os.replace(tmp_path, cache_path)
+
 # Generate an access token (OAuth)
-def get_access_token(clientID, clientSecret, tokenUrl):
+def get_access_token(clientID, clientSecret, tokenUrl, use_cache=True, cache_path=ZOOM_TOKEN_CACHE_PATH):
     """
     Retrieve the Zoom access token
-    :return:
+
+    Tokens are cached on disk with their expiry, so every script and worker
+    using the same app credentials shares one token until shortly before it
+    expires. The refresh happens under a file lock, so only one process
+    fetches a new token.
+
+    Args:
+        clientID (str): Zoom app client ID
+        clientSecret (str): Zoom app client secret
+        tokenUrl (str): Zoom OAuth token URL (including the account ID)
+        use_cache (bool): Reuse a cached token when it is still valid
+        cache_path (str): File the tokens are cached in
+
+    Returns:
+        str: Zoom access token
+    """
+    if not use_cache:
+        return _fetch_access_token(clientID, clientSecret, tokenUrl)["access_token"]
+
+    cache_key = hashlib.sha256(f"{clientID}:{tokenUrl}".encode()).hexdigest()[:16]
+    access_token = _read_cached_token(cache_key, cache_path)
+    if access_token:
+        return access_token
+
+    with FileLock(f"{cache_path}.lock"):
+        # Another process may have refreshed it while we waited
+        _token_memo.pop(cache_key, None)
+        access_token = _read_cached_token(cache_key, cache_path)
+        if access_token:
+            return access_token
+
+        token_data = _fetch_access_token(clientID, clientSecret, tokenUrl)
+        _write_cached_token(cache_key, cache_path, token_data["access_token"], token_data.get("expires_in", 3600))
+        return token_data["access_token"]
+
+def _fetch_access_token(clientID, clientSecret, tokenUrl):
+    """
+    Request a new server-to-server OAuth token from Zoom
+    :return: dict with access_token and expires_in
     """
     auth_header = f"{clientID}:{clientSecret}"
     #print(auth_header)
@@ -69,42 +218,548 @@ def get_access_token(clientID, clientSecret, tokenUrl):
     }
     #print(headers)
     data = {"grant_type": "account_credentials"}
-    response = requests.post(tokenUrl, headers=headers, data=data)
+    response = get_zoom_client().post(tokenUrl, headers=headers, data=data)
     response.raise_for_status()
-    return response.json()["access_token"]
+    return response.json()
 
-# Fetch cloud recordings for a user
-def fetch_recordings(user_id, access_token):
-    # Call the function and store the result
-    formatted_current_date = get_tomorrow_date()
-    print("Current date: {}".format(formatted_current_date))
-    url = f"{API_URL}/users/{user_id}/recordings"
-    params = { "from": "2024-12-01", "to": formatted_current_date,"page_size": 30}
-    headers = {"Authorization": f"Bearer {access_token}"}
-    response = requests.get(url, headers=headers, params=params)
+def get_month_windows(from_date, to_date):
+    """
+    Split a date range into calendar-month windows
+
+    Zoom only returns recordings for up to one month per request, so longer
+    ranges have to be listed window by window.
+
+    Args:
+        from_date (str): First day in yyyy-mm-dd format
+        to_date (str): Last day (inclusive) in yyyy-mm-dd format
+
+    Returns:
+        list: (from, to) tuples of yyyy-mm-dd strings, oldest first
+    """
+    start = datetime.strptime(from_date, "%Y-%m-%d").date()
+    end = datetime.strptime(to_date, "%Y-%m-%d").date()
+
+    windows = []
+    while start <= end:
+        next_month = (start.replace(day=1) + timedelta(days=32)).replace(day=1)
+        window_end = min(next_month - timedelta(days=1), end)
+        windows.append((start.strftime("%Y-%m-%d"), window_end.strftime("%Y-%m-%d")))
+        start = next_month
+
+    return windows
+
+# Fetch one page of cloud recordings for a user
+def fetch_recordings_page(
+        user_id,
+        access_token,
+        from_date,
+        to_date,
+        next_page_token=None,
+        page_size=RECORDINGS_PAGE_SIZE
+):
+    params = {"from": from_date, "to": to_date, "page_size": page_size}
+    if next_page_token:
+        params["next_page_token"] = next_page_token
+    response = get_zoom_client().get(f"/users/{user_id}/recordings", access_token, params=params)
     response.raise_for_status()
     return response.json()
 
+def iter_window_recordings(user_id, access_token, from_date, to_date, page_size=RECORDINGS_PAGE_SIZE):
+    """
+    Yield every meeting with recordings in one date window, following next_page_token
+    """
+    next_page_token = None
+    while True:
+        data = fetch_recordings_page(user_id, access_token, from_date, to_date, next_page_token, page_size)
+        yield from data.get('meetings', [])
+
+        next_page_token = data.get('next_page_token')
+        if not next_page_token:
+            break
+
+def iter_recordings(
+        user_id,
+        access_token,
+        from_date=RECORDINGS_FROM_DATE,
+        to_date=None,
+        page_size=RECORDINGS_PAGE_SIZE,
+        max_workers=LISTING_MAX_WORKERS
+):
+    """
+    Lazily yield every meeting with cloud recordings between two dates
+
+    The range is split into month windows that are listed concurrently, each
+    one following its own pagination. Meetings are yielded as soon as any
+    window returns them, so callers can start working before the listing is
+    finished.
+
+    Args:
+        user_id (str): Zoom user ID or 'me'
+        access_token (str): Zoom API access token
+        from_date (str): First day in yyyy-mm-dd format
+        to_date (str, optional): Last day in yyyy-mm-dd format; defaults to tomorrow
+        page_size (int): Meetings per page (Zoom maximum is 300)
+        max_workers (int): Number of windows listed at the same time
+
+    Yields:
+        dict: Meeting objects as returned by Zoom, each at most once
+    """
+    to_date = to_date or get_tomorrow_date()
+    print("Listing recordings from {} to {}".format(from_date, to_date))
+    windows = get_month_windows(from_date, to_date)
+    if not windows:
+        return
+
+    results = queue.Queue()
+    stop = threading.Event()
+    window_done = object()
+
+    def list_window(window_from, window_to):
+        try:
+            for meeting in iter_window_recordings(user_id, access_token, window_from, window_to, page_size):
+                if stop.is_set():
+                    return
+                results.put(meeting)
+        except Exception as e:
+            results.put(e)
+        finally:
+            results.put(window_done)
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(windows))))
+    try:
+        for window_from, window_to in windows:
+            executor.submit(list_window, window_from, window_to)
+
+        remaining = len(windows)
+        seen = set()
+        while remaining:
+            item = results.get()
+            if item is window_done:
+                remaining -= 1
+                continue
+            if isinstance(item, Exception):
+                raise item
+
+            # Guard against a meeting showing up in two windows
+            key = item.get('uuid') or item.get('id')
+            if key in seen:
+                continue
+            seen.add(key)
+            yield item
+    finally:
+        # Stop the remaining windows if the caller stops early
+        stop.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+# Fetch cloud recordings for a user
+def fetch_recordings(user_id, access_token, from_date=RECORDINGS_FROM_DATE, to_date=None):
+    """
+    Fetch all cloud recordings for a user in one response-shaped dict
+
+    Prefer iter_recordings for large ranges; this collects every page first.
+
+    Returns:
+        dict: {'meetings': [...]} across all pages and month windows
+    """
+    return {'meetings': list(iter_recordings(user_id, access_token, from_date, to_date))}
+
+def iter_users(access_token, status='active', page_size=RECORDINGS_PAGE_SIZE):
+    """
+    Yield every user of the Zoom account, following next_page_token
+
+    Args:
+        access_token (str): Zoom API access token
+        status (str): 'active', 'inactive' or 'pending'
+        page_size (int): Users per page (Zoom maximum is 300)
+
+    Yields:
+        dict: User objects as returned by Zoom (id, email, type, ...)
+    """
+    params = {"status": status, "page_size": page_size}
+    while True:
+        response = get_zoom_client().get("/users", access_token, params=params)
+        response.raise_for_status()
+        data = response.json()
+        yield from data.get('users', [])
+
+        next_page_token = data.get('next_page_token')
+        if not next_page_token:
+            return
+        params["next_page_token"] = next_page_token
+
+
+def encode_meeting_uuid(meeting_uuid):
+    """
+    Encode a meeting UUID for use in a URL path
+
+    Zoom requires UUIDs that start with '/' or contain '//' to be URL-encoded twice.
+    """
+    encoded = quote(meeting_uuid, safe='')
+    if meeting_uuid.startswith('/') or '//' in meeting_uuid:
+        encoded = quote(encoded, safe='')
+    return encoded
 
 # Delete a specific recording
 def delete_recording(meeting_id, access_token):
-    url = f"{API_URL}/meetings/{meeting_id}/recordings?action=trash"
-
-    headers = {"Authorization": f"Bearer {access_token}"}
-    response = requests.delete(url, headers=headers)
+    url = f"/meetings/{encode_meeting_uuid(str(meeting_id))}/recordings?action=trash"
+    response = get_zoom_client().delete(url, access_token)
     if response.status_code == 204:
         print(f"Recording {meeting_id} deleted successfully.")
+        return True
     elif response.status_code == 404:
         print(f"Recording not found: {meeting_id}. It may have already been deleted.")
         print(f"Full response: {response.text}")
         return False
     else:
         print(f"Failed to delete recording {meeting_id}. Status code: {response.status_code}")
+        return False
+
+# Delete a single file of a recording
+def delete_recording_file(meeting_uuid, recording_id, access_token):
+    url = f"/meetings/{encode_meeting_uuid(meeting_uuid)}/recordings/{recording_id}?action=trash"
+    response = get_zoom_client().delete(url, access_token)
+    if response.status_code == 204:
+        print(f"Recording file {recording_id} of {meeting_uuid} deleted successfully.")
+        return True
+    elif response.status_code == 404:
+        print(f"Recording file not found: {recording_id}. It may have already been deleted.")
+        return False
+    else:
+        print(f"Failed to delete recording file {recording_id}. Status code: {response.status_code}")
+        return False
+
+def open_download_stream(download_url, access_token, offset=0):
+    """
+    Open a streaming download of a Zoom recording file
+
+    The body is not read until the caller iterates over it, so the file is
+    never held in memory as a whole.
+
+    Args:
+        download_url (str): Recording download URL
+        access_token (str): Zoom API access token
+        offset (int): First byte to download, for resuming a transfer
+
+    Returns:
+        requests.Response: Open response; use it as a context manager so the
+        connection is released
+    """
+    headers = {"Range": f"bytes={offset}-"} if offset else None
+    response = get_zoom_client().get(download_url, access_token, headers=headers, stream=True)
+    try:
+        response.raise_for_status()
+        if offset and response.status_code != 206:
+            raise ValueError(f"Server ignored the Range header for {download_url}")
+    except (requests.RequestException, ValueError):
+        response.close()
+        raise
+    return response
+
+def download_to_file(
+        download_url,
+        access_token,
+        filepath,
+        expected_size=None,
+        chunk_size=DOWNLOAD_CHUNK_SIZE,
+        max_attempts=3
+):
+    """
+    Stream a recording to disk, resuming any earlier partial download
+
+    Bytes are written to ``<filepath>.part`` as they arrive. If that file
+    already exists, only the missing tail is requested with an HTTP Range
+    header. The finished file is moved into place with an atomic rename, so
+    ``filepath`` only ever exists once it is complete.
+
+    Args:
+        download_url (str): Recording download URL
+        access_token (str): Zoom API access token
+        filepath (str): Final path of the downloaded file
+        expected_size (int, optional): Size reported by Zoom, used to detect
+            complete and truncated files
+        chunk_size (int): Bytes read from the response per write
+        max_attempts (int): Connection attempts before giving up; each attempt
+            resumes from the bytes already on disk
+
+    Returns:
+        int: Number of bytes fetched by this call (0 if the file was already complete)
+    """
+    if os.path.exists(filepath) and (expected_size is None or os.path.getsize(filepath) == expected_size):
+        return 0
+
+    part_path = f"{filepath}.part"
+    fetched = 0
+
+    for attempt in range(1, max_attempts + 1):
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        if expected_size is not None and offset > expected_size:
+            # Leftover from a different file; start over
+            offset = 0
+
+        if expected_size is None or offset < expected_size:
+            headers = {}
+            if offset:
+                headers["Range"] = f"bytes={offset}-"
+
+            try:
+                with get_zoom_client().get(download_url, access_token, headers=headers, stream=True) as response:
+                    if response.status_code == 416 and offset:
+                        # Nothing left past our offset: the part file is complete
+                        pass
+                    else:
+                        response.raise_for_status()
+                        if offset and response.status_code != 206:
+                            # Server ignored the Range header and sent the whole file
+                            offset = 0
+
+                        with open(part_path, 'ab' if offset else 'wb') as f:
+                            for chunk in response.iter_content(chunk_size=chunk_size):
+                                f.write(chunk)
+                                fetched += len(chunk)
+                                BYTES_TRANSFERRED.inc(len(chunk), direction='download')
+            except requests.RequestException as e:
+                if attempt == max_attempts:
+                    raise
+                print(f"Download interrupted ({e}); resuming {os.path.basename(filepath)}...")
+                continue
+
+        size_on_disk = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        if expected_size is None or size_on_disk == expected_size:
+            os.replace(part_path, filepath)
+            return fetched
+
+        if attempt < max_attempts:
+            print(f"Incomplete download of {os.path.basename(filepath)} "
+                  f"({size_on_disk} of {expected_size} bytes); resuming...")
+
+    raise IOError(f"Incomplete download of {filepath}; partial data kept in {part_path}")
+
+def get_byte_ranges(size, range_size):
+    """
+    Split ``size`` bytes into inclusive (start, end) ranges of up to ``range_size``
+    """
+    return [(start, min(start + range_size, size) - 1) for start in range(0, size, range_size)]
+
+def fetch_byte_range(download_url, access_token, start, end, write=None, max_attempts=3):
+    """
+    Fetch one byte range of a recording, retrying only that range
+
+    Args:
+        download_url (str): Recording download URL
+        access_token (str): Zoom API access token
+        start (int): First byte
+        end (int): Last byte (inclusive)
+        write (callable, optional): Called as ``write(offset, chunk)`` while
+            streaming; without it the range is returned as bytes
+        max_attempts (int): Attempts for this range before giving up
+
+    Returns:
+        bytes: The range's content, or None when ``write`` was given
+    """
+    expected = end - start + 1
+    for attempt in range(1, max_attempts + 1):
+        buffer = bytearray()
+        received = 0
+        try:
+            headers = {"Range": f"bytes={start}-{end}"}
+            with get_zoom_client().get(download_url, access_token, headers=headers, stream=True) as response:
+                response.raise_for_status()
+                if response.status_code != 206:
+                    raise ValueError(f"Server ignored the Range header for {download_url}")
+
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    if write:
+                        write(start + received, chunk)
+                    else:
+                        buffer.extend(chunk)
+                    received += len(chunk)
+                    BYTES_TRANSFERRED.inc(len(chunk), direction='download')
+
+            if received != expected:
+                raise IOError(f"Got {received} of {expected} bytes for range {start}-{end}")
+            return None if write else bytes(buffer)
+        except (requests.RequestException, IOError) as e:
+            if attempt == max_attempts:
+                raise
+            print(f"Range {start}-{end} failed ({e}); retrying...")
+
+def iter_ranged_chunks(
+        download_url,
+        access_token,
+        size,
+        connections=RANGED_DOWNLOAD_CONNECTIONS,
+        range_size=RANGED_DOWNLOAD_PART_MB * 1024 * 1024,
+        offset=0
+):
+    """
+    Download a recording over several connections and yield it in order
+
+    Up to ``connections`` ranges are in flight at once and each is yielded
+    as soon as every range before it has been. Memory use is therefore
+    bounded by ``connections * range_size``. Use it as the chunk source of a
+    streaming upload.
+
+    Yields:
+        bytes: Consecutive ranges of the file, from byte ``offset`` on
+    """
+    ranges = [(max(start, offset), end) for start, end in get_byte_ranges(size, range_size) if end >= offset]
+    executor = ThreadPoolExecutor(max_workers=connections)
+    in_flight = deque()
+    try:
+        for start, end in ranges:
+            in_flight.append(executor.submit(fetch_byte_range, download_url, access_token, start, end))
+            if len(in_flight) >= connections:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
+    finally:
+        for future in in_flight:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+@contextmanager
+def open_recording_chunks(recording, access_token, offset=0):
+    """
+    Stream a recording file's bytes in order
+
+    Files of RANGED_DOWNLOAD_THRESHOLD_MB or more are fetched over several
+    connections with iter_ranged_chunks; smaller ones over a single stream.
+
+    Args:
+        recording (dict): Recording file object from Zoom
+        access_token (str): Zoom API access token
+        offset (int): First byte to stream, for resuming an upload
+
+    Yields:
+        iterator: Byte chunks of the file, in order
+    """
+    size = recording.get('file_size') or 0
+    if size >= RANGED_DOWNLOAD_THRESHOLD_MB * 1024 * 1024:
+        chunks = iter_ranged_chunks(recording['download_url'], access_token, size, offset=offset)
+        try:
+            yield chunks
+        finally:
+            chunks.close()
+    else:
+        with open_download_stream(recording['download_url'], access_token, offset) as response:
+            yield _count_downloaded(response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE))
+
+def _count_downloaded(chunks):
+    # Pass chunks through, counting them as downloaded bytes
+    for chunk in chunks:
+        BYTES_TRANSFERRED.inc(len(chunk), direction='download')
+        yield chunk
+
+def download_ranges_to_file(
+        download_url,
+        access_token,
+        filepath,
+        size,
+        connections=RANGED_DOWNLOAD_CONNECTIONS,
+        range_size=RANGED_DOWNLOAD_PART_MB * 1024 * 1024
+):
+    """
+    Download a large recording over several connections into a preallocated file
+
+    Ranges are written straight to their offsets in ``<filepath>.part``.
+    Completed ranges are recorded in ``<filepath>.part.json``, so a rerun
+    only fetches the missing ones. A ``.part`` file left by a sequential
+    download counts as a completed prefix. The finished file is moved into
+    place with an atomic rename. If the server ignores Range requests, the
+    rest of the file is fetched in one stream with download_to_file.
+
+    Returns:
+        int: Number of bytes fetched by this call (0 if the file was already complete)
+    """
+    if os.path.exists(filepath) and os.path.getsize(filepath) == size:
+        return 0
+
+    part_path = f"{filepath}.part"
+    progress_path = f"{part_path}.json"
+    ranges = get_byte_ranges(size, range_size)
+
+    done = set()
+    part_size = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    if os.path.exists(progress_path) and part_size == size:
+        try:
+            with open(progress_path, 'r') as progress_file:
+                progress = json.load(progress_file)
+        except (OSError, ValueError) as e:
+            # Every range is fetched again
+            print(f"Ignoring unreadable download progress {progress_path}: {e}")
+            progress = {}
+        if progress.get('range_size') == range_size:
+            done = set(progress.get('done', []))
+    elif 0 < part_size < size:
+        # Sequential partial download: every range inside the prefix is done
+        done = {start for start, end in ranges if end < part_size}
+
+    # Preallocate the full size so every range can be written in place
+    with open(part_path, 'r+b' if part_size else 'wb') as f:
+        f.truncate(size)
+
+    lock = threading.Lock()
+    fetched = 0
+
+    def save_progress():
+        # Written aside and renamed, so a crash never leaves half a progress file
+        tmp_path = f"{progress_path}.tmp"
+        with open(tmp_path, 'w') as progress_file:
+            json.dump({'range_size': range_size, 'done': sorted(done)}, progress_file)
+        os.replace(tmp_path, progress_path)
+
+    def fetch(start, end):
+        nonlocal fetched
+        with open(part_path, 'r+b') as f:
+            def write(offset, chunk):
+                f.seek(offset)
+                f.write(chunk)
+
+            fetch_byte_range(download_url, access_token, start, end, write=write)
+
+        with lock:
+            done.add(start)
+            fetched += end - start + 1
+            save_progress()
+
+    pending = [(start, end) for start, end in ranges if start not in done]
+    try:
+        with ThreadPoolExecutor(max_workers=connections) as executor:
+            futures = [executor.submit(fetch, start, end) for start, end in pending]
+            try:
+                for future in futures:
+                    future.result()
+            except Exception:
+                # Don't start the ranges still queued
+                for future in futures:
+                    future.cancel()
+                raise
+    except ValueError as e:
+        # The server sent the whole file (200) instead of a range
+        print(f"{e}; downloading {os.path.basename(filepath)} in one stream instead")
+        # Keep the ranges completed from the start as a sequential prefix
+        prefix = 0
+        for start, end in ranges:
+            if start not in done:
+                break
+            prefix = end + 1
+        with open(part_path, 'r+b') as f:
+            f.truncate(prefix)
+        if os.path.exists(progress_path):
+            os.remove(progress_path)
+        return fetched + download_to_file(download_url, access_token, filepath, size)
+
+    os.replace(part_path, filepath)
+    if os.path.exists(progress_path):
+        os.remove(progress_path)
+    return fetched
 
 def download_large_recordings(
         access_token,
         min_size_mb=20,
-        download_dir='zoom_recordings'
+        download_dir='zoom_recordings',
+        resume=True,
+        user_id='me'
 ):
     """
     Download Zoom recordings larger than specified size
@@ -113,6 +768,11 @@ def download_large_recordings(
         access_token (str): Zoom API access token
         min_size_mb (int): Minimum file size to download in MB
         download_dir (str): Directory to save downloaded recordings
+        resume (bool): Stream each file to a ``.part`` file and resume partial
+            downloads, skipping files that are already complete on disk. Files
+            of RANGED_DOWNLOAD_THRESHOLD_MB or more are fetched over several
+            connections at once
+        user_id (str): Zoom user whose recordings are downloaded, or 'me'
 
     Returns:
         list: Paths of downloaded recordings
@@ -120,32 +780,55 @@ def download_large_recordings(
     # Create download directory if it doesn't exist
     os.makedirs(download_dir, exist_ok=True)
 
-    # Fetch recordings
-    user_id = 'me'
-    recordings_data = fetch_recordings(user_id, access_token)
-
     downloaded_files = []
 
-    for meeting in recordings_data.get('meetings', []):
+    for meeting in iter_recordings(user_id, access_token):
         for recording in meeting.get('recording_files', []):
             # Check file size
             file_size_mb = recording['file_size'] / (1024 * 1024)
 
             if file_size_mb >= min_size_mb:
                 # Prepare filename
-                filename = f"{meeting['id']}_{recording['id']}.{recording['file_type']}"
+                file_extension = recording.get('file_extension') or recording['file_type']
+                filename = f"{meeting['id']}_{recording['id']}.{file_extension}"
                 filepath = os.path.join(download_dir, filename)
 
                 # Download file
                 download_url = recording['download_url']
-                headers = {"Authorization": f"Bearer {access_token}"}
+                started = time.monotonic()
 
-                response = requests.get(download_url, headers=headers)
+                if resume:
+                    if file_size_mb >= RANGED_DOWNLOAD_THRESHOLD_MB:
+                        # Large file: several connections at once
+                        fetched = download_ranges_to_file(
+                            download_url,
+                            access_token,
+                            filepath,
+                            recording['file_size']
+                        )
+                    else:
+                        fetched = download_to_file(
+                            download_url,
+                            access_token,
+                            filepath,
+                            expected_size=recording['file_size']
+                        )
+                    downloaded_files.append(filepath)
+                    if not fetched:
+                        FILES_PROCESSED.inc(stage='download', outcome='skipped')
+                        print(f"Already downloaded: {filename}")
+                        continue
+                else:
+                    response = get_zoom_client().get(download_url, access_token)
 
-                with open(filepath, 'wb') as f:
-                    f.write(response.content)
+                    with open(filepath, 'wb') as f:
+                        f.write(response.content)
+                    BYTES_TRANSFERRED.inc(len(response.content), direction='download')
 
-                downloaded_files.append(filepath)
+                    downloaded_files.append(filepath)
+
+                FILE_SECONDS.observe(time.monotonic() - started, stage='download')
+                FILES_PROCESSED.inc(stage='download', outcome='done')
                 print(f"Downloaded: {filename} (Size: {file_size_mb:.2f} MB)")
 
     return downloaded_files
@@ -153,48 +836,193 @@ def download_large_recordings(
 #=====================================
 # Google functions
 #=====================================
+def list_folder_files(drive_service, folder_id=None, page_size=1000):
+    """
+    List the files in a Drive folder with one paged query
+
+    Args:
+        drive_service: Google Drive service
+        folder_id (str, optional): Folder to list; defaults to My Drive's root
+
+    Returns:
+        dict: File name -> list of {'id', 'name', 'size', 'md5Checksum'}
+    """
+    query = f"'{folder_id or 'root'}' in parents and trashed = false"
+    files_by_name = {}
+    page_token = None
+    while True:
+        with track_api_call('drive', 'files.list'):
+            results = drive_service.files().list(
+                q=query,
+                spaces='drive',
+                fields='nextPageToken, files(id, name, size, md5Checksum)',
+                pageSize=page_size,
+                pageToken=page_token
+            ).execute()
+        for drive_file in results.get('files', []):
+            files_by_name.setdefault(drive_file['name'], []).append(drive_file)
+        page_token = results.get('nextPageToken')
+        if not page_token:
+            return files_by_name
+
+def file_md5(file_path, chunk_size=DOWNLOAD_CHUNK_SIZE):
+    md5 = hashlib.md5()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+def find_uploaded_copy(file_path, drive_files, verify_md5=LOCAL_UPLOAD_VERIFY_MD5):
+    """
+    Find a Drive file with the same name and size as ``file_path``
+
+    Args:
+        file_path (str): Local file
+        drive_files (dict): Listing of the destination from list_folder_files
+        verify_md5 (bool): Also require Drive's md5Checksum to match the local file
+
+    Returns:
+        dict: The matching Drive file, or None
+    """
+    size = os.path.getsize(file_path)
+    candidates = [
+        drive_file for drive_file in drive_files.get(os.path.basename(file_path), [])
+        if drive_file.get('size') is not None and int(drive_file['size']) == size
+    ]
+    if candidates and verify_md5:
+        local_md5 = file_md5(file_path)
+        candidates = [drive_file for drive_file in candidates if drive_file.get('md5Checksum') == local_md5]
+    return candidates[0] if candidates else None
+
+def upload_file_to_drive(
+        drive_service,
+        file_path,
+        file_metadata,
+        manifest=None,
+        chunk_size_mb=LOCAL_UPLOAD_CHUNK_SIZE_MB,
+        multipart_max_mb=LOCAL_UPLOAD_MULTIPART_MAX_MB
+):
+    """
+    Upload one local file to Google Drive
+
+    Files up to ``multipart_max_mb`` go up in a single multipart request;
+    larger ones in resumable chunks of ``chunk_size_mb``, so memory use
+    stays at one chunk per file.
+
+    Args:
+        drive_service: Google Drive service
+        file_path (str): Local file to upload
+        file_metadata (dict): Drive metadata for the new file (name, parents, ...)
+        manifest (TransferManifest, optional): Keeps the resumable upload
+            session, so a rerun continues an interrupted upload
+        chunk_size_mb (int): Resumable chunk size in MB; a multiple of 0.25
+        multipart_max_mb (float): Largest file in MB sent in a single request
+
+    Returns:
+        tuple: (Drive response for the created file, bytes sent)
+    """
+    # Imported here so the Zoom-only scripts never load the Google client libraries
+    from googleapiclient.http import MediaFileUpload
+    from drive_streaming import iter_upload_chunks, open_upload_session
+
+    stat = os.stat(file_path)
+    file_size = stat.st_size
+    chunk_size = int(chunk_size_mb * 1024 * 1024)
+
+    if file_size <= multipart_max_mb * 1024 * 1024:
+        with track_api_call('drive', 'files.create'):
+            file = drive_service.files().create(
+                body=file_metadata,
+                media_body=MediaFileUpload(file_path),
+                fields='id'
+            ).execute()
+        return file, file_size
+
+    # Chunked resumable upload whose session survives a crash. The key includes the
+    # modification time, so a replaced file, even one of the same size, starts a new session
+    upload_key = f"file:{os.path.abspath(file_path)}:{file_size}:{stat.st_mtime_ns}"
+    session = open_upload_session(drive_service, manifest, upload_key, file_size)
+    if session and session.file:
+        return session.file, 0
+    offset = session.offset if session else 0
+
+    request = drive_service.files().create(
+        body=file_metadata,
+        media_body=MediaFileUpload(file_path, chunksize=chunk_size, resumable=True),
+        fields='id'
+    )
+    for file in iter_upload_chunks(request, session):
+        pass
+    return file, file_size - offset
+
+def load_drive_service_factory(token_path='token.json'):
+    """
+    Returns:
+        callable: Builds a Google Drive service from the credentials in
+        ``token_path`` on every call
+    """
+    # Imported here so the Zoom-only scripts never load the Google client libraries
+    from drive_service import build_drive_service, load_drive_credentials
+
+    creds = load_drive_credentials(token_path)
+    return lambda: build_drive_service(creds)
+
 def upload_to_google_drive(
         credentials_path,
         files_to_upload,
-        folder_name=None
+        folder_name=None,
+        drive_service=None,
+        manifest=None,
+        drive_service_factory=None,
+        max_workers=LOCAL_UPLOAD_WORKERS,
+        skip_existing=True,
+        chunk_size_mb=LOCAL_UPLOAD_CHUNK_SIZE_MB,
+        multipart_max_mb=LOCAL_UPLOAD_MULTIPART_MAX_MB
 ):
     """
     Upload files to Google Drive, optionally to a specified folder
 
+    The destination folder is listed once up front; files already there
+    with the same name and size are skipped. The rest are uploaded by a
+    pool of ``max_workers`` threads, each with its own Drive service.
+
     Args:
         credentials_path (str): Path to Google OAuth credentials file
         files_to_upload (list): List of file paths to upload
         folder_name (str, optional): Name of folder to upload files to in Google Drive
+        drive_service (optional): Google Drive service to use instead of
+            building one from token.json
+        manifest (TransferManifest, optional): Keeps each file's resumable
+            upload session, so a rerun continues interrupted uploads
+        drive_service_factory (callable, optional): Builds a Drive service per
+            worker thread; without it, a given ``drive_service`` uploads the
+            files one at a time
+        max_workers (int): Files uploaded at the same time
+        skip_existing (bool): Skip files already in the destination folder
+        chunk_size_mb (int): Resumable upload chunk size in MB
+        multipart_max_mb (float): Largest file in MB uploaded in a single request
 
     Returns:
         list: File IDs of uploaded files
     """
 
-    # Load credentials from JSON file
-    with open('token.json', 'r') as token_file:
-        token_info = json.load(token_file)
-
-    # Reconstruct credentials
-    creds = Credentials(
-        token=token_info['token'],
-        refresh_token=token_info['refresh_token'],
-        token_uri=token_info['token_uri'],
-        client_id=token_info['client_id'],
-        client_secret=token_info['client_secret'],
-        scopes=token_info['scopes']
-    )
-
-    # Build Google Drive service
-    drive_service = build('drive', 'v3', credentials=creds)
+    if drive_service is None and drive_service_factory is None:
+        drive_service_factory = load_drive_service_factory()
+    if drive_service is None:
+        drive_service = drive_service_factory()
+    if drive_service_factory is None:
+        # httplib2 connections are not thread-safe; share the one service serially
+        max_workers = 1
 
     # If folder_name is provided, find or create the folder
     folder_id = None
     if folder_name:
         # Check if folder already exists
-        results = drive_service.files().list(
-            q=f"name='{folder_name}' and mimeType='application/vnd.google-apps.folder'",
-            spaces='drive'
-        ).execute()
+        with track_api_call('drive', 'files.list'):
+            results = drive_service.files().list(
+                q=f"name='{folder_name}' and mimeType='application/vnd.google-apps.folder'",
+                spaces='drive'
+            ).execute()
 
         folders = results.get('files', [])
 
@@ -204,10 +1032,11 @@ def upload_to_google_drive(
                 'name': folder_name,
                 'mimeType': 'application/vnd.google-apps.folder'
             }
-            folder = drive_service.files().create(
-                body=folder_metadata,
-                fields='id'
-            ).execute()
+            with track_api_call('drive', 'files.create'):
+                folder = drive_service.files().create(
+                    body=folder_metadata,
+                    fields='id'
+                ).execute()
             folder_id = folder.get('id')
             print(f"Created new folder: {folder_name}")
         else:
@@ -215,8 +1044,26 @@ def upload_to_google_drive(
             folder_id = folders[0]['id']
             print(f"Using existing folder: {folder_name}")
 
-    uploaded_file_ids = []
-    for file_path in files_to_upload:
+    # One listing of the destination instead of a query per file
+    pending = list(files_to_upload)
+    if skip_existing:
+        drive_files = list_folder_files(drive_service, folder_id)
+        skipped = len(pending)
+        pending = [file_path for file_path in pending if not find_uploaded_copy(file_path, drive_files)]
+        skipped -= len(pending)
+        if skipped:
+            FILES_PROCESSED.inc(skipped, stage='upload', outcome='skipped')
+            print(f"Skipping {skipped} files already in Google Drive")
+
+    local = threading.local()
+
+    def upload(file_path):
+        service = drive_service
+        if max_workers > 1:
+            service = getattr(local, 'service', None)
+            if service is None:
+                service = local.service = drive_service_factory()
+
         file_metadata = {
             'name': os.path.basename(file_path)
         }
@@ -225,16 +1072,29 @@ def upload_to_google_drive(
         if folder_id:
             file_metadata['parents'] = [folder_id]
 
-        media = MediaFileUpload(file_path)
-
         # Upload file
-        file = drive_service.files().create(
-            body=file_metadata,
-            media_body=media,
-            fields='id'
-        ).execute()
-
-        uploaded_file_ids.append(file.get('id'))
+        started = time.monotonic()
+        file, uploaded_bytes = upload_file_to_drive(
+            service, file_path, file_metadata, manifest, chunk_size_mb, multipart_max_mb)
+        FILE_SECONDS.observe(time.monotonic() - started, stage='upload')
+        FILES_PROCESSED.inc(stage='upload', outcome='done')
+        BYTES_TRANSFERRED.inc(uploaded_bytes, direction='upload')
         print(f"Uploaded: {os.path.basename(file_path)} to Google Drive")
+        return file.get('id')
+
+    uploaded_file_ids = []
+    failed_uploads = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(upload, file_path): file_path for file_path in pending}
+        for future in as_completed(futures):
+            try:
+                uploaded_file_ids.append(future.result())
+            except Exception as e:
+                print(f"Error uploading {os.path.basename(futures[future])}: {e}")
+                failed_uploads.append(futures[future])
+                FILES_PROCESSED.inc(stage='upload', outcome='failed')
+
+    if failed_uploads:
+        print(f"\n{len(failed_uploads)} files failed to upload; rerun to retry them")
 
-    return uploaded_file_ids
\ No newline at end of file
+    return uploaded_file_ids
@@ -85,4 +85,221 @@ COURSE_MAPPING_ZOOM1 = {
     }
 }
 
-DAY_OF_WEEK = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
\ No newline at end of file
+DAY_OF_WEEK = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# Recording listing
+# Earliest date to list recordings from (yyyy-mm-dd)
+RECORDINGS_FROM_DATE = "2024-12-01"
+# Zoom accepts up to 300 meetings per page and at most one month per request
+RECORDINGS_PAGE_SIZE = 300
+# Number of month windows listed at the same time
+LISTING_MAX_WORKERS = 4
+
+# Transfer tuning
+# Size of each read from a Zoom download stream
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+# Size of each Drive resumable upload chunk; this caps the memory used per
+# streamed file. Must be a multiple of 256 KB.
+STREAM_CHUNK_SIZE_MB = 8
+
+# Local staging of downloads
+# Directory for spill files that keep each download until Drive has the
+# whole file, so a failed upload is retried without downloading from Zoom
+# again. None streams straight from Zoom to Drive.
+STAGING_DIR = None
+# Disk space the spill files of one process may take up. Copies kept for a
+# retry are evicted, least recently used first, to make room; a file that
+# still doesn't fit streams without staging.
+STAGING_MAX_MB = 10 * 1024
+# Upload attempts from the staged copy before the transfer counts as failed
+STAGING_UPLOAD_ATTEMPTS = 3
+
+# Transfer verification
+# Also compute SHA-256 while streaming and compare it with Drive's sha256Checksum
+VERIFY_SHA256 = False
+# Attempts per file when Drive's copy does not match what Zoom served
+VERIFY_MAX_ATTEMPTS = 3
+
+# Recording-file selection, applied to each meeting before any bytes move.
+# Zoom keeps one file per video layout plus an audio-only copy of every
+# recording segment; only the preferred video is transferred. A course can
+# override any key with a 'recording_policy' dict in its course mapping
+# entry. Set to None to transfer every file above the size threshold.
+RECORDING_POLICY = {
+    # Video layouts, most preferred first
+    'video_types': [
+        'shared_screen_with_speaker_view(CC)',
+        'shared_screen_with_speaker_view',
+        'shared_screen_with_gallery_view',
+        'shared_screen',
+        'active_speaker',
+        'speaker_view',
+        'gallery_view',
+    ],
+    # Videos kept per recording segment
+    'videos_per_segment': 1,
+    # Also keep the audio-only copy of segments that have a video
+    'keep_audio_only': False,
+    # Small text artifacts kept whatever their size
+    'keep_file_types': ['TRANSCRIPT', 'CHAT', 'CC', 'TIMELINE', 'SUMMARY'],
+}
+
+# Concurrent transfers
+# Run Zoom -> Drive transfers on the asyncio engine instead of one at a time
+USE_ASYNC_TRANSFERS = True
+# Maximum simultaneous Zoom downloads
+ZOOM_DOWNLOAD_CONCURRENCY = 4
+# Maximum simultaneous Drive uploads
+DRIVE_UPLOAD_CONCURRENCY = 4
+
+# Local directory uploads (UploadFilesToGoogleDrive)
+# Files uploaded at the same time, each thread with its own Drive service
+LOCAL_UPLOAD_WORKERS = 4
+# Resumable upload chunk size. Must be a multiple of 256 KB.
+LOCAL_UPLOAD_CHUNK_SIZE_MB = 32
+# Files up to this size go up in a single multipart request, which holds
+# the whole file in memory (several copies of it while the body is built);
+# larger ones use the resumable upload, one chunk in memory at a time
+LOCAL_UPLOAD_MULTIPART_MAX_MB = 5
+# Also compare MD5 checksums before skipping a file that is already in the
+# destination folder with the same name and size (reads every such file)
+LOCAL_UPLOAD_VERIFY_MD5 = False
+
+# Google Drive folder cache
+# File the (parent, name) -> folder ID cache is persisted to
+FOLDER_CACHE_PATH = '.drive_folder_cache.json'
+# Cached folder IDs older than this are looked up again
+FOLDER_CACHE_TTL_SECONDS = 24 * 60 * 60
+# Lock file that serializes folder creation between sync processes
+FOLDER_LOCK_PATH = '.drive_folders.lock'
+
+# Google Drive client
+# Drive v3 discovery document, kept here if the installed
+# google-api-python-client doesn't bundle one
+DRIVE_DISCOVERY_CACHE_PATH = '.drive_discovery_v3.json'
+
+# SQLite manifest of completed Zoom -> Drive transfers
+TRANSFER_MANIFEST_PATH = 'transfer_manifest.db'
+
+# Zoom HTTP client
+# Keep-alive connections kept open per host
+ZOOM_HTTP_POOL_SIZE = 10
+# Extra attempts after a 5xx response or a connection error
+ZOOM_MAX_RETRIES = 4
+# Delay before the first retry; doubles on every retry
+ZOOM_BACKOFF_SECONDS = 1.0
+
+# Zoom access token cache, shared by all scripts and workers
+ZOOM_TOKEN_CACHE_PATH = '.zoom_token_cache.json'
+# Refresh a cached token this long before it expires
+ZOOM_TOKEN_REFRESH_MARGIN_SECONDS = 5 * 60
+
+# Zoom API rate limits, requests per second per category (Pro account values;
+# raise them for Business and Enterprise accounts)
+ZOOM_RATE_LIMITS = {
+    'light': 30,
+    'medium': 20,
+    'heavy': 10,
+    'resource_intensive': 10 / 60,
+}
+# A 429 asking us to wait longer than this (e.g. a daily limit) is returned as an error
+ZOOM_MAX_RATE_LIMIT_WAIT_SECONDS = 15 * 60
+
+# Google Drive batch requests
+# Maximum calls per batch request (Drive API limit)
+DRIVE_BATCH_LIMIT = 100
+# Meetings whose folders are resolved together before their transfers start
+FOLDER_PREFETCH_BATCH_SIZE = 100
+
+# Parallel ranged downloads
+# Files at least this large are downloaded over several connections at once
+RANGED_DOWNLOAD_THRESHOLD_MB = 512
+# Simultaneous connections per large file
+RANGED_DOWNLOAD_CONNECTIONS = 4
+# Size of each byte range; a streamed transfer buffers up to
+# RANGED_DOWNLOAD_CONNECTIONS ranges in memory
+RANGED_DOWNLOAD_PART_MB = 16
+
+# Cleanup of small Zoom recordings
+# Trash whole meetings whose recordings add up to less than this
+CLEANUP_MAX_MEETING_SIZE_MB = 2
+# In larger meetings, trash single media files smaller than this
+CLEANUP_MAX_FILE_SIZE_MB = 2
+# Only these file types are trashed one by one; chat, transcripts and other
+# small text artifacts are always kept
+CLEANUP_FILE_TYPES = ('MP4', 'M4A')
+# Simultaneous trash calls (still subject to the Zoom rate limiter)
+CLEANUP_MAX_WORKERS = 8
+# Only print the plan; set to False to actually trash recordings
+CLEANUP_DRY_RUN = True
+
+# Meeting participants
+# Look up participants in the background during transfers
+PREFETCH_PARTICIPANTS = True
+# One JSON file per meeting UUID; past meetings never change
+PARTICIPANTS_CACHE_DIR = '.participants_cache'
+# Simultaneous participant lookups (still subject to the Zoom rate limiter)
+PARTICIPANTS_MAX_WORKERS = 4
+
+# Metrics
+# Prometheus text file rewritten during a run (e.g. for node_exporter's
+# textfile collector); None disables it
+METRICS_TEXTFILE_PATH = None
+# Seconds between rewrites of the metrics text file
+METRICS_EXPORT_INTERVAL_SECONDS = 30
+# Port to serve /metrics on during a run; None disables it
+METRICS_PORT = None
+# Address the /metrics endpoint listens on. It has no authentication, so it
+# only accepts local connections unless this is changed (e.g. to '0.0.0.0')
+METRICS_HOST = '127.0.0.1'
+
+# Zoom accounts synced by SyncAllZoomAccounts.py
+# Each account keeps its own token, rate-limit budget and course mapping.
+# 'users': None syncs every active user of the account; a list of user IDs
+# or emails syncs only those. 'rate_limits' (optional) overrides
+# ZOOM_RATE_LIMITS for accounts on a different Zoom plan.
+ZOOM_ACCOUNTS = {
+    'zoom2': {
+        'client_id': ZOOM_2_CLIENT_ID,
+        'client_secret': ZOOM_2_CLIENT_SECRET,
+        'token_url': ZOOM_2_TOKEN_URL,
+        'course_mapping': COURSE_MAPPING_ZOOM2,
+        'users': None,
+    },
+    # Add the first account once its server-to-server app credentials exist:
+    # 'zoom1': {
+    #     'client_id': ZOOM_1_CLIENT_ID,
+    #     'client_secret': ZOOM_1_CLIENT_SECRET,
+    #     'token_url': ZOOM_1_TOKEN_URL,
+    #     'course_mapping': COURSE_MAPPING_ZOOM1,
+    #     'users': None,
+    # },
+}
+# Worker processes for the multi-account sync; None uses one per CPU core
+SYNC_MAX_PROCESSES = None
+
+# Sync daemon (ZoomSyncDaemon.py)
+# Seconds between listing + transfer runs
+DAEMON_TRANSFER_INTERVAL_SECONDS = 15 * 60
+# Seconds between cleanup runs (CLEANUP_DRY_RUN still applies); None disables cleanup
+DAEMON_CLEANUP_INTERVAL_SECONDS = 6 * 60 * 60
+# Days listed again before the watermark, for recordings Zoom finishes processing late
+DAEMON_OVERLAP_DAYS = 2
+# A file that failed this many times no longer holds the watermark back
+DAEMON_MAX_ATTEMPTS = 5
+# Minimum file size transferred by the daemon
+DAEMON_MIN_SIZE_MB = 200
+
+# Zoom webhooks (ZoomWebhookReceiver.py)
+# Secret token of the app's event subscription; signs every webhook request
+ZOOM_WEBHOOK_SECRET_TOKEN = ""
+# Address the receiver listens on; expose it through a TLS reverse proxy or tunnel
+WEBHOOK_HOST = '127.0.0.1'
+WEBHOOK_PORT = 8080
+WEBHOOK_PATH = '/zoom/webhook'
+# Requests signed further from the current time than this are rejected as replays
+WEBHOOK_MAX_CLOCK_SKEW_SECONDS = 5 * 60
+# Every verified event body is saved here for ReplayZoomWebhooks.py; None disables it
+WEBHOOK_EVENTS_DIR = 'webhook_events'
+# Minimum file size transferred when a recording.completed event arrives
+WEBHOOK_MIN_SIZE_MB = 200
@@ -0,0 +1,176 @@
+# Course classification of Zoom meetings by weekday and time
+import bisect
+import re
+from datetime import datetime
+
+import pytz
+
+from constants import DAY_OF_WEEK, RECORDING_POLICY
+from recording_policy import RecordingPolicy
+
+TIME_RANGE_PATTERN = re.compile(r'(\d+):(\d+)(am|pm)-(\d+):(\d+)(am|pm)', re.IGNORECASE)
+MEETING_TIMEZONE = pytz.timezone('US/Pacific')
+
+
+def _to_24_hour(hour, meridiem):
+    hour = int(hour)
+    if meridiem.lower() == 'pm' and hour != 12:
+        hour += 12
+    elif meridiem.lower() == 'am' and hour == 12:
+        hour = 0
+    return hour
+
+
+def parse_time_range_minutes(time_str, is_saturday=False):
+    """
+    Parse a time range like '4:00PM-6:19PM' into minutes since midnight
+
+    The schedule buffer is applied here: 5 minutes on each side on
+    Saturdays, 10 minutes on other days. Buffered times are kept within the
+    same day.
+
+    Args:
+        time_str (str): Time range in format '4:00pm - 6:19pm'
+        is_saturday (bool): Whether the day is Saturday
+
+    Returns:
+        tuple: (start_minute, end_minute), both inclusive
+    """
+    match = TIME_RANGE_PATTERN.match(time_str.replace(' ', ''))
+    if not match:
+        raise ValueError(f"Unable to parse time range: {time_str}")
+
+    start_hour, start_minute, start_meridiem, end_hour, end_minute, end_meridiem = match.groups()
+    start = _to_24_hour(start_hour, start_meridiem) * 60 + int(start_minute)
+    end = _to_24_hour(end_hour, end_meridiem) * 60 + int(end_minute)
+
+    buffer_minutes = 5 if is_saturday else 10
+    return max(0, start - buffer_minutes), min(24 * 60 - 1, end + buffer_minutes)
+
+
+def get_meeting_datetime(meeting):
+    """
+    Meeting start time converted from Zoom's UTC timestamp to US/Pacific
+
+    Returns:
+        datetime: Localized start time, or None if the meeting has none
+    """
+    start_time = meeting.get('start_time')
+    if not start_time:
+        return None
+    utc_time = datetime.fromisoformat(start_time.replace('Z', '+00:00'))
+    return utc_time.astimezone(MEETING_TIMEZONE)
+
+
+class CourseIndex:
+    """
+    Course mapping compiled into a per-weekday lookup table.
+
+    Every slot is parsed once, with its buffer applied. Each weekday becomes
+    a sorted list of boundaries that splits the day into segments, and each
+    segment holds the folder of the first course (in mapping order) covering
+    it. Looking up a meeting is then a single binary search, with the same
+    answer the original linear scan over all courses gave.
+    """
+
+    def __init__(self, course_mapping):
+        self.course_mapping = course_mapping
+        self._bounds = {}
+        self._folders = {}
+        # Topic fallback, in mapping order
+        self._topics = [(course_name, course_info['folder_name']) for course_name, course_info in course_mapping.items()]
+        # Recording selection per course folder, with the courses' overrides applied
+        self.default_policy = RecordingPolicy.from_config(RECORDING_POLICY)
+        self._policies = {
+            course_info['folder_name']: RecordingPolicy.from_config(RECORDING_POLICY, course_info['recording_policy'])
+            for course_info in course_mapping.values() if 'recording_policy' in course_info
+        }
+
+        # (start second, end second, mapping order, folder name) per weekday
+        intervals = {}
+        for order, (course_name, course_info) in enumerate(course_mapping.items()):
+            for day, time_ranges in course_info['schedule'].items():
+                if day not in DAY_OF_WEEK:
+                    print(f"Ignoring unknown weekday '{day}' in the schedule for {course_name}")
+                    continue
+                for time_range in time_ranges:
+                    try:
+                        start, end = parse_time_range_minutes(time_range, day == 'Saturday')
+                    except ValueError as e:
+                        print(f"Error parsing time for {course_name}: {e}")
+                        continue
+                    intervals.setdefault(day, []).append((start * 60, end * 60, order, course_info['folder_name']))
+
+        for day, day_intervals in intervals.items():
+            self._compile_day(day, day_intervals)
+
+    def _compile_day(self, day, day_intervals):
+        # Segment boundaries: every start, and the second after every end
+        bounds = sorted({0} | {start for start, _, _, _ in day_intervals} | {end + 1 for _, end, _, _ in day_intervals})
+        folders = []
+        for segment_start in bounds:
+            covering = [
+                (order, folder_name) for start, end, order, folder_name in day_intervals
+                if start <= segment_start <= end
+            ]
+            folders.append(min(covering)[1] if covering else None)
+        self._bounds[day] = bounds
+        self._folders[day] = folders
+
+    def lookup(self, meeting_datetime):
+        """
+        Find the course folder scheduled at the meeting's day and time
+
+        Args:
+            meeting_datetime (datetime): Localized datetime of the meeting
+
+        Returns:
+            str: Matching course folder name or None if no match found
+        """
+        day = meeting_datetime.strftime('%A')
+        bounds = self._bounds.get(day)
+        if not bounds:
+            return None
+        second = meeting_datetime.hour * 3600 + meeting_datetime.minute * 60 + meeting_datetime.second
+        return self._folders[day][bisect.bisect_right(bounds, second) - 1]
+
+    def match_topic(self, topic):
+        """
+        Return the folder of the first course whose name appears in the topic
+        """
+        for course_name, folder_name in self._topics:
+            if course_name in topic:
+                return folder_name
+        return None
+
+    def classify_meeting(self, meeting, default='Others'):
+        """
+        Course folder for one Zoom meeting: by schedule, then by topic, then ``default``
+        """
+        meeting_datetime = get_meeting_datetime(meeting)
+        folder_name = self.lookup(meeting_datetime) if meeting_datetime else None
+        return folder_name or self.match_topic(meeting.get('topic', '')) or default
+
+    def policy_for(self, meeting):
+        """
+        Recording selection policy of the meeting's course
+
+        Returns:
+            RecordingPolicy: The course's policy, or None if every file is transferred
+        """
+        if not self._policies:
+            return self.default_policy
+        return self._policies.get(self.classify_meeting(meeting), self.default_policy)
+
+    def classify(self, meetings, default='Others'):
+        """
+        Classify a batch of Zoom meetings in one pass
+
+        Args:
+            meetings (iterable): Meeting objects as returned by Zoom
+            default (str): Folder for meetings that match no course
+
+        Returns:
+            list: Course folder name per meeting, in input order
+        """
+        return [self.classify_meeting(meeting, default) for meeting in meetings]
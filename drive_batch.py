@@ -0,0 +1,99 @@
+# Batched Google Drive API requests
+from constants import DRIVE_BATCH_LIMIT
+from metrics import track_api_call
+
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+
+
+def execute_batch(drive_service, requests):
+    """
+    Execute Drive API requests through the batch endpoint
+
+    Requests are sent in groups of up to DRIVE_BATCH_LIMIT, so n requests
+    cost ceil(n / limit) HTTP round trips instead of n.
+
+    Args:
+        drive_service: Google Drive service
+        requests (list): Unexecuted requests, e.g. ``drive_service.files().list(...)``
+
+    Returns:
+        list: (response, exception) per request, in input order
+    """
+    results = [None] * len(requests)
+
+    def store(index):
+        def callback(request_id, response, exception):
+            results[index] = (response, exception)
+        return callback
+
+    for start in range(0, len(requests), DRIVE_BATCH_LIMIT):
+        batch = drive_service.new_batch_http_request()
+        for index in range(start, min(start + DRIVE_BATCH_LIMIT, len(requests))):
+            batch.add(requests[index], callback=store(index))
+        with track_api_call('drive', 'batch'):
+            batch.execute()
+
+    return results
+
+
+def escape_query_value(name):
+    # Quote a name for use inside a Drive query string
+    return name.replace('\\', '\\\\').replace("'", "\\'")
+
+
+def lookup_folders(drive_service, keys):
+    """
+    Find several folders at once
+
+    Args:
+        drive_service: Google Drive service
+        keys (iterable): (parent folder ID or None, folder name) pairs; without
+            a parent the folder is looked up by name anywhere in Drive
+
+    Returns:
+        dict: Folder ID per key that exists
+    """
+    keys = list(dict.fromkeys(keys))
+    requests = []
+    for parent_id, name in keys:
+        query = f"name='{escape_query_value(name)}' and mimeType='{FOLDER_MIME_TYPE}'"
+        if parent_id:
+            query += f" and '{parent_id}' in parents"
+        requests.append(drive_service.files().list(q=query, spaces='drive', fields='files(id)'))
+
+    found = {}
+    for key, (response, exception) in zip(keys, execute_batch(drive_service, requests)):
+        if exception:
+            raise exception
+        folders = response.get('files', [])
+        if folders:
+            found[key] = folders[0]['id']
+    return found
+
+
+def create_folders(drive_service, keys):
+    """
+    Create several folders at once
+
+    Args:
+        drive_service: Google Drive service
+        keys (iterable): (parent folder ID or None, folder name) pairs
+
+    Returns:
+        dict: New folder ID per key
+    """
+    keys = list(dict.fromkeys(keys))
+    requests = []
+    for parent_id, name in keys:
+        folder_metadata = {'name': name, 'mimeType': FOLDER_MIME_TYPE}
+        if parent_id:
+            folder_metadata['parents'] = [parent_id]
+        requests.append(drive_service.files().create(body=folder_metadata, fields='id'))
+
+    created = {}
+    for key, (response, exception) in zip(keys, execute_batch(drive_service, requests)):
+        if exception:
+            raise exception
+        created[key] = response['id']
+        print(f"Created new {'subfolder' if key[0] else 'parent folder'}: {key[1]}")
+    return created
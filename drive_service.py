@@ -0,0 +1,82 @@
+# Google Drive services built from a discovery document read once per process
+import json
+import os
+import threading
+
+import requests
+from google.oauth2.credentials import Credentials
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+
+from constants import DRIVE_DISCOVERY_CACHE_PATH
+
+DRIVE_DISCOVERY_URL = 'https://www.googleapis.com/discovery/v1/apis/drive/v3/rest'
+
+_discovery_content = None
+_discovery_content_lock = threading.Lock()
+
+
+def _read_discovery_document(cache_path):
+    # Bundled with google-api-python-client, else cached on disk, else fetched once
+    content = get_static_doc('drive', 'v3')
+    if content is None and cache_path and os.path.exists(cache_path):
+        with open(cache_path, 'r') as cache_file:
+            content = cache_file.read()
+    if content is None:
+        response = requests.get(DRIVE_DISCOVERY_URL, timeout=30)
+        response.raise_for_status()
+        content = response.text
+        if cache_path:
+            with open(cache_path, 'w') as cache_file:
+                cache_file.write(content)
+    return content
+
+
+def get_drive_discovery_content(cache_path=DRIVE_DISCOVERY_CACHE_PATH):
+    """
+    Drive v3 discovery document as JSON text, read on first use only
+
+    The text is what is shared: build_from_document modifies the parsed
+    document, so every service gets its own copy parsed from it.
+    """
+    global _discovery_content
+    with _discovery_content_lock:
+        if _discovery_content is None:
+            _discovery_content = _read_discovery_document(cache_path)
+        return _discovery_content
+
+
+def get_drive_discovery_document(cache_path=DRIVE_DISCOVERY_CACHE_PATH):
+    """
+    Returns:
+        dict: A freshly parsed copy of the Drive v3 discovery document
+    """
+    return json.loads(get_drive_discovery_content(cache_path))
+
+
+def build_drive_service(credentials):
+    """
+    Google Drive v3 service, built without fetching the discovery document again
+
+    Services are cheap to build this way, but not thread-safe: build one
+    per thread.
+    """
+    return build_from_document(get_drive_discovery_document(), credentials=credentials)
+
+
+def load_drive_credentials(token_path='token.json'):
+    """
+    Reconstruct Google Drive credentials from the saved token file
+    """
+    # Load credentials from JSON file
+    with open(token_path, 'r') as token_file:
+        token_info = json.load(token_file)
+
+    return Credentials(
+        token=token_info['token'],
+        refresh_token=token_info['refresh_token'],
+        token_uri=token_info['token_uri'],
+        client_id=token_info['client_id'],
+        client_secret=token_info['client_secret'],
+        scopes=token_info['scopes']
+    )
@@ -0,0 +1,292 @@
+# Streaming and resumable uploads to Google Drive
+import json
+from googleapiclient.http import MediaUpload
+from checksums import CHECKSUM_FIELDS
+from constants import STREAM_CHUNK_SIZE_MB
+from metrics import BYTES_TRANSFERRED, track_api_call
+
+# Drive requires every resumable chunk except the last to be a multiple of 256 KB
+CHUNK_ALIGNMENT = 256 * 1024
+
+
+class TruncatedStreamError(IOError):
+    """
+    The source stream ended before the size announced to Drive
+    """
+
+
+class StreamingMediaUpload(MediaUpload):
+    """
+    Resumable Drive media fed from a forward-only iterator of byte chunks.
+
+    Only the chunk currently being sent to Drive is kept in memory, so the
+    peak memory per file is roughly ``chunksize`` no matter how large the
+    file is.
+    """
+
+    def __init__(self, chunks, mimetype, size=None, chunksize=STREAM_CHUNK_SIZE_MB * 1024 * 1024, offset=0):
+        """
+        Args:
+            chunks (iterable): Byte chunks in file order (e.g. ``response.iter_content()``)
+            mimetype (str): Mimetype of the uploaded file
+            size (int, optional): Total size in bytes, if known up front
+            chunksize (int): Bytes sent to Drive per request, rounded up to 256 KB
+            offset (int): File offset of the first chunk, when resuming an
+                upload Drive has already committed that far
+        """
+        super().__init__()
+        self._chunks = iter(chunks)
+        self._mimetype = mimetype
+        self._size = size
+        self._chunksize = max(CHUNK_ALIGNMENT, -(-chunksize // CHUNK_ALIGNMENT) * CHUNK_ALIGNMENT)
+        # Bytes read from the iterator but not yet committed by Drive
+        self._window = bytearray()
+        self._window_start = offset
+        self._exhausted = False
+
+    def chunksize(self):
+        return self._chunksize
+
+    def mimetype(self):
+        return self._mimetype
+
+    def size(self):
+        return self._size
+
+    def resumable(self):
+        return True
+
+    def has_stream(self):
+        return False
+
+    def bytes_read(self):
+        # Bytes taken from the iterator so far
+        return self._window_start + len(self._window)
+
+    def _fill(self, length):
+        # Pull chunks until the window holds `length` bytes or the source ends
+        while len(self._window) < length and not self._exhausted:
+            try:
+                self._window.extend(next(self._chunks))
+            except StopIteration:
+                self._exhausted = True
+
+    def getbytes(self, begin, length):
+        """
+        Return ``length`` bytes starting at offset ``begin``.
+
+        Drive only ever asks for the chunk after the last committed byte, or
+        repeats the current chunk on a retry, so everything before ``begin``
+        can be released.
+        """
+        if begin < self._window_start:
+            raise ValueError(f"Cannot rewind stream to byte {begin}; already released up to {self._window_start}")
+
+        # Release bytes Drive has already committed
+        while begin > self._window_start:
+            if not self._window:
+                self._fill(1)
+                if not self._window:
+                    break
+            drop = min(begin - self._window_start, len(self._window))
+            del self._window[:drop]
+            self._window_start += drop
+
+        self._fill(length)
+        if self._exhausted and self._size is not None and self.bytes_read() < self._size:
+            # Sending the short tail would make Drive finish a truncated file
+            raise TruncatedStreamError(f"Stream ended at byte {self.bytes_read()} of {self._size}")
+        return bytes(self._window[:length])
+
+    def to_json(self):
+        # Records where the upload stands; the source iterator and the bytes in flight are left out
+        return self._to_json(strip=['_chunks', '_window', '_exhausted'])
+
+
+class UploadSession:
+    """
+    Resumable Drive upload session persisted in the transfer manifest.
+
+    The session URI is saved once Drive hands it out and the committed
+    offset after every chunk, so an upload cut short by a crash or restart
+    continues from the last byte Drive confirmed instead of starting over.
+    Drive keeps a session for about a week; an expired one is dropped and
+    the upload starts from zero.
+    """
+
+    def __init__(self, manifest, key, size=None):
+        """
+        Args:
+            manifest (TransferManifest): Where the session is saved
+            key (str): Identifies the uploaded file across runs
+            size (int, optional): Total size in bytes, if known up front
+        """
+        self.manifest = manifest
+        self.key = key
+        self.size = size
+        self.uri = None
+        self.offset = 0
+        # Drive's response, if the upload finished before the session was cleared
+        self.file = None
+
+    def restore(self, http):
+        """
+        Load the saved session and ask Drive how many bytes it has committed
+
+        Args:
+            http: Authorized HTTP client of the Drive service
+
+        Returns:
+            UploadSession: self, with ``offset`` (or ``file``, if the upload
+            had already completed) filled in
+        """
+        saved = self.manifest.get_upload_session(self.key)
+        if saved is None:
+            return self
+        uri, size, _ = saved
+        if size != self.size:
+            # The file changed since the session was started
+            self.clear()
+            return self
+
+        # An empty PUT with an unknown range is Drive's status query
+        headers = {'Content-Range': f"bytes */{'*' if self.size is None else self.size}", 'Content-Length': '0'}
+        with track_api_call('drive', 'upload_status'):
+            resp, content = http.request(uri, 'PUT', headers=headers)
+
+        if resp.status in (200, 201):
+            # Handed out once; later uploads with this key start a new session
+            self.file = json.loads(content)
+            self.clear()
+        elif resp.status == 308:
+            self.uri = uri
+            # No Range header means Drive has nothing yet
+            self.offset = int(resp['range'].split('-')[1]) + 1 if 'range' in resp else 0
+            print(f"Resuming upload of {self.key} at byte {self.offset}")
+        else:
+            print(f"Upload session for {self.key} is gone (status {resp.status}); starting over")
+            self.clear()
+        return self
+
+    def attach(self, request):
+        # Continue the saved session instead of opening a new one
+        if self.uri:
+            request.resumable_uri = self.uri
+            request.resumable_progress = self.offset
+
+    def save(self, request):
+        if request.resumable_uri and (request.resumable_uri, request.resumable_progress) != (self.uri, self.offset):
+            self.uri = request.resumable_uri
+            self.offset = request.resumable_progress
+            self.manifest.save_upload_session(self.key, self.uri, self.size, self.offset)
+
+    def clear(self):
+        self.uri = None
+        self.offset = 0
+        self.manifest.clear_upload_session(self.key)
+
+
+def open_upload_session(drive_service, manifest, key, size=None):
+    """
+    Restore the saved upload session for ``key``
+
+    Returns:
+        UploadSession: The restored session, or None without a manifest
+    """
+    if manifest is None:
+        return None
+    return UploadSession(manifest, key, size).restore(drive_service._http)
+
+
+def iter_upload_chunks(request, session=None, num_retries=3):
+    """
+    Send a resumable upload request to Drive one chunk at a time
+
+    With a session, the upload continues where the saved one stopped; the
+    session is saved after every chunk and cleared once Drive has the file.
+
+    Yields:
+        dict: None after each committed chunk, then Drive's response for the created file
+    """
+    if session:
+        session.attach(request)
+
+    response = None
+    while response is None:
+        with track_api_call('drive', 'upload_chunk'):
+            _, response = request.next_chunk(num_retries=num_retries)
+        if session:
+            if response is None:
+                session.save(request)
+            else:
+                session.clear()
+        yield response
+
+
+def upload_stream_to_drive(
+        drive_service,
+        chunks,
+        file_metadata,
+        mimetype,
+        size=None,
+        chunk_size_mb=STREAM_CHUNK_SIZE_MB,
+        num_retries=3,
+        session=None
+):
+    """
+    Upload a stream of byte chunks to Google Drive with a chunked resumable upload
+
+    Args:
+        drive_service: Google Drive service
+        chunks (iterable): Byte chunks in file order
+        file_metadata (dict): Drive metadata for the new file (name, parents, ...)
+        mimetype (str): Mimetype of the uploaded file
+        size (int, optional): Total size in bytes, if known
+        chunk_size_mb (int): Upload chunk size in MB; this bounds the memory used
+        num_retries (int): Retries per chunk on transient Drive errors
+        session (UploadSession, optional): Saved session to continue and keep
+            up to date; ``chunks`` must then start at ``session.offset``
+
+    Returns:
+        dict: Drive response for the created file, with CHECKSUM_FIELDS
+    """
+    media = StreamingMediaUpload(
+        chunks,
+        mimetype,
+        size=size,
+        chunksize=chunk_size_mb * 1024 * 1024,
+        offset=session.offset if session else 0
+    )
+    return upload_media_to_drive(drive_service, media, file_metadata, num_retries, session)
+
+
+def upload_media_to_drive(drive_service, media, file_metadata, num_retries=3, session=None):
+    """
+    Create a Drive file from resumable ``media``, counting the bytes Drive commits
+
+    Args:
+        drive_service: Google Drive service
+        media (MediaUpload): Resumable media with a ``bytes_read()`` method
+            returning the bytes taken from its source so far
+        file_metadata (dict): Drive metadata for the new file (name, parents, ...)
+        num_retries (int): Retries per chunk on transient Drive errors
+        session (UploadSession, optional): Saved session to continue and keep up to date
+
+    Returns:
+        dict: Drive response for the created file, with CHECKSUM_FIELDS
+    """
+    request = drive_service.files().create(
+        body=file_metadata,
+        media_body=media,
+        fields=CHECKSUM_FIELDS
+    )
+
+    response = None
+    uploaded = media.bytes_read()
+    for response in iter_upload_chunks(request, session, num_retries):
+        # Once the upload is complete, everything read has been committed
+        committed = media.bytes_read() if response is not None else request.resumable_progress
+        BYTES_TRANSFERRED.inc(committed - uploaded, direction='upload')
+        uploaded = committed
+
+    return response
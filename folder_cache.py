@@ -0,0 +1,114 @@
+# Cache of Google Drive folder IDs
+import json
+import os
+import threading
+import time
+
+from constants import FOLDER_CACHE_PATH, FOLDER_CACHE_TTL_SECONDS
+from metrics import FOLDER_CACHE_LOOKUPS
+
+
+class FolderCache:
+    """
+    Maps a (parent folder ID, folder name) pair to a Drive folder ID.
+
+    Entries live in memory and are mirrored to a JSON file so later runs
+    start warm. An entry older than ``ttl_seconds`` is treated as a miss and
+    gets looked up again, which picks up folders that were moved or deleted
+    in Drive.
+    """
+
+    def __init__(self, path=FOLDER_CACHE_PATH, ttl_seconds=FOLDER_CACHE_TTL_SECONDS):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.RLock()
+        self._entries = self._load()
+
+    @staticmethod
+    def _key(parent_id, name):
+        # Top-level lookups (no parent) use an empty parent ID
+        return f"{parent_id or ''}/{name}"
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r') as cache_file:
+                return json.load(cache_file)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable folder cache {self.path}: {e}")
+            return {}
+
+    def save(self):
+        """
+        Write the cache to disk atomically
+        """
+        if not self.path:
+            return
+        with self._lock:
+            # Per-process temp file; several sync processes may save at once
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as cache_file:
+                json.dump(self._entries, cache_file)
+            os.replace(tmp_path, self.path)
+
+    def get(self, parent_id, name, count=True):
+        """
+        Return the cached folder ID, or None on a miss or an expired entry
+
+        Pass ``count=False`` for a re-check that shouldn't affect the hit rate.
+        """
+        with self._lock:
+            entry = self._entries.get(self._key(parent_id, name))
+            hit = bool(entry) and time.time() - entry['cached_at'] < self.ttl_seconds
+            if count:
+                if hit:
+                    self.hits += 1
+                else:
+                    self.misses += 1
+                FOLDER_CACHE_LOOKUPS.inc(result='hit' if hit else 'miss')
+            return entry['id'] if hit else None
+
+    def set(self, parent_id, name, folder_id):
+        self.set_many({(parent_id, name): folder_id})
+
+    def set_many(self, folder_ids):
+        """
+        Cache several folder IDs, keyed by (parent ID, name), with one write to disk
+        """
+        if not folder_ids:
+            return
+        with self._lock:
+            now = time.time()
+            for (parent_id, name), folder_id in folder_ids.items():
+                self._entries[self._key(parent_id, name)] = {'id': folder_id, 'cached_at': now}
+            self.save()
+
+    def invalidate(self, parent_id, name):
+        """
+        Drop one entry, e.g. after Drive reports the folder no longer exists
+        """
+        with self._lock:
+            if self._entries.pop(self._key(parent_id, name), None):
+                self.save()
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_folder_cache():
+    """
+    Return the process-wide folder cache, loading it from disk on first use
+    """
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = FolderCache()
+        return _shared_cache
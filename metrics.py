@@ -0,0 +1,291 @@
+# In-process metrics with a Prometheus text-format export
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Seconds, for single API calls
+API_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# Seconds, for whole-file downloads, uploads and transfers
+FILE_LATENCY_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600, 7200)
+
+
+def _escape(value):
+    # Label values are quoted; backslashes, quotes and newlines must be escaped
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type_name = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _label_values(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.type_name}"]
+
+
+class Counter(_Metric):
+    """
+    Monotonically increasing total, one per label combination
+    """
+    type_name = 'counter'
+
+    def __init__(self, name, help_text, labelnames=()):
+        super().__init__(name, help_text, labelnames)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._label_values(labels), 0)
+
+    def render(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in values
+        ]
+
+
+class Gauge(_Metric):
+    """
+    Value computed when the metrics are rendered, from ``callback()``
+    """
+    type_name = 'gauge'
+
+    def __init__(self, name, help_text, callback):
+        super().__init__(name, help_text)
+        self._callback = callback
+
+    def render(self):
+        return self.header() + [f"{self.name} {_format_value(float(self._callback()))}"]
+
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values over fixed upper bounds
+    """
+    type_name = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=API_LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        # Per label combination: [count per bucket, sum, count]
+        self._values = {}
+
+    def observe(self, value, **labels):
+        key = self._label_values(labels)
+        with self._lock:
+            entry = self._values.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            entry[0][bisect.bisect_left(self.buckets, value)] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Observe the seconds spent in the ``with`` block
+        """
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(time.monotonic() - started, **labels)
+
+    def render(self):
+        with self._lock:
+            values = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items())
+        lines = self.header()
+        for key, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, [('le', _format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Collection of metrics rendered together in the Prometheus text format
+    """
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self.register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name, help_text, callback):
+        return self.register(Gauge(name, help_text, callback))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=API_LATENCY_BUCKETS):
+        return self.register(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+BYTES_TRANSFERRED = REGISTRY.counter(
+    'zoom_sync_bytes_total', "Bytes downloaded from Zoom or uploaded to Google Drive", ('direction',))
+FILES_PROCESSED = REGISTRY.counter(
+    'zoom_sync_files_total', "Recording files by stage and outcome", ('stage', 'outcome'))
+FILE_SECONDS = REGISTRY.histogram(
+    'zoom_sync_file_seconds', "Time to download, upload or transfer one file", ('stage',), FILE_LATENCY_BUCKETS)
+API_CALLS = REGISTRY.counter(
+    'zoom_sync_api_calls_total', "API calls by service, endpoint and result", ('service', 'endpoint', 'result'))
+API_SECONDS = REGISTRY.histogram(
+    'zoom_sync_api_call_seconds', "Latency of single API calls", ('service', 'endpoint'))
+RETRIES = REGISTRY.counter(
+    'zoom_sync_retries_total', "Retried requests by service and reason", ('service', 'reason'))
+RATE_LIMITED = REGISTRY.counter(
+    'zoom_sync_rate_limited_total', "429 responses by service and rate-limit category", ('service', 'category'))
+FOLDER_CACHE_LOOKUPS = REGISTRY.counter(
+    'zoom_sync_folder_cache_lookups_total', "Drive folder cache lookups by result", ('result',))
+
+
+def _folder_cache_hit_rate():
+    hits = FOLDER_CACHE_LOOKUPS.value(result='hit')
+    total = hits + FOLDER_CACHE_LOOKUPS.value(result='miss')
+    return hits / total if total else 0.0
+
+
+REGISTRY.gauge('zoom_sync_folder_cache_hit_ratio', "Share of folder lookups served from the cache",
+               _folder_cache_hit_rate)
+
+
+@contextmanager
+def track_api_call(service, endpoint):
+    """
+    Count and time one API call made in the ``with`` block
+
+    The result label is 'ok', or the HTTP status (or exception name) of
+    the error that left the block.
+    """
+    started = time.monotonic()
+    result = 'ok'
+    try:
+        yield
+    except Exception as e:
+        # HttpError carries .resp, requests errors .response (which is falsy on errors)
+        resp = getattr(e, 'resp', None)
+        if resp is None:
+            resp = getattr(e, 'response', None)
+        status = getattr(resp, 'status', None) or getattr(resp, 'status_code', None)
+        result = str(status) if status else type(e).__name__
+        raise
+    finally:
+        API_CALLS.inc(service=service, endpoint=endpoint, result=result)
+        API_SECONDS.observe(time.monotonic() - started, service=service, endpoint=endpoint)
+
+
+def write_textfile(path, registry=REGISTRY):
+    """
+    Write the metrics to ``path`` atomically, for node_exporter's textfile collector
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as metrics_file:
+        metrics_file.write(registry.render())
+    os.replace(tmp_path, path)
+
+
+class TextfileExporter:
+    """
+    Rewrites the metrics textfile every ``interval`` seconds on a background thread
+    """
+
+    def __init__(self, path, interval, registry=REGISTRY):
+        self.path = path
+        self.interval = interval
+        self.registry = registry
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='metrics-textfile', daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                write_textfile(self.path, self.registry)
+            except OSError as e:
+                print(f"Error writing metrics to {self.path}: {e}")
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop the thread and write the final values
+        """
+        self._stop.set()
+        self._thread.join()
+        write_textfile(self.path, self.registry)
+
+
+def start_metrics_server(port, host='127.0.0.1', registry=REGISTRY):
+    """
+    Serve the metrics at http://host:port/metrics from a background thread
+
+    Returns:
+        ThreadingHTTPServer: The running server; call ``shutdown()`` to stop it
+    """
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    print(f"Serving metrics on http://{host}:{server.server_address[1]}/metrics")
+    return server
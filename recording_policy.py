@@ -0,0 +1,93 @@
+# Which of a meeting's recording files are worth transferring
+VIDEO_FILE_TYPE = 'MP4'
+AUDIO_FILE_TYPE = 'M4A'
+
+
+class RecordingPolicy:
+    """
+    Picks the recording files of a meeting to transfer, using nothing but
+    Zoom's listing.
+
+    Zoom stores every segment of a meeting (files sharing a
+    ``recording_start``) several times: once per video layout and once as
+    audio only. Per segment the policy keeps the ``videos_per_segment``
+    videos ranked highest in ``video_types`` (unlisted layouts rank last)
+    and drops the audio-only copy if a video is kept. Text artifacts such
+    as transcripts and chat are always kept, whatever their size. Other
+    file types are left to the size threshold.
+    """
+
+    def __init__(self, video_types=(), videos_per_segment=1, keep_audio_only=False, keep_file_types=()):
+        """
+        Args:
+            video_types (list): Video ``recording_type`` values, most preferred first
+            videos_per_segment (int): Videos kept per segment
+            keep_audio_only (bool): Keep the audio-only copy next to a kept video
+            keep_file_types (list): ``file_type`` values that are always kept
+        """
+        self.video_types = list(video_types)
+        self.videos_per_segment = videos_per_segment
+        self.keep_audio_only = keep_audio_only
+        self.keep_file_types = set(keep_file_types)
+
+    @classmethod
+    def from_config(cls, config, overrides=None):
+        """
+        Build a policy from a RECORDING_POLICY-style dict, with a course's
+        ``recording_policy`` entries taking precedence
+
+        Returns:
+            RecordingPolicy: The policy, or None if ``config`` is None (keep every file)
+        """
+        if config is None:
+            return None
+        return cls(**{**config, **(overrides or {})})
+
+    def is_kept_artifact(self, recording):
+        """
+        True for files kept regardless of the size threshold
+        """
+        return recording.get('file_type') in self.keep_file_types
+
+    def _rank(self, recording):
+        recording_type = recording.get('recording_type')
+        if recording_type in self.video_types:
+            return self.video_types.index(recording_type)
+        return len(self.video_types)
+
+    def select(self, recording_files):
+        """
+        Split a meeting's recording files into the ones to transfer and the redundant ones
+
+        Args:
+            recording_files (list): The meeting's ``recording_files`` from Zoom
+
+        Returns:
+            tuple: (files to keep, files dropped as redundant), each in Zoom's order
+        """
+        segments = {}
+        for recording in recording_files:
+            if recording.get('file_type') in (VIDEO_FILE_TYPE, AUDIO_FILE_TYPE):
+                segments.setdefault(recording.get('recording_start'), []).append(recording)
+
+        dropped_ids = set()
+        for segment in segments.values():
+            videos = sorted((recording for recording in segment if recording['file_type'] == VIDEO_FILE_TYPE),
+                            key=self._rank)
+            dropped_ids.update(recording['id'] for recording in videos[self.videos_per_segment:])
+            if videos and self.videos_per_segment and not self.keep_audio_only:
+                dropped_ids.update(recording['id'] for recording in segment
+                                   if recording['file_type'] == AUDIO_FILE_TYPE)
+
+        kept = [recording for recording in recording_files if recording.get('id') not in dropped_ids]
+        dropped = [recording for recording in recording_files if recording.get('id') in dropped_ids]
+        return kept, dropped
+
+
+def print_policy_savings(dropped_recordings):
+    """
+    Print how much the selection policy kept from being transferred, if anything
+    """
+    if dropped_recordings:
+        total_mb = sum(recording.get('file_size') or 0 for recording in dropped_recordings) / (1024 * 1024)
+        print(f"\nSelection policy skipped {len(dropped_recordings)} redundant files ({total_mb:.2f} MB not transferred)")
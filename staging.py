@@ -0,0 +1,309 @@
+# Local spill files that keep downloaded recordings until Drive has them
+import mmap
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+from googleapiclient.errors import HttpError
+from googleapiclient.http import MediaUpload
+
+from checksums import StreamChecksum
+from constants import STAGING_DIR, STAGING_MAX_MB, STAGING_UPLOAD_ATTEMPTS, STREAM_CHUNK_SIZE_MB
+from drive_streaming import CHUNK_ALIGNMENT, TruncatedStreamError, upload_media_to_drive
+
+
+class StagedFile:
+    """
+    One recording downloaded into a memory-mapped spill file.
+
+    A background thread writes the download into the mapping while the
+    upload reads ranges back out of it, waiting for bytes that have not
+    arrived yet. The bytes stay on disk until the file is released, so a
+    failed upload starts again without going back to Zoom, and a failed
+    download continues from the last byte written.
+
+    The spill file is an anonymous temporary file: the operating system
+    removes it when it is closed or the process dies.
+    """
+
+    def __init__(self, size, offset=0, directory=None):
+        """
+        Args:
+            size (int): File size in bytes
+            offset (int): First byte to stage, when Drive already has the ones before it
+            directory (str, optional): Where the spill file is created
+        """
+        self.size = size
+        self.start = offset
+        # End of the bytes written so far
+        self.filled = offset
+        # Hashed in the download thread, in file order
+        self.checksum = StreamChecksum(offset=offset)
+        self.users = 0
+        self.downloading = False
+        self.error = None
+        self._ready = threading.Condition()
+        self._file = tempfile.TemporaryFile(dir=directory)
+        self._file.truncate(size)
+        self._map = mmap.mmap(self._file.fileno(), size)
+
+    @property
+    def complete(self):
+        return self.filled >= self.size
+
+    def download(self, open_chunks):
+        """
+        Write the rest of the file on a background thread, unless that is already happening
+
+        Args:
+            open_chunks (callable): ``open_chunks(offset)`` returns a context
+                manager yielding the file's byte chunks from ``offset`` on
+        """
+        with self._ready:
+            if self.complete or self.downloading:
+                return
+            self.downloading = True
+            self.error = None
+        threading.Thread(target=self._download, args=(open_chunks,), name='staging-download', daemon=True).start()
+
+    def _download(self, open_chunks):
+        try:
+            with open_chunks(self.filled) as chunks:
+                for chunk in chunks:
+                    end = min(self.filled + len(chunk), self.size)
+                    data = chunk[:end - self.filled]
+                    self._map[self.filled:end] = data
+                    self.checksum.update(data)
+                    with self._ready:
+                        self.filled = end
+                        self._ready.notify_all()
+                    if self.complete:
+                        break
+        except Exception as e:
+            self.error = e
+        finally:
+            with self._ready:
+                self.downloading = False
+                self._ready.notify_all()
+
+    def wait(self):
+        """
+        Block until the download thread stops, whether or not it finished
+        """
+        with self._ready:
+            self._ready.wait_for(lambda: not self.downloading)
+
+    def read(self, begin, length):
+        """
+        Return ``length`` bytes from ``begin`` (fewer at the end of the
+        file), waiting until they are downloaded
+
+        Raises:
+            TruncatedStreamError: The download ended before these bytes
+        """
+        if begin < self.start:
+            raise ValueError(f"Byte {begin} was never staged; staging started at byte {self.start}")
+        end = min(begin + length, self.size)
+        with self._ready:
+            self._ready.wait_for(lambda: self.filled >= end or not self.downloading)
+            if self.filled < end:
+                if self.error:
+                    raise self.error
+                raise TruncatedStreamError(f"Download ended at byte {self.filled} of {self.size}")
+        # Sliced straight out of the page cache
+        return self._map[begin:end]
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+class StagedMediaUpload(MediaUpload):
+    """
+    Resumable Drive media read from a StagedFile while it is being downloaded.
+    """
+
+    def __init__(self, staged, mimetype, chunksize=STREAM_CHUNK_SIZE_MB * 1024 * 1024, offset=0):
+        super().__init__()
+        self._staged = staged
+        self._mimetype = mimetype
+        self._chunksize = max(CHUNK_ALIGNMENT, -(-chunksize // CHUNK_ALIGNMENT) * CHUNK_ALIGNMENT)
+        self._read_end = offset
+
+    def chunksize(self):
+        return self._chunksize
+
+    def mimetype(self):
+        return self._mimetype
+
+    def size(self):
+        return self._staged.size
+
+    def resumable(self):
+        return True
+
+    def has_stream(self):
+        return False
+
+    def bytes_read(self):
+        return self._read_end
+
+    def getbytes(self, begin, length):
+        data = self._staged.read(begin, length)
+        self._read_end = max(self._read_end, begin + len(data))
+        return data
+
+    def to_json(self):
+        # Records where the upload stands; the spill file itself is left out
+        return self._to_json(strip=['_staged'])
+
+
+class StagingArea:
+    """
+    Spill files of the recordings in flight, capped at ``max_bytes`` of disk.
+
+    A file is freed once Drive's copy of it is verified, so a copy that
+    does not match is uploaded again from disk. Files whose transfer failed
+    stay staged for the next attempt; when a new file does not fit, the
+    least recently used of those are evicted first. A file that still does
+    not fit is not staged, and streams straight from Zoom instead.
+    """
+
+    def __init__(self, directory=STAGING_DIR, max_bytes=STAGING_MAX_MB * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.used = 0
+        # Recording key -> StagedFile, least recently used first
+        self._files = OrderedDict()
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def acquire(self, key, size, offset=0):
+        """
+        Stage a recording, or pick up the copy an earlier attempt left
+
+        Args:
+            key (str): Identifies the recording file
+            size (int): File size in bytes
+            offset (int): First byte the upload will ask for
+
+        Returns:
+            StagedFile: The staged copy, or None if it does not fit in the disk cap
+        """
+        if not size:
+            return None
+        with self._lock:
+            staged = self._files.get(key)
+            if staged is not None and staged.size == size and staged.start <= offset:
+                self._files.move_to_end(key)
+            else:
+                if staged is not None and not staged.users:
+                    self._discard(key)
+                if self.used + size > self.max_bytes:
+                    self._evict(size)
+                if key in self._files or self.used + size > self.max_bytes:
+                    return None
+                staged = self._files[key] = StagedFile(size, offset, self.directory)
+                self.used += size
+            staged.users += 1
+            return staged
+
+    def release(self, key):
+        """
+        Stop using a staged file; it stays staged until discard() or eviction
+        """
+        with self._lock:
+            staged = self._files.get(key)
+            if staged is not None:
+                staged.users -= 1
+
+    def discard(self, key):
+        """
+        Free a staged file once Drive's copy is settled, unless someone still uses it
+        """
+        with self._lock:
+            staged = self._files.get(key)
+            if staged is not None and not staged.users:
+                self._discard(key)
+
+    def _evict(self, size):
+        for key, staged in list(self._files.items()):
+            if self.used + size <= self.max_bytes:
+                return
+            if not staged.users and not staged.downloading:
+                print(f"Evicting staged copy of {key} ({staged.size / (1024 * 1024):.2f} MB) to make room")
+                self._discard(key)
+
+    def _discard(self, key):
+        staged = self._files.pop(key)
+        self.used -= staged.size
+        staged.close()
+
+
+def upload_staged_recording(
+        drive_service,
+        staged,
+        download,
+        file_metadata,
+        mimetype,
+        chunk_size_mb=STREAM_CHUNK_SIZE_MB,
+        session=None,
+        restore_session=None,
+        attempts=STAGING_UPLOAD_ATTEMPTS
+):
+    """
+    Upload a recording from its spill file while it downloads into it
+
+    An upload that fails with an HttpError is tried again from the staged
+    bytes, continuing Drive's session where it stopped. Zoom is only asked
+    again for bytes a failed or truncated download never wrote.
+
+    Args:
+        drive_service: Google Drive service
+        staged (StagedFile): Spill file of the recording
+        download (callable): Starts the download into ``staged``, or
+            continues it after it failed, e.g. ``lambda: staged.download(open_chunks)``
+        file_metadata (dict): Drive metadata for the new file (name, parents, ...)
+        mimetype (str): Mimetype of the uploaded file
+        chunk_size_mb (int): Upload chunk size in MB
+        session (UploadSession, optional): Saved session to continue
+        restore_session (callable, optional): Returns the session as Drive
+            has it after a failed attempt
+        attempts (int): Upload attempts before the HttpError is raised
+
+    Returns:
+        dict: Drive response for the created file, with CHECKSUM_FIELDS
+    """
+    for attempt in range(1, attempts + 1):
+        if session and session.file:
+            # The last attempt finished on Drive's side after all
+            return session.file
+
+        download()
+        media = StagedMediaUpload(staged, mimetype, chunk_size_mb * 1024 * 1024, session.offset if session else 0)
+        try:
+            return upload_media_to_drive(drive_service, media, file_metadata, session=session)
+        except HttpError as e:
+            if attempt == attempts:
+                raise
+            print(f"Upload failed ({e}); retrying from the staged copy...")
+            session = restore_session() if restore_session else None
+
+
+_staging_area = None
+_staging_area_lock = threading.Lock()
+
+
+def get_staging_area():
+    """
+    Return the process-wide staging area, or None if STAGING_DIR is not set
+    """
+    global _staging_area
+    if not STAGING_DIR:
+        return None
+    with _staging_area_lock:
+        if _staging_area is None:
+            _staging_area = StagingArea(STAGING_DIR)
+        return _staging_area
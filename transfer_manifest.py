@@ -0,0 +1,230 @@
+# Local record of Zoom recordings already copied to Google Drive
+import sqlite3
+import threading
+from datetime import datetime
+
+from constants import TRANSFER_MANIFEST_PATH
+
+STATUS_PENDING = 'pending'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+# Columns added after the first release, created on existing databases at open
+ADDED_COLUMNS = {
+    'md5': 'TEXT',
+    'sha256': 'TEXT',
+    'verification': 'TEXT',
+}
+
+
+def recording_key(recording):
+    """
+    Stable manifest key for a Zoom recording file
+
+    Zoom gives every recording file an ``id``; the fallback covers the rare
+    file types that come without one.
+    """
+    return recording.get('id') or "{}/{}/{}".format(
+        recording.get('meeting_id'),
+        recording.get('recording_type'),
+        recording.get('file_type')
+    )
+
+
+class TransferManifest:
+    """
+    SQLite table of transfers keyed by Zoom recording file ID.
+
+    Each row records the file size, the Drive file ID, a status of
+    'pending', 'done' or 'failed' and, once done, the checksums computed
+    during the transfer with the outcome of comparing them to Drive's
+    ('verified', 'size_only' or 'unverified'). Completed IDs are also held in a set so
+    the "already transferred?" check costs no database round trip. The
+    connection is shared between threads behind a lock.
+
+    A second table holds the resumable Drive upload session of every
+    unfinished upload, so it can be continued after a crash or restart. A
+    third keeps the listing watermarks of the sync daemon.
+    """
+
+    def __init__(self, path=TRANSFER_MANIFEST_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        # Sync processes share the file; wait for their writes instead of failing
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS transfers (
+                    recording_id TEXT PRIMARY KEY,
+                    meeting_uuid TEXT,
+                    file_name TEXT,
+                    file_size INTEGER,
+                    drive_file_id TEXT,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    updated_at TEXT NOT NULL
+                )
+                """
+            )
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(transfers)")}
+            for column, column_type in ADDED_COLUMNS.items():
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE transfers ADD COLUMN {column} {column_type}")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS upload_sessions (
+                    upload_key TEXT PRIMARY KEY,
+                    session_uri TEXT NOT NULL,
+                    file_size INTEGER,
+                    committed_bytes INTEGER NOT NULL DEFAULT 0,
+                    updated_at TEXT NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS watermarks (
+                    scope TEXT PRIMARY KEY,
+                    watermark TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+                """
+            )
+        self._done = {
+            (row[0], row[1])
+            for row in self._conn.execute(
+                "SELECT recording_id, file_size FROM transfers WHERE status = ?", (STATUS_DONE,)
+            )
+        }
+
+    def is_transferred(self, recording):
+        """
+        True if this recording file (same ID and size) is already in Drive
+        """
+        return (recording_key(recording), recording.get('file_size')) in self._done
+
+    def transfer_state(self, recording):
+        """
+        Returns:
+            tuple: (status, attempts) of the recording's transfer, or None if it was never attempted
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT status, attempts FROM transfers WHERE recording_id = ?", (recording_key(recording),)
+            ).fetchone()
+
+    def mark_started(self, recording, meeting_uuid, file_name):
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO transfers (recording_id, meeting_uuid, file_name, file_size, status, attempts, updated_at)
+                VALUES (?, ?, ?, ?, ?, 1, ?)
+                ON CONFLICT(recording_id) DO UPDATE SET
+                    meeting_uuid = excluded.meeting_uuid,
+                    file_name = excluded.file_name,
+                    file_size = excluded.file_size,
+                    status = excluded.status,
+                    attempts = transfers.attempts + 1,
+                    error = NULL,
+                    updated_at = excluded.updated_at
+                """,
+                (recording_key(recording), meeting_uuid, file_name, recording.get('file_size'),
+                 STATUS_PENDING, datetime.now().isoformat())
+            )
+
+    def mark_done(self, recording, drive_file_id, verification=None, md5=None, sha256=None):
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                UPDATE transfers SET status = ?, drive_file_id = ?, error = NULL, verification = ?, md5 = ?,
+                    sha256 = ?, updated_at = ?
+                WHERE recording_id = ?
+                """,
+                (STATUS_DONE, drive_file_id, verification, md5, sha256, datetime.now().isoformat(),
+                 recording_key(recording))
+            )
+            self._done.add((recording_key(recording), recording.get('file_size')))
+
+    def mark_failed(self, recording, error):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE transfers SET status = ?, error = ?, updated_at = ? WHERE recording_id = ?",
+                (STATUS_FAILED, str(error), datetime.now().isoformat(), recording_key(recording))
+            )
+
+    def get_upload_session(self, upload_key):
+        """
+        Returns:
+            tuple: (session URI, file size, committed bytes) of the saved
+            upload session, or None
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT session_uri, file_size, committed_bytes FROM upload_sessions WHERE upload_key = ?",
+                (upload_key,)
+            ).fetchone()
+
+    def save_upload_session(self, upload_key, session_uri, file_size, committed_bytes):
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO upload_sessions (upload_key, session_uri, file_size, committed_bytes, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(upload_key) DO UPDATE SET
+                    session_uri = excluded.session_uri,
+                    file_size = excluded.file_size,
+                    committed_bytes = excluded.committed_bytes,
+                    updated_at = excluded.updated_at
+                """,
+                (upload_key, session_uri, file_size, committed_bytes, datetime.now().isoformat())
+            )
+
+    def clear_upload_session(self, upload_key):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM upload_sessions WHERE upload_key = ?", (upload_key,))
+
+    def get_watermark(self, scope):
+        """
+        Returns:
+            str: Start time up to which ``scope`` is fully synced, or None
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT watermark FROM watermarks WHERE scope = ?", (scope,)).fetchone()
+        return row[0] if row else None
+
+    def set_watermark(self, scope, watermark):
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO watermarks (scope, watermark, updated_at) VALUES (?, ?, ?)
+                ON CONFLICT(scope) DO UPDATE SET watermark = excluded.watermark, updated_at = excluded.updated_at
+                """,
+                (scope, watermark, datetime.now().isoformat())
+            )
+
+    def unverified(self):
+        """
+        Returns:
+            list: (recording ID, file name, Drive file ID) of transfers whose
+            Drive copy did not match what Zoom served
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT recording_id, file_name, drive_file_id FROM transfers WHERE verification = 'unverified'"
+            ).fetchall()
+
+    def summary(self):
+        """
+        Returns:
+            dict: Number of transfers per status
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM transfers GROUP BY status").fetchall()
+        return dict(rows)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
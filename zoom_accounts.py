@@ -0,0 +1,125 @@
+# Registry of the Zoom accounts a sync covers
+from urllib.parse import parse_qs, urlsplit
+from commons import get_access_token, iter_users
+from constants import ZOOM_ACCOUNTS, ZOOM_RATE_LIMITS
+from course_index import CourseIndex
+from zoom_client import ZoomRateLimiter, get_zoom_client
+
+
+class ZoomAccount:
+    """
+    One Zoom account: app credentials, course mapping, users and rate limits.
+
+    Tokens are cached per client ID and token URL, so accounts never share
+    one. Each account's rate-limit budget is split evenly between the
+    processes working on it, so together they stay within the account's
+    limits.
+    """
+
+    def __init__(self, name, client_id, client_secret, token_url, course_mapping, users=None, rate_limits=None):
+        """
+        Args:
+            name (str): Key of the account in ZOOM_ACCOUNTS
+            client_id (str): Server-to-server OAuth app client ID
+            client_secret (str): Server-to-server OAuth app client secret
+            token_url (str): Zoom OAuth token URL (including the account ID)
+            course_mapping (dict): Course mapping used to file the account's recordings
+            users (list, optional): User IDs or emails to sync; None syncs every active user
+            rate_limits (dict, optional): Requests per second per category;
+                defaults to ZOOM_RATE_LIMITS
+        """
+        self.name = name
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.token_url = token_url
+        self.course_mapping = course_mapping
+        self.users = users
+        self.rate_limits = rate_limits or ZOOM_RATE_LIMITS
+        self._course_index = None
+        # Rate limiter per process share, kept while the account object lives
+        self._rate_limiters = {}
+
+    @classmethod
+    def from_config(cls, name, config):
+        return cls(
+            name,
+            config['client_id'],
+            config['client_secret'],
+            config['token_url'],
+            config['course_mapping'],
+            users=config.get('users'),
+            rate_limits=config.get('rate_limits')
+        )
+
+    @property
+    def account_id(self):
+        # Zoom's ID of the account, from the server-to-server token URL
+        return parse_qs(urlsplit(self.token_url).query).get('account_id', [None])[0]
+
+    def get_access_token(self):
+        return get_access_token(self.client_id, self.client_secret, self.token_url)
+
+    @property
+    def course_index(self):
+        # Compiled on first use, once per process
+        if self._course_index is None:
+            self._course_index = CourseIndex(self.course_mapping)
+        return self._course_index
+
+    def list_user_ids(self, access_token):
+        """
+        IDs (or emails) of the users to sync: the configured list, or every active user
+        """
+        if self.users is not None:
+            return list(self.users)
+        return [user['id'] for user in iter_users(access_token)]
+
+    def use_zoom_client(self, share=1):
+        """
+        Point this process's Zoom client at the account's rate limits
+
+        The shared client and its connection pool stay in place; only its
+        rate limiter is swapped for the account's. The account keeps its
+        limiter, so the pauses and exhausted categories it has seen still
+        apply the next time the account is used.
+
+        Args:
+            share (int): Number of processes working on this account at
+                once; each gets an equal slice of the budget
+        """
+        rate_limiter = self._rate_limiters.get(share)
+        if rate_limiter is None:
+            rates = {category: rate / max(1, share) for category, rate in self.rate_limits.items()}
+            rate_limiter = self._rate_limiters[share] = ZoomRateLimiter(rates)
+        get_zoom_client().rate_limiter = rate_limiter
+
+
+def get_accounts(registry=ZOOM_ACCOUNTS):
+    """
+    Returns:
+        list: ZoomAccount per entry of the registry, in registry order
+    """
+    return [ZoomAccount.from_config(name, config) for name, config in registry.items()]
+
+
+def find_account(account_id, registry=ZOOM_ACCOUNTS):
+    """
+    Account with Zoom account ID ``account_id`` (as sent in webhook events)
+
+    Returns:
+        ZoomAccount: The matching account; the only one if a single account is
+        configured and no ID is given; otherwise None
+    """
+    accounts = get_accounts(registry)
+    for account in accounts:
+        if account_id and account.account_id == account_id:
+            return account
+    if not account_id and len(accounts) == 1:
+        return accounts[0]
+    return None
+
+
+def get_account(name, registry=ZOOM_ACCOUNTS):
+    if name not in registry:
+        raise KeyError(f"Unknown Zoom account '{name}'; known accounts: {', '.join(registry)}")
+    return ZoomAccount.from_config(name, registry[name])
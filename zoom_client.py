@@ -0,0 +1,353 @@
+# Shared HTTP client for Zoom API calls and recording downloads
+import random
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from constants import (
+    API_URL,
+    ZOOM_HTTP_POOL_SIZE,
+    ZOOM_MAX_RETRIES,
+    ZOOM_BACKOFF_SECONDS,
+    ZOOM_RATE_LIMITS,
+    ZOOM_MAX_RATE_LIMIT_WAIT_SECONDS,
+)
+from metrics import API_CALLS, API_SECONDS, RETRIES, RATE_LIMITED
+
+# Server errors worth another attempt
+RETRY_STATUS_CODES = {500, 502, 503, 504}
+
+# Zoom rate-limit category and metrics name of each endpoint we call, by method and path
+ENDPOINT_CATEGORIES = [
+    ('GET', re.compile(r'^/users/[^/]+/recordings$'), 'medium', 'list_recordings'),
+    ('GET', re.compile(r'^/users$'), 'medium', 'list_users'),
+    ('DELETE', re.compile(r'^/meetings/[^/]+/recordings(/[^/]+)?$'), 'light', 'delete_recording'),
+    ('GET', re.compile(r'^/meetings/[^/]+/participants$'), 'medium', 'meeting_participants'),
+    ('GET', re.compile(r'^/past_meetings/[^/]+/participants$'), 'medium', 'past_meeting_participants'),
+    ('GET', re.compile(r'^/report/meetings/[^/]+/participants$'), 'heavy', 'report_participants'),
+]
+DEFAULT_CATEGORY = 'medium'
+
+# Values Zoom sends in the X-RateLimit-Category header
+HEADER_CATEGORIES = {
+    'light': 'light',
+    'medium': 'medium',
+    'heavy': 'heavy',
+    'resource-intensive': 'resource_intensive',
+}
+
+
+class RateLimitExhausted(requests.RequestException):
+    """
+    Raised instead of waiting when Zoom's allowance for a rate-limit
+    category is used up for longer than the caller is willing to wait
+    (e.g. a daily limit).
+    """
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket allowing ``rate`` requests per second on average,
+    with bursts of up to ``capacity``.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Block until a request may be sent
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._blocked_until:
+                    wait = self._blocked_until - now
+                else:
+                    self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """
+        Hold every caller for ``seconds`` and drain the bucket
+        """
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+            self._tokens = 0
+            self._updated = self._blocked_until
+
+
+class ZoomRateLimiter:
+    """
+    One token bucket per Zoom rate-limit category.
+
+    Requests wait for their category's bucket before they are sent. A 429
+    pauses the bucket for the server's Retry-After. A response that says
+    the per-second allowance is used up pauses it until the next second.
+    Either way callers queue instead of failing, unless the wait is longer
+    than ``max_wait``: then the category is marked exhausted until the
+    Retry-After has passed, and requests for it fail fast.
+    """
+
+    def __init__(self, rates=ZOOM_RATE_LIMITS, max_wait=ZOOM_MAX_RATE_LIMIT_WAIT_SECONDS):
+        """
+        Args:
+            rates (dict): Requests per second allowed per category
+            max_wait (float): Longest Retry-After, in seconds, that callers wait out
+        """
+        self.buckets = {category: TokenBucket(rate) for category, rate in rates.items()}
+        self.max_wait = max_wait
+        # Category -> monotonic time until which its requests fail fast
+        self._exhausted_until = {}
+
+    @staticmethod
+    def categorize(method, path):
+        for endpoint_method, pattern, category, _ in ENDPOINT_CATEGORIES:
+            if method == endpoint_method and pattern.match(path):
+                return category
+        return DEFAULT_CATEGORY
+
+    def acquire(self, category):
+        """
+        Wait until a request in ``category`` may be sent
+
+        Raises:
+            RateLimitExhausted: The category's allowance is used up for longer than max_wait
+        """
+        remaining = self._exhausted_until.get(category, 0.0) - time.monotonic()
+        if remaining > 0:
+            raise RateLimitExhausted(f"Zoom rate limit for {category} requests is used up "
+                                     f"for another {remaining:.0f}s")
+        self.buckets[category].acquire()
+
+    @staticmethod
+    def retry_after(response, default=1.0):
+        """
+        Seconds to wait according to the Retry-After header (seconds or HTTP date)
+        """
+        value = response.headers.get('Retry-After')
+        if not value:
+            return default
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return default
+
+    def observe(self, category, response):
+        """
+        Update the buckets from a response's status and rate-limit headers
+
+        Returns:
+            float: Seconds the category is paused or exhausted for (0 if neither)
+        """
+        header_category = (response.headers.get('X-RateLimit-Category') or '').lower()
+        category = HEADER_CATEGORIES.get(header_category, category)
+
+        if response.status_code == 429:
+            delay = self.retry_after(response)
+        elif (response.headers.get('X-RateLimit-Remaining') == '0'
+              and response.headers.get('X-RateLimit-Type', 'QPS') == 'QPS'):
+            delay = 1.0
+        else:
+            return 0.0
+
+        if delay <= self.max_wait:
+            self.buckets[category].pause(delay)
+        else:
+            # Waiting this out would stall every caller; fail their requests until it has passed
+            self._exhausted_until[category] = time.monotonic() + delay
+        return delay
+
+
+class ZoomClient:
+    """
+    Pooled, retrying HTTP client for everything that talks to Zoom.
+
+    One ``requests.Session`` keeps connections alive between calls, so only
+    the first request to a host pays for the TCP and TLS handshakes. Server
+    errors (5xx) and connection errors are retried with exponential backoff
+    and jitter.
+    """
+
+    def __init__(
+            self,
+            api_url=API_URL,
+            pool_size=ZOOM_HTTP_POOL_SIZE,
+            max_retries=ZOOM_MAX_RETRIES,
+            backoff_seconds=ZOOM_BACKOFF_SECONDS,
+            timeout=(10, 60),
+            rate_limiter=None
+    ):
+        """
+        Args:
+            api_url (str): Base URL that relative paths are joined to
+            pool_size (int): Keep-alive connections kept per host
+            max_retries (int): Extra attempts after a 5xx or connection error
+            backoff_seconds (float): Delay before the first retry; doubles every retry
+            timeout (tuple): (connect, read) timeout in seconds
+            rate_limiter (ZoomRateLimiter, optional): Scheduler for API calls;
+                defaults to one built from ZOOM_RATE_LIMITS
+        """
+        self.api_url = api_url.rstrip('/')
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter or ZoomRateLimiter()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def _url(self, url):
+        # Relative paths are API endpoints, e.g. '/users/me/recordings'
+        return url if url.startswith('http') else f"{self.api_url}{url}"
+
+    def _api_path(self, url):
+        # Path below the API URL, or None for token and download URLs
+        if not url.startswith(self.api_url):
+            return None
+        return urlsplit(url).path[len(urlsplit(self.api_url).path):]
+
+    def _category(self, method, url):
+        # Only API calls are rate limited; token and download URLs are not
+        path = self._api_path(url)
+        return self.rate_limiter.categorize(method, path) if path is not None else None
+
+    def _endpoint(self, method, url):
+        # Name the call is counted under in the metrics
+        path = self._api_path(url)
+        if path is None:
+            return 'token' if '/oauth/token' in url else 'download'
+        for endpoint_method, pattern, _, endpoint in ENDPOINT_CATEGORIES:
+            if method == endpoint_method and pattern.match(path):
+                return endpoint
+        return 'other'
+
+    def backoff(self, attempt):
+        """
+        Seconds to wait before retry number ``attempt`` (from 0), with jitter
+        """
+        delay = self.backoff_seconds * (2 ** attempt)
+        return delay + random.uniform(0, delay / 2)
+
+    def request(self, method, url, access_token=None, **kwargs):
+        """
+        Send a request, retrying 5xx responses and connection errors
+
+        API calls first wait for their rate-limit category. A 429 is retried
+        after the server's Retry-After, unless that is longer than the rate
+        limiter's max_wait (e.g. a daily limit); then the 429 is returned,
+        and later calls in that category raise RateLimitExhausted until the
+        Retry-After has passed.
+
+        Args:
+            method (str): HTTP method
+            url (str): Absolute URL, or a path relative to the API URL
+            access_token (str, optional): Zoom bearer token
+
+        Returns:
+            requests.Response: The final response (which may still be an error)
+        """
+        url = self._url(url)
+        headers = dict(kwargs.pop('headers', None) or {})
+        if access_token:
+            headers['Authorization'] = f"Bearer {access_token}"
+        kwargs.setdefault('timeout', self.timeout)
+        category = self._category(method, url)
+        endpoint = self._endpoint(method, url)
+
+        attempt = 0
+        while True:
+            if category:
+                self.rate_limiter.acquire(category)
+            started = time.monotonic()
+            try:
+                response = self.session.request(method, url, headers=headers, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                API_CALLS.inc(service='zoom', endpoint=endpoint, result=type(e).__name__)
+                if attempt >= self.max_retries:
+                    raise
+                RETRIES.inc(service='zoom', reason='connection')
+                delay = self.backoff(attempt)
+                print(f"Zoom request failed ({e}); retrying in {delay:.1f}s...")
+            else:
+                API_SECONDS.observe(time.monotonic() - started, service='zoom', endpoint=endpoint)
+                API_CALLS.inc(service='zoom', endpoint=endpoint,
+                              result='ok' if response.ok else str(response.status_code))
+                if response.status_code == 429:
+                    RATE_LIMITED.inc(service='zoom', category=category or 'none')
+                paused = self.rate_limiter.observe(category, response) if category else 0.0
+                if category and response.status_code == 429 and paused <= self.rate_limiter.max_wait:
+                    # Wait in the queue; the bucket holds every caller for this category
+                    response.close()
+                    print(f"Zoom rate limit hit for {method} {url}; waiting {paused:.1f}s...")
+                    continue
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+                    return response
+                response.close()
+                RETRIES.inc(service='zoom', reason=str(response.status_code))
+                delay = self.backoff(attempt)
+                print(f"Zoom returned {response.status_code} for {method} {url}; retrying in {delay:.1f}s...")
+
+            time.sleep(delay)
+            attempt += 1
+
+    def get(self, url, access_token=None, **kwargs):
+        return self.request('GET', url, access_token, **kwargs)
+
+    def post(self, url, access_token=None, **kwargs):
+        return self.request('POST', url, access_token, **kwargs)
+
+    def delete(self, url, access_token=None, **kwargs):
+        return self.request('DELETE', url, access_token, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+_shared_client = None
+_shared_client_lock = threading.Lock()
+
+
+def get_zoom_client():
+    """
+    Return the process-wide Zoom client, creating it on first use
+    """
+    global _shared_client
+    with _shared_client_lock:
+        if _shared_client is None:
+            _shared_client = ZoomClient()
+        return _shared_client
+
+
+def set_zoom_client(client):
+    """
+    Replace the process-wide Zoom client (e.g. to point it at another API URL)
+
+    The client it replaces is closed, along with its connection pool.
+    """
+    global _shared_client
+    with _shared_client_lock:
+        previous, _shared_client = _shared_client, client
+    if previous is not None and previous is not client:
+        previous.close()
@@ -0,0 +1,159 @@
+# Receiver for Zoom's recording.completed webhook
+import hashlib
+import hmac
+import json
+import os
+import queue
+import threading
+import time
+
+from flask import Flask, abort, jsonify, request
+
+from constants import WEBHOOK_EVENTS_DIR, WEBHOOK_MAX_CLOCK_SKEW_SECONDS, WEBHOOK_PATH
+
+RECORDING_COMPLETED = 'recording.completed'
+URL_VALIDATION = 'endpoint.url_validation'
+
+
+def _hmac_sha256(secret_token, message):
+    return hmac.new(secret_token.encode(), message, hashlib.sha256).hexdigest()
+
+
+def webhook_signature(secret_token, timestamp, body):
+    """
+    Zoom's ``x-zm-signature`` for a request body
+
+    Args:
+        secret_token (str): Secret token of the app's event subscription
+        timestamp (str): Value of the ``x-zm-request-timestamp`` header
+        body (bytes): Raw request body
+
+    Returns:
+        str: ``v0=`` followed by the HMAC-SHA256 of ``v0:<timestamp>:<body>``
+    """
+    return 'v0=' + _hmac_sha256(secret_token, f"v0:{timestamp}:".encode() + body)
+
+
+def verify_webhook(secret_token, headers, body, max_skew=WEBHOOK_MAX_CLOCK_SKEW_SECONDS):
+    """
+    True if the request was signed with ``secret_token`` within ``max_skew`` seconds of now
+    """
+    timestamp = headers.get('x-zm-request-timestamp', '')
+    signature = headers.get('x-zm-signature', '')
+    if not timestamp.isdigit() or abs(time.time() - int(timestamp)) > max_skew:
+        return False
+    return hmac.compare_digest(signature, webhook_signature(secret_token, timestamp, body))
+
+
+def url_validation_response(secret_token, plain_token):
+    """
+    Answer to Zoom's endpoint.url_validation challenge
+    """
+    return {'plainToken': plain_token, 'encryptedToken': _hmac_sha256(secret_token, plain_token.encode())}
+
+
+def save_event(events_dir, event, body):
+    """
+    Keep a verified event body, so it can be replayed with ReplayZoomWebhooks.py
+
+    Files are named after Zoom's event timestamp, so a redelivered or
+    replayed event overwrites its earlier copy.
+    """
+    os.makedirs(events_dir, exist_ok=True)
+    path = os.path.join(events_dir, f"{event.get('event_ts') or time.time_ns()}_{event.get('event')}.json")
+    with open(path, 'wb') as event_file:
+        event_file.write(body)
+    return path
+
+
+def create_app(secret_token, on_recording_completed, path=WEBHOOK_PATH, events_dir=WEBHOOK_EVENTS_DIR):
+    """
+    Flask app receiving Zoom webhooks at ``path``
+
+    Every request must carry a valid signature. URL validation challenges
+    are answered directly; recording.completed events are handed to
+    ``on_recording_completed(event)``, which must return quickly because
+    Zoom retries events that are not acknowledged within a few seconds.
+
+    Args:
+        secret_token (str): Secret token of the app's event subscription
+        on_recording_completed (callable): Called with each recording.completed event
+        path (str): URL path of the webhook endpoint
+        events_dir (str, optional): Directory verified events are saved to
+
+    Returns:
+        Flask: The app; serve it with ``app.run()``
+    """
+    app = Flask(__name__)
+
+    @app.post(path)
+    def receive_webhook():
+        body = request.get_data()
+        if not verify_webhook(secret_token, request.headers, body):
+            abort(401)
+        try:
+            event = json.loads(body)
+        except ValueError:
+            abort(400)
+
+        event_name = event.get('event')
+        if event_name == URL_VALIDATION:
+            return jsonify(url_validation_response(secret_token, event['payload']['plainToken']))
+
+        if events_dir:
+            save_event(events_dir, event, body)
+        if event_name == RECORDING_COMPLETED:
+            on_recording_completed(event)
+        return '', 200
+
+    return app
+
+
+class RecordingEventQueue:
+    """
+    Transfers the meetings of recording.completed events on a background
+    thread, one meeting at a time.
+
+    Zoom may deliver an event more than once; the transfer manifest skips
+    files that are already in Drive, so a repeat costs no transfer.
+    """
+
+    def __init__(self, transfer_meeting):
+        """
+        Args:
+            transfer_meeting (callable): Called on the worker thread as
+                ``transfer_meeting(account_id, meeting)``
+        """
+        self._transfer_meeting = transfer_meeting
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='webhook-transfers', daemon=True)
+
+    def submit(self, event):
+        payload = event['payload']
+        meeting = payload['object']
+        print(f"Recording completed: {meeting.get('topic')} ({len(meeting.get('recording_files', []))} files)")
+        self._queue.put((payload.get('account_id'), meeting))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                account_id, meeting = item
+                self._transfer_meeting(account_id, meeting)
+            except Exception as e:
+                print(f"Error transferring meeting from webhook: {e}")
+            finally:
+                self._queue.task_done()
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Finish the queued meetings, then stop the worker thread
+        """
+        self._queue.put(None)
+        self._thread.join()